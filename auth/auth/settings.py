@@ -60,10 +60,12 @@ INSTALLED_APPS = [
     'system_roles',
     'tts',  # Make sure TTS app is included
     'hdts',  # Make sure HDTS app is included
+    'keys',  # API keys and JWT signing keys
 ]
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Add CORS middleware at the top
     'django.middleware.security.SecurityMiddleware',
+    'compression.CompressionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -145,6 +147,12 @@ PASSWORD_HASHERS = [
 ]
 
 # REST Framework configuration
+# JSON only in production; the browsable API is on with DEBUG or BROWSABLE_API=True
+BROWSABLE_API = config('BROWSABLE_API', default=DEBUG, cast=bool)
+
+# Responses smaller than this are sent uncompressed (see compression.py)
+RESPONSE_COMPRESSION_MIN_SIZE = config('RESPONSE_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'users.authentication.CookieJWTAuthentication',  # Custom cookie-based JWT auth
@@ -155,11 +163,21 @@ REST_FRAMEWORK = {
     ],
     
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
-    "DEFAULT_RENDERER_CLASSES": [
-    "rest_framework.renderers.JSONRenderer",
-    "rest_framework.renderers.BrowsableAPIRenderer",  # Enables clickable UI
+    "DEFAULT_RENDERER_CLASSES": ["renderers.ORJSONRenderer"] + (
+        ["rest_framework.renderers.BrowsableAPIRenderer"] if BROWSABLE_API else []  # Enables clickable UI
+    ),
+    "DEFAULT_PARSER_CLASSES": [
+        "renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
-    
+    # Per-endpoint limits for unauthenticated credential and email endpoints,
+    # applied with ScopedRateThrottle via each view's throttle_scope
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config('THROTTLE_RATE_LOGIN', default='20/min'),
+        'otp': config('THROTTLE_RATE_OTP', default='5/min'),
+        'password_reset': config('THROTTLE_RATE_PASSWORD_RESET', default='5/hour'),
+    },
 }
 # JWT Settings (optional; good defaults)
 from datetime import timedelta
@@ -173,6 +191,65 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',  # The claim in the token that will contain the user ID
 }
 
+# Cache used for role resolution and other per-user state. LocMem is per
+# process: set REDIS_URL when running more than one worker so invalidation
+# is seen everywhere.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a user's resolved roles stay cached (see system_roles.resolution)
+ROLE_CACHE_TIMEOUT = config('ROLE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Upper bound in seconds on how stale a worker's TTS role membership index can
+# get when the cache is not shared between workers (see tts.assignment)
+TTS_MEMBERSHIP_INDEX_TTL = config('TTS_MEMBERSHIP_INDEX_TTL', default=60, cast=int)
+
+# Bulk provisioning (see system_roles.provisioning). Hash workers default to half
+# the CPU count, at most 4.
+PROVISIONING_HASH_WORKERS = config('PROVISIONING_HASH_WORKERS', default=0, cast=int) or None
+PROVISIONING_MAX_ROWS = config('PROVISIONING_MAX_ROWS', default=10000, cast=int)
+
+# Breached-password checks (see users.breached_passwords). The offline index
+# is built with `manage.py build_breached_password_index`; without it the
+# HaveIBeenPwned range API is used as a cached fallback if enabled.
+PWNED_PASSWORDS_INDEX_PATH = config('PWNED_PASSWORDS_INDEX_PATH', default=str(BASE_DIR / 'data' / 'pwned_passwords.bloom'))
+PWNED_PASSWORDS_REMOTE_FALLBACK = config('PWNED_PASSWORDS_REMOTE_FALLBACK', default=True, cast=bool)
+PWNED_PASSWORDS_CACHE_TIMEOUT = config('PWNED_PASSWORDS_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)  # seconds
+
+# Background delivery of notifications and emails (see delivery_queue.py)
+DELIVERY_QUEUE_ENABLED = config('DELIVERY_QUEUE_ENABLED', default=True, cast=bool)
+DELIVERY_QUEUE_BATCH_SIZE = config('DELIVERY_QUEUE_BATCH_SIZE', default=50, cast=int)
+DELIVERY_QUEUE_MAX_ATTEMPTS = config('DELIVERY_QUEUE_MAX_ATTEMPTS', default=5, cast=int)
+DELIVERY_QUEUE_BACKOFF_SECONDS = config('DELIVERY_QUEUE_BACKOFF_SECONDS', default=1.0, cast=float)
+
+# Asymmetric JWT signing (see keys.signing). Tokens are signed with a rotating
+# RS256/EdDSA key and the public keys are published at /.well-known/jwks.json.
+# Set JWT_SIGNING_ALGORITHM=HS256 to keep issuing shared-secret tokens.
+JWT_SIGNING_ALGORITHM = config('JWT_SIGNING_ALGORITHM', default='RS256')
+JWT_KEYRING_TTL = config('JWT_KEYRING_TTL', default=300, cast=int)  # seconds
+# Accept HS256 tokens without a `kid` that were issued before the switch
+JWT_ACCEPT_LEGACY_HS256 = config('JWT_ACCEPT_LEGACY_HS256', default=True, cast=bool)
+
+# Login lockout (see users.lockout). Failed attempts are counted in the cache
+# over a sliding window per account and per client IP.
+LOGIN_LOCKOUT_THRESHOLD = config('LOGIN_LOCKOUT_THRESHOLD', default=10, cast=int)
+LOGIN_LOCKOUT_TIME = timedelta(minutes=config('LOGIN_LOCKOUT_MINUTES', default=15, cast=int))
+LOGIN_CAPTCHA_THRESHOLD = config('LOGIN_CAPTCHA_THRESHOLD', default=5, cast=int)
+LOGIN_IP_THRESHOLD = config('LOGIN_IP_THRESHOLD', default=50, cast=int)
+LOGIN_ATTEMPT_WINDOW = config('LOGIN_ATTEMPT_WINDOW', default=15 * 60, cast=int)  # seconds
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Centralized Authentication Service API',
     'DESCRIPTION': 'API for user identity, authentication, and multi-system role management.',
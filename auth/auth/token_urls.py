@@ -9,6 +9,7 @@ from rest_framework import serializers
 from drf_spectacular.utils import extend_schema, extend_schema_view
 from drf_spectacular.openapi import AutoSchema
 from users.views import CustomTokenObtainPairView
+from keys.views import jwks_view
 
 # Create custom views with tags for the standard JWT views
 @extend_schema_view(
@@ -27,6 +28,7 @@ class TokenRootSerializer(serializers.Serializer):
     obtain = serializers.URLField()
     refresh = serializers.URLField()
     verify = serializers.URLField()
+    jwks = serializers.URLField()
 
 @extend_schema(
     tags=['Tokens'], 
@@ -40,6 +42,7 @@ def token_root(request):
         "obtain": request.build_absolute_uri("obtain/"),
         "refresh": request.build_absolute_uri("refresh/"),
         "verify": request.build_absolute_uri("verify/"),
+        "jwks": request.build_absolute_uri("jwks/"),
     })
 
 urlpatterns = [
@@ -47,4 +50,5 @@ urlpatterns = [
     path('obtain/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),  # POST /token/obtain/
     path('refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),        # POST /token/refresh/
     path('verify/', CustomTokenVerifyView.as_view(), name='token_verify'),           # POST /token/verify/
+    path('jwks/', jwks_view, name='token_jwks'),                                     # GET /token/jwks/
 ]
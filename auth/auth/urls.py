@@ -9,6 +9,7 @@ from rest_framework import serializers
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 from drf_spectacular.utils import extend_schema
 from users.views import CustomTokenObtainPairView, CookieLogoutView, UILogoutView, LoginView, request_otp_for_login
+from keys.views import jwks_view
 
 class APIRootSerializer(serializers.Serializer):
     api_v1 = serializers.URLField()
@@ -45,6 +46,9 @@ urlpatterns = [
     # Shortcut: Token obtain and logout at root level
     path('token/', CustomTokenObtainPairView.as_view(), name='root_token_obtain'),
     path('logout/', UILogoutView.as_view(), name='root_logout'),
+
+    # Public signing keys for local token verification by other services
+    path('.well-known/jwks.json', jwks_view, name='jwks'),
     # path('logout/', CookieLogoutView.as_view(), name='root_logout'),
     
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
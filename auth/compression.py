@@ -0,0 +1,101 @@
+"""
+gzip/brotli response compression above RESPONSE_COMPRESSION_MIN_SIZE, the same
+middleware as the HDTS backend's core.compression. Streaming responses are left
+alone; brotli is used only if the package is installed. Both codings are padded
+by a random length against BREACH-style attacks.
+"""
+import secrets
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+# Text formats worth compressing; images and archives are already compressed
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml', 'image/svg+xml')
+GZIP_MAX_RANDOM_BYTES = 100
+BROTLI_MAX_RANDOM_BYTES = 100
+BROTLI_QUALITY = 5
+
+
+def parse_accept_encoding(header):
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def choose_encoding(header):
+    codings = parse_accept_encoding(header or '')
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    wildcard = codings.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = codings.get(coding, wildcard)
+        # Ties go to the earlier (better) coding
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def brotli_compress(data, max_random_bytes=BROTLI_MAX_RANDOM_BYTES):
+    """brotli-compress ``data``, padded with fewer than ``max_random_bytes`` skipped bytes."""
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    size = secrets.randbelow(max_random_bytes) if max_random_bytes else 0
+    if not size:
+        return compressor.process(data) + compressor.finish()
+    # Metadata meta-block: ISLAST=0, MNIBBLES=0, reserved bit, MSKIPBYTES=1,
+    # then MSKIPLEN-1 in 8 bits, padded to a byte; then MSKIPLEN skipped bytes
+    header = (3 << 1) | (1 << 4) | ((size - 1) << 6)
+    padding = header.to_bytes(2, 'little') + b'a' * size
+    return compressor.process(data) + compressor.flush() + padding + compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli_compress(response.content)
+        else:
+            compressed = compress_string(response.content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        # The encoded body is a different representation; keep conditional GET working
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
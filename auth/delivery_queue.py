@@ -0,0 +1,323 @@
+"""
+Background delivery of notifications and emails.
+
+Request handlers enqueue and return immediately; a single daemon worker per
+process drains the queue. Each flush takes whatever is waiting (up to
+``DELIVERY_QUEUE_BATCH_SIZE`` jobs) and delivers it over one pooled HTTP
+session for the notification service and one SMTP connection for email.
+Failed jobs are retried with exponential backoff, and a circuit breaker per
+channel stops hammering a service that is down: while it is open, jobs are
+held back instead of spending their retry budget.
+
+The queue lives in memory, so anything still pending when the process exits
+is lost apart from what the exit hook manages to flush. Set
+``DELIVERY_QUEUE_ENABLED = False`` to deliver inline (management commands,
+scripts, tests).
+"""
+import atexit
+import heapq
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION = 'notification'
+EMAIL = 'email'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures and stays open for
+    ``reset_timeout`` seconds. After that a single trial batch is let through
+    (half-open); success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        return time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def retry_at(self):
+        if self.opened_at is None:
+            return time.monotonic()
+        return self.opened_at + self.reset_timeout
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("Delivery circuit '%s' closed", self.name)
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning("Delivery circuit '%s' opened after %s failures", self.name, self.failures)
+            self.opened_at = time.monotonic()
+
+
+class DeliveryJob:
+    __slots__ = ('kind', 'payload', 'description', 'attempts')
+
+    def __init__(self, kind, payload, description):
+        self.kind = kind
+        self.payload = payload
+        self.description = description
+        self.attempts = 0
+
+
+class RetryableError(Exception):
+    pass
+
+
+class DeliveryQueue:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._delayed = []  # heap of (due, seq, job)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._session = None
+        self._pending = 0
+        self._breakers = {
+            NOTIFICATION: CircuitBreaker(NOTIFICATION),
+            EMAIL: CircuitBreaker(EMAIL),
+        }
+
+    # Settings are read lazily so the module can be imported before Django
+    # is configured.
+    @property
+    def enabled(self):
+        return _setting('DELIVERY_QUEUE_ENABLED', True)
+
+    @property
+    def batch_size(self):
+        return _setting('DELIVERY_QUEUE_BATCH_SIZE', 50)
+
+    @property
+    def max_attempts(self):
+        return _setting('DELIVERY_QUEUE_MAX_ATTEMPTS', 5)
+
+    @property
+    def backoff_base(self):
+        return _setting('DELIVERY_QUEUE_BACKOFF_SECONDS', 1.0)
+
+    @property
+    def backoff_max(self):
+        return _setting('DELIVERY_QUEUE_BACKOFF_MAX_SECONDS', 60.0)
+
+    @property
+    def session(self):
+        """Keep-alive session shared by every notification request."""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({'Content-Type': 'application/json'})
+            self._session = session
+        return self._session
+
+    # -- producers --------------------------------------------------------
+
+    def enqueue_notification(self, url, payload, timeout, description=''):
+        job = DeliveryJob(NOTIFICATION, {'url': url, 'json': payload, 'timeout': timeout}, description)
+        return self._submit(job)
+
+    def enqueue_email(self, subject, message, recipient_list, from_email=None, description=''):
+        job = DeliveryJob(EMAIL, {
+            'subject': subject,
+            'message': message,
+            'recipient_list': list(recipient_list),
+            'from_email': from_email or _setting('DEFAULT_FROM_EMAIL', 'noreply@example.com'),
+        }, description)
+        return self._submit(job)
+
+    def _submit(self, job):
+        if not self.enabled:
+            # Inline delivery: one attempt, report the outcome to the caller
+            return not self._deliver([job])
+        self._ensure_worker()
+        with self._lock:
+            self._pending += 1
+        self._queue.put(job)
+        return True
+
+    # -- worker -----------------------------------------------------------
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='delivery-queue', daemon=True)
+                self._worker.start()
+
+    def _next_wait(self):
+        if not self._delayed:
+            return None
+        return max(0.0, self._delayed[0][0] - time.monotonic())
+
+    def _collect(self, block=True):
+        """Gather the next batch: due retries first, then fresh jobs."""
+        batch = []
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now and len(batch) < self.batch_size:
+            batch.append(heapq.heappop(self._delayed)[2])
+
+        if not batch and block:
+            try:
+                batch.append(self._queue.get(timeout=self._next_wait()))
+            except queue.Empty:
+                return self._collect(block=False)
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            # Only this thread touches the retry heap, so its growth tells us
+            # how many jobs of the batch are still outstanding.
+            delayed_before = len(self._delayed)
+            try:
+                for job in self._deliver(batch):
+                    self._schedule_retry(job)
+            except Exception:
+                logger.exception("Delivery worker failed on a batch of %s job(s)", len(batch))
+            finished = len(batch) - (len(self._delayed) - delayed_before)
+            with self._lock:
+                self._pending -= finished
+
+    def _schedule_retry(self, job, due=None):
+        if due is None:
+            job.attempts += 1
+            if job.attempts >= self.max_attempts:
+                logger.error("Giving up on %s '%s' after %s attempts", job.kind, job.description, job.attempts)
+                return
+            delay = min(self.backoff_max, self.backoff_base * (2 ** (job.attempts - 1)))
+            due = time.monotonic() + delay * random.uniform(0.5, 1.0)
+        heapq.heappush(self._delayed, (due, next(self._seq), job))
+
+    def _deliver(self, batch):
+        """Deliver a batch; returns the jobs that failed and should be retried."""
+        failed = []
+        for kind, sender in ((NOTIFICATION, self._send_notifications), (EMAIL, self._send_emails)):
+            jobs = [job for job in batch if job.kind == kind]
+            if not jobs:
+                continue
+            breaker = self._breakers[kind]
+            if not breaker.allow():
+                # Hold jobs until the breaker half-opens without using up attempts
+                if self.enabled:
+                    for job in jobs:
+                        self._schedule_retry(job, due=breaker.retry_at())
+                else:
+                    failed.extend(jobs)
+                continue
+            failed.extend(sender(jobs, breaker))
+        return failed
+
+    def _send_notifications(self, jobs, breaker):
+        failed = []
+        for index, job in enumerate(jobs):
+            if not breaker.allow():
+                # Breaker tripped mid-batch: hold the rest without using attempts
+                if self.enabled:
+                    for held in jobs[index:]:
+                        self._schedule_retry(held, due=breaker.retry_at())
+                else:
+                    failed.extend(jobs[index:])
+                break
+            try:
+                response = self.session.post(
+                    job.payload['url'],
+                    json=job.payload['json'],
+                    timeout=job.payload['timeout'],
+                )
+                if response.status_code >= 500:
+                    raise RetryableError(f"status {response.status_code}")
+                breaker.record_success()
+                if response.status_code == 200:
+                    logger.info(f"Notification '{job.description}' sent successfully")
+                else:
+                    # 4xx: the request itself is wrong, retrying will not help
+                    logger.error(f"Notification '{job.description}' rejected. "
+                                 f"Status: {response.status_code}, Response: {response.text}")
+            except (requests.exceptions.RequestException, RetryableError) as e:
+                breaker.record_failure()
+                logger.warning(f"Error sending notification '{job.description}': {str(e)}")
+                failed.append(job)
+        return failed
+
+    def _send_emails(self, jobs, breaker):
+        from django.core.mail import EmailMessage, get_connection
+
+        try:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+        except Exception as e:
+            breaker.record_failure()
+            logger.warning(f"Could not open email connection: {str(e)}")
+            return list(jobs)
+
+        failed = []
+        try:
+            for job in jobs:
+                message = EmailMessage(
+                    subject=job.payload['subject'],
+                    body=job.payload['message'],
+                    from_email=job.payload['from_email'],
+                    to=job.payload['recipient_list'],
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                    breaker.record_success()
+                except Exception as e:
+                    breaker.record_failure()
+                    logger.warning(f"Failed to send email '{job.description}': {str(e)}")
+                    failed.append(job)
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        return failed
+
+    def flush(self, timeout=5.0):
+        """Deliver whatever is queued right now, waiting at most ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        while self._pending > 0 and time.monotonic() < deadline:
+            if self._worker is None or not self._worker.is_alive():
+                return
+            time.sleep(0.05)
+
+
+delivery_queue = DeliveryQueue()
+atexit.register(delivery_queue.flush)
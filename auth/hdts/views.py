@@ -14,6 +14,8 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from users.serializers import UserProfileSerializer
+from users.pagination import DirectoryCursorPagination, get_requested_fields
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from system_roles.models import UserSystemRole
 
@@ -119,6 +121,40 @@ def update_user_status_view(request, user_id):
     return redirect('hdts:manage_pending_users') # Redirect back to the management page
 
 
+def _hdts_directory_response(request, queryset):
+    """
+    Serialize a user directory query with a fixed number of queries.
+
+    Supports ``?fields=`` to trim the payload and opt-in cursor pagination
+    (``?cursor=``/``?page_size=``). Without pagination parameters the full list
+    is returned together with its count, as before.
+    """
+    fields = get_requested_fields(request)
+    if fields is None or 'system_roles' in fields:
+        queryset = queryset.prefetch_related(Prefetch(
+            'system_roles',
+            queryset=UserSystemRole.objects.select_related('system', 'role'),
+        ))
+    context = {'request': request, 'fields': fields}
+
+    paginator = DirectoryCursorPagination()
+    if paginator.is_requested(request):
+        page = paginator.paginate_queryset(queryset, request)
+        serializer = UserProfileSerializer(page, many=True, context=context)
+        return Response({
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'users': serializer.data,
+        })
+
+    users = list(queryset.order_by('id'))
+    serializer = UserProfileSerializer(users, many=True, context=context)
+    return Response({
+        'count': len(users),
+        'users': serializer.data
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_pending_users_api(request):
@@ -126,18 +162,15 @@ def get_pending_users_api(request):
     API endpoint to get pending HDTS Employee registrations.
     Returns JSON data for frontend consumption.
     """
-    # Find users who have the Employee role in the 'hdts' system AND have status='Pending'
+    # Find users who have the Employee role in the 'hdts' system AND have status='Pending'.
+    # A subquery instead of join + distinct keeps the row count exact for paging.
     pending_users = User.objects.filter(
         status='Pending',
-        system_roles__system__slug='hdts',
-        system_roles__role__name='Employee'
-    ).distinct()
-    
-    serializer = UserProfileSerializer(pending_users, many=True)
-    return Response({
-        'count': pending_users.count(),
-        'users': serializer.data
-    })
+        id__in=UserSystemRole.objects.filter(
+            system__slug='hdts', role__name='Employee'
+        ).values('user_id'),
+    )
+    return _hdts_directory_response(request, pending_users)
 
 
 @api_view(['GET'])
@@ -149,14 +182,9 @@ def get_all_hdts_users_api(request):
     """
     # Find all users who have any role in the 'hdts' system
     hdts_users = User.objects.filter(
-        system_roles__system__slug='hdts'
-    ).distinct()
-    
-    serializer = UserProfileSerializer(hdts_users, many=True)
-    return Response({
-        'count': hdts_users.count(),
-        'users': serializer.data
-    })
+        id__in=UserSystemRole.objects.filter(system__slug='hdts').values('user_id')
+    )
+    return _hdts_directory_response(request, hdts_users)
 
     user_to_update.save(update_fields=['status']) # Only save the status field
 
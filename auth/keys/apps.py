@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class KeysConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'keys'
+
+    def ready(self):
+        from django.conf import settings
+
+        # Route every simplejwt token through the rotating key ring unless the
+        # deployment explicitly stays on the shared-secret algorithm.
+        if getattr(settings, 'JWT_SIGNING_ALGORITHM', 'HS256') != 'HS256':
+            from rest_framework_simplejwt.tokens import Token
+            from .signing import token_backend
+            Token._token_backend = token_backend
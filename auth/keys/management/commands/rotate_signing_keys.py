@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from keys.models import SigningKey
+from keys.signing import retention_window
+
+
+class Command(BaseCommand):
+    help = 'Generate a new JWT signing key and retire the current one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--algorithm',
+            choices=[choice for choice, _ in SigningKey.ALGORITHM_CHOICES],
+            default=None,
+            help='Algorithm for the new key (defaults to JWT_SIGNING_ALGORITHM).',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete retired keys whose tokens have all expired.',
+        )
+
+    def handle(self, *args, **options):
+        algorithm = options['algorithm'] or getattr(settings, 'JWT_SIGNING_ALGORITHM', 'RS256')
+        if algorithm == 'HS256':
+            algorithm = 'RS256'
+
+        with transaction.atomic():
+            new_key = SigningKey.generate(algorithm)
+            retired = SigningKey.objects.filter(retired_at__isnull=True).exclude(pk=new_key.pk)
+            retired_count = retired.update(retired_at=timezone.now())
+
+        # update() skips post_save, so refresh this process's key ring explicitly.
+        from keys.signing import keyring
+        keyring.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'New {algorithm} signing key {new_key.kid} is now current; {retired_count} key(s) retired.'
+        ))
+
+        if options['prune']:
+            cutoff = timezone.now() - retention_window()
+            deleted, _ = SigningKey.objects.filter(retired_at__lt=cutoff).delete()
+            self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} expired signing key(s).'))
@@ -1,5 +1,8 @@
 import secrets
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 
 class APIKey(models.Model):
     name = models.CharField(max_length=100)
@@ -14,3 +17,72 @@ class APIKey(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class SigningKey(models.Model):
+    """
+    Asymmetric key pair used to sign JWTs.
+
+    Exactly one key is current (active and not retired) and signs new tokens.
+    Retired keys stay published in the JWKS document until every token they
+    signed has expired, so consumers can keep verifying across a rotation.
+    """
+    ALGORITHM_CHOICES = [
+        ('RS256', 'RS256'),
+        ('EdDSA', 'EdDSA'),
+    ]
+
+    kid = models.CharField(max_length=32, unique=True, editable=False)
+    algorithm = models.CharField(max_length=10, choices=ALGORITHM_CHOICES, default='RS256')
+    private_key = models.TextField(editable=False)
+    public_key = models.TextField(editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    retired_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kid} ({self.algorithm})"
+
+    @classmethod
+    def generate(cls, algorithm='RS256'):
+        """Create and store a new key pair for the given algorithm."""
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+        if algorithm == 'RS256':
+            private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        elif algorithm == 'EdDSA':
+            private = ed25519.Ed25519PrivateKey.generate()
+        else:
+            raise ValueError(f"Unsupported signing algorithm: {algorithm}")
+
+        private_pem = private.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        ).decode()
+        public_pem = private.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        ).decode()
+
+        return cls.objects.create(
+            kid=secrets.token_hex(8),
+            algorithm=algorithm,
+            private_key=private_pem,
+            public_key=public_pem,
+        )
+
+    def retire(self):
+        self.retired_at = timezone.now()
+        self.save(update_fields=['retired_at'])
+
+
+@receiver([post_save, post_delete], sender=SigningKey)
+def invalidate_signing_keyring(sender, **kwargs):
+    """Drop this process's cached keys so the change is picked up immediately."""
+    from .signing import keyring
+    keyring.invalidate()
@@ -0,0 +1,200 @@
+"""
+JWT signing with rotating asymmetric keys.
+
+Tokens are signed with the current ``SigningKey`` and carry its ``kid`` in the
+header. Any service can verify them with the public half published at the JWKS
+endpoint, so consumers no longer need the auth service's secret or a network
+round-trip per request.
+"""
+import logging
+import threading
+import time
+
+import jwt
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from jwt import ExpiredSignatureError, InvalidAlgorithmError, InvalidTokenError
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+# Minimum gap between reloads triggered by an unknown ``kid`` so that tokens
+# with made-up key ids cannot turn every request into a database query.
+UNKNOWN_KID_RELOAD_INTERVAL = 10
+
+
+def retention_window():
+    """How long a retired key must stay published: the longest token lifetime."""
+    return max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+
+
+class SigningKeyRing:
+    """
+    Process-local cache of the signing keys.
+
+    Keys are parsed once and reused until ``JWT_KEYRING_TTL`` seconds pass, a
+    ``SigningKey`` is saved in this process, or a token presents a ``kid`` we
+    have not seen yet (a key rotated by another worker).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._signing = None
+        self._verifying = {}
+        self._jwks = {'keys': []}
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'JWT_KEYRING_TTL', 300)
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _age(self):
+        if self._loaded_at is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    def _load(self):
+        from .models import SigningKey
+
+        cutoff = timezone.now() - retention_window()
+        keys = list(
+            SigningKey.objects.filter(is_active=True)
+            .filter(Q(retired_at__isnull=True) | Q(retired_at__gt=cutoff))
+            .order_by('-created_at')
+        )
+        current = next((key for key in keys if key.retired_at is None), None)
+        if current is None:
+            algorithm = getattr(settings, 'JWT_SIGNING_ALGORITHM', 'RS256')
+            current = SigningKey.generate(algorithm)
+            keys.insert(0, current)
+            logger.info("Generated initial %s signing key %s", algorithm, current.kid)
+
+        verifying = {}
+        jwks = []
+        for key in keys:
+            jws_alg = jwt.get_algorithm_by_name(key.algorithm)
+            public_key = jws_alg.prepare_key(key.public_key)
+            verifying[key.kid] = (key.algorithm, public_key)
+            jwk = jws_alg.to_jwk(public_key, as_dict=True)
+            jwk.update({'kid': key.kid, 'alg': key.algorithm, 'use': 'sig'})
+            jwks.append(jwk)
+
+        signing_alg = jwt.get_algorithm_by_name(current.algorithm)
+        self._signing = (current.kid, current.algorithm, signing_alg.prepare_key(current.private_key))
+        self._verifying = verifying
+        self._jwks = {'keys': jwks}
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self, force=False):
+        age = self._age()
+        if not force and age is not None and age < self.ttl:
+            return
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock.
+            age = self._age()
+            if age is None or age >= self.ttl or (force and age >= UNKNOWN_KID_RELOAD_INTERVAL):
+                self._load()
+
+    def get_signing_key(self):
+        """Return ``(kid, algorithm, key)`` for the key that signs new tokens."""
+        self._ensure_loaded()
+        return self._signing
+
+    def get_verifying_key(self, kid):
+        """Return ``(algorithm, key)`` for ``kid``, or ``None`` if it is unknown."""
+        self._ensure_loaded()
+        if kid not in self._verifying:
+            self._ensure_loaded(force=True)
+        return self._verifying.get(kid)
+
+    def get_jwks(self):
+        self._ensure_loaded()
+        return self._jwks
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    simplejwt token backend that signs with the key ring.
+
+    Tokens without a ``kid`` header are legacy HS256 tokens issued before the
+    switch; they are still accepted through the parent backend while
+    ``JWT_ACCEPT_LEGACY_HS256`` is on so existing sessions survive a deploy.
+    """
+
+    def __init__(self, keyring, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.keyring = keyring
+
+    def encode(self, payload):
+        kid, algorithm, key = self.keyring.get_signing_key()
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(
+            jwt_payload,
+            key,
+            algorithm=algorithm,
+            headers={'kid': kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            header = jwt.get_unverified_header(token)
+        except InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid")) from ex
+
+        kid = header.get('kid')
+        if not kid:
+            if getattr(settings, 'JWT_ACCEPT_LEGACY_HS256', True):
+                return super().decode(token, verify)
+            raise TokenBackendError(_("Token is invalid"))
+
+        entry = self.keyring.get_verifying_key(kid)
+        if entry is None:
+            raise TokenBackendError(_("Token is invalid"))
+        algorithm, key = entry
+
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    'verify_aud': self.audience is not None,
+                    'verify_signature': verify,
+                },
+            )
+        except InvalidAlgorithmError as ex:
+            raise TokenBackendError(_("Invalid algorithm specified")) from ex
+        except ExpiredSignatureError as ex:
+            raise TokenBackendExpiredToken(_("Token is expired")) from ex
+        except InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid")) from ex
+
+
+keyring = SigningKeyRing()
+
+token_backend = KeyRingTokenBackend(
+    keyring,
+    api_settings.ALGORITHM,
+    api_settings.SIGNING_KEY,
+    api_settings.VERIFYING_KEY,
+    api_settings.AUDIENCE,
+    api_settings.ISSUER,
+    None,
+    api_settings.LEEWAY,
+    api_settings.JSON_ENCODER,
+)
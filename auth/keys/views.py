@@ -1,9 +1,33 @@
+from django.conf import settings
 from rest_framework import viewsets
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema
 from .models import APIKey
 from .serializers import APIKeySerializer
-from rest_framework.permissions import IsAdminUser
+from .signing import keyring
+from rest_framework.permissions import AllowAny, IsAdminUser
 
 class APIKeyViewSet(viewsets.ModelViewSet):
     queryset = APIKey.objects.all()
     serializer_class = APIKeySerializer
     permission_classes = [IsAdminUser]
+
+
+@extend_schema(
+    tags=['Tokens'],
+    summary="JSON Web Key Set",
+    description="Public keys used to sign access and refresh tokens, keyed by `kid`. Consumers cache this document and verify tokens locally.",
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def jwks_view(request):
+    """Publish the public signing keys (current and recently retired)."""
+    if getattr(settings, 'JWT_SIGNING_ALGORITHM', 'HS256') == 'HS256':
+        document = {'keys': []}
+    else:
+        document = keyring.get_jwks()
+    response = Response(document)
+    response['Cache-Control'] = f"public, max-age={keyring.ttl}"
+    return response
@@ -3,6 +3,8 @@ import logging
 from django.conf import settings
 from typing import Dict, Any, Optional
 
+from delivery_queue import delivery_queue
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,7 +41,7 @@ class NotificationClient:
                          notification_type: str, context_data: Optional[Dict[str, Any]] = None,
                          ip_address: Optional[str] = None, user_agent: Optional[str] = None) -> bool:
         """
-        Send a notification request to the notification service
+        Queue a notification request for the notification service
         
         Args:
             user_id: UUID of the user
@@ -51,44 +53,30 @@ class NotificationClient:
             user_agent: User agent string
             
         Returns:
-            bool: True if notification was sent successfully, False otherwise
+            bool: True if the notification was queued for delivery
         """
         if not self.enabled:
             logger.info("Notifications are disabled, skipping notification send")
             return True
             
-        try:
-            payload = {
-                'user_id': str(user_id),
-                'user_email': user_email,
-                'user_name': user_name or '',
-                'notification_type': notification_type,
-                'context_data': context_data or {},
-                'ip_address': ip_address,
-                'user_agent': user_agent or '',
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/api/v1/send/",
-                json=payload,
-                timeout=self.timeout,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Notification '{notification_type}' sent successfully to {user_email}")
-                return True
-            else:
-                logger.error(f"Failed to send notification '{notification_type}' to {user_email}. "
-                           f"Status: {response.status_code}, Response: {response.text}")
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Network error sending notification '{notification_type}' to {user_email}: {str(e)}")
-            return False
-        except Exception as e:
-            logger.error(f"Unexpected error sending notification '{notification_type}' to {user_email}: {str(e)}")
-            return False
+        payload = {
+            'user_id': str(user_id),
+            'user_email': user_email,
+            'user_name': user_name or '',
+            'notification_type': notification_type,
+            'context_data': context_data or {},
+            'ip_address': ip_address,
+            'user_agent': user_agent or '',
+        }
+        
+        # Delivery (pooled session, batching, retries, circuit breaker) happens
+        # on the delivery queue worker so callers never wait on the service
+        return delivery_queue.enqueue_notification(
+            url=f"{self.base_url}/api/v1/send/",
+            payload=payload,
+            timeout=self.timeout,
+            description=f"{notification_type} to {user_email}",
+        )
     
     def send_account_locked_notification(self, user, failed_attempts: int = None, 
                                        lockout_duration: str = "15 minutes", 
@@ -169,7 +157,7 @@ class NotificationClient:
             if limit:
                 params['limit'] = limit
             
-            response = requests.get(
+            response = delivery_queue.session.get(
                 f"{self.base_url}/api/v1/history/",
                 params=params,
                 timeout=self.timeout
@@ -193,7 +181,7 @@ class NotificationClient:
         Check if the notification service is healthy
         """
         try:
-            response = requests.get(
+            response = delivery_queue.session.get(
                 f"{self.base_url}/api/v1/health/",
                 timeout=5
             )
@@ -1,7 +1,8 @@
 from rest_framework import permissions
-from system_roles.models import UserSystemRole
+from keys.models import APIKey
 from roles.models import Role
 from systems.models import System
+from system_roles.resolution import get_admin_system_ids, get_admin_system_slugs, get_user_roles
 
 
 class IsSystemAdminOrSuperUser(permissions.BasePermission):
@@ -28,7 +29,7 @@ class IsSystemAdminOrSuperUser(permissions.BasePermission):
         if request.user.is_superuser:
             return True
         
-        # Get user's administered systems
+        # Get user's administered systems (ids, resolved once per request)
         admin_systems = self._get_user_admin_systems(request.user)
         
         # For write operations (POST, PUT, PATCH, DELETE), be more restrictive
@@ -37,7 +38,7 @@ class IsSystemAdminOrSuperUser(permissions.BasePermission):
         # Check object access based on object type
         if hasattr(obj, 'system'):
             # Object belongs to a system (Role, UserSystemRole)
-            system_access = obj.system in admin_systems
+            system_access = obj.system_id in admin_systems
             
             # Additional restrictions for write operations on certain objects
             if is_write_operation and isinstance(obj, Role):
@@ -49,7 +50,7 @@ class IsSystemAdminOrSuperUser(permissions.BasePermission):
             
         elif isinstance(obj, System):
             # System object itself
-            system_access = obj in admin_systems
+            system_access = obj.id in admin_systems
             
             # System admins can only read/update their systems, not delete
             if is_write_operation and request.method == 'DELETE':
@@ -59,25 +60,18 @@ class IsSystemAdminOrSuperUser(permissions.BasePermission):
             
         elif hasattr(obj, 'system_roles'):
             # User object - check if admin of any system the user belongs to
-            user_systems = set(usr.system for usr in obj.system_roles.all())
+            user_systems = {a.system_id for a in get_user_roles(obj)}
             return bool(admin_systems.intersection(user_systems))
         
         return False
     
     def _is_system_admin(self, user):
         """Check if user is an admin of any system"""
-        return UserSystemRole.objects.filter(
-            user=user,
-            role__name='Admin'
-        ).exists()
+        return bool(get_admin_system_ids(user))
     
     def _get_user_admin_systems(self, user):
-        """Get all systems where user is an admin"""
-        admin_roles = UserSystemRole.objects.filter(
-            user=user,
-            role__name='Admin'
-        ).select_related('system')
-        return set(role.system for role in admin_roles)
+        """Get the ids of all systems where user is an admin"""
+        return get_admin_system_ids(user)
 
 
 class IsSystemAdminOrSuperUserForSystem(permissions.BasePermission):
@@ -98,15 +92,7 @@ class IsSystemAdminOrSuperUserForSystem(permissions.BasePermission):
         if not system_slug:
             return False
         
-        try:
-            system = System.objects.get(slug=system_slug)
-            return UserSystemRole.objects.filter(
-                user=request.user,
-                system=system,
-                role__name='Admin'
-            ).exists()
-        except System.DoesNotExist:
-            return False
+        return system_slug in get_admin_system_slugs(request.user)
 
 
 class CanCreateForSystem(permissions.BasePermission):
@@ -127,21 +113,34 @@ class CanCreateForSystem(permissions.BasePermission):
             system_id = request.data.get('system')
             if system_id:
                 try:
-                    system = System.objects.get(id=system_id)
-                    return UserSystemRole.objects.filter(
-                        user=request.user,
-                        system=system,
-                        role__name='Admin'
-                    ).exists()
-                except System.DoesNotExist:
+                    return int(system_id) in get_admin_system_ids(request.user)
+                except (TypeError, ValueError):
                     return False
         
         # For other methods, fall back to basic admin check
-        return UserSystemRole.objects.filter(
-            user=request.user,
-            role__name='Admin'
-        ).exists()
+        return bool(get_admin_system_ids(request.user))
+
+
+
+class HasServiceAPIKey(permissions.BasePermission):
+    """
+    Permission for service-to-service endpoints (e.g. TTS).
+    Allows access with an active APIKey from the keys app, sent as
+    ``X-API-Key: <key>`` or ``Authorization: Api-Key <key>``, or to superusers.
+    """
 
+    def has_permission(self, request, view):
+        if request.user and request.user.is_authenticated and request.user.is_superuser:
+            return True
+
+        key = request.headers.get('X-API-Key')
+        if not key:
+            scheme, _, value = request.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() == 'api-key':
+                key = value.strip()
+        if not key:
+            return False
+        return APIKey.objects.filter(key=key, is_active=True).exists()
 
 def filter_queryset_by_system_access(queryset, user, system_field='system'):
     """
@@ -159,10 +158,7 @@ def filter_queryset_by_system_access(queryset, user, system_field='system'):
         return queryset
     
     # Get systems where user is admin
-    admin_systems = UserSystemRole.objects.filter(
-        user=user,
-        role__name='Admin'
-    ).values_list('system_id', flat=True)
+    admin_systems = get_admin_system_ids(user)
     
     # Filter by systems user can access
     filter_kwargs = {f'{system_field}__in': admin_systems}
@@ -184,10 +180,7 @@ def filter_users_by_system_access(queryset, user):
         return queryset
     
     # Get systems where requesting user is admin
-    admin_systems = UserSystemRole.objects.filter(
-        user=user,
-        role__name='Admin'
-    ).values_list('system_id', flat=True)
+    admin_systems = get_admin_system_ids(user)
     
     # Return users who have roles in these systems
     return queryset.filter(
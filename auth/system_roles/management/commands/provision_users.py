@@ -0,0 +1,76 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from delivery_queue import delivery_queue
+from roles.models import Role
+from system_roles.provisioning import USER_FIELDS, provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        'Create users in bulk from a CSV file and assign them a role. The CSV '
+        'needs an "email" column; first_name, middle_name, last_name, suffix, '
+        'phone_number, department and password are optional. Users without a '
+        'password get a random temporary one in their invitation email.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV file with one user per row.')
+        parser.add_argument('--system', required=True, help='System slug, e.g. hdts or tts.')
+        parser.add_argument('--role', required=True, help='Role name within the system, e.g. Employee.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users inserted per transaction.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Password hashing processes (defaults to PROVISIONING_HASH_WORKERS, or half the CPU count up to 4).',
+        )
+        parser.add_argument('--no-email', action='store_true', help='Do not send invitation emails.')
+
+    def handle(self, *args, **options):
+        try:
+            role = Role.objects.select_related('system').get(
+                system__slug=options['system'], name__iexact=options['role']
+            )
+        except Role.DoesNotExist:
+            raise CommandError(f"Role '{options['role']}' does not exist in system '{options['system']}'.")
+
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as fh:
+                reader = csv.DictReader(fh)
+                if 'email' not in (reader.fieldnames or []):
+                    raise CommandError('The CSV file needs an "email" column.')
+                columns = ('email', 'password') + USER_FIELDS
+                rows = [{key: (row.get(key) or '').strip() for key in columns if row.get(key)} for row in reader]
+        except OSError as e:
+            raise CommandError(f"Could not read {options['csv_file']}: {e}")
+
+        self.stdout.write(f"Provisioning {len(rows)} user(s) as {role.name} in {role.system.name}...")
+        started = time.monotonic()
+
+        def progress(processed, total):
+            self.stdout.write(f"  {processed}/{total} rows processed ({time.monotonic() - started:.1f}s)")
+
+        summary = provision_users(
+            rows,
+            role,
+            send_invites=not options['no_email'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            progress=progress,
+        )
+
+        for error in summary['errors']:
+            self.stdout.write(self.style.WARNING(f"  Row {error['row'] + 1} ({error['email']}): {error['error']}"))
+
+        if not options['no_email'] and summary['created']:
+            self.stdout.write('Waiting for invitation emails to be sent...')
+            delivery_queue.flush(timeout=max(30.0, summary['created'] * 0.1))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started:.1f}s: {summary['created']} created, "
+            f"{summary['existing']} already existed, {summary['assigned']} role assignment(s) added, "
+            f"{len(summary['errors'])} skipped."
+        ))
@@ -1,5 +1,7 @@
 import uuid
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.timezone import now
 
 # Create your models here.
@@ -14,4 +16,18 @@ class UserSystemRole(models.Model):
         unique_together = ('user', 'system', 'role')  # Prevent duplicate assignments
 
     def __str__(self):
-        return f"{self.user.email} → {self.role.name} in {self.system.slug}"
\ No newline at end of file
+        return f"{self.user.email} → {self.role.name} in {self.system.slug}"
+
+
+@receiver([post_save, post_delete], sender=UserSystemRole)
+def invalidate_user_role_cache(sender, instance, **kwargs):
+    from .resolution import invalidate_user_roles
+    invalidate_user_roles(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender='roles.Role')
+@receiver([post_save, post_delete], sender='systems.System')
+def invalidate_role_cache(sender, **kwargs):
+    # Role and system names are denormalized into every cached assignment list
+    from .resolution import invalidate_all_roles
+    invalidate_all_roles()
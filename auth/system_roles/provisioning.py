@@ -0,0 +1,302 @@
+"""
+Bulk user provisioning.
+
+``provision_users`` onboards many users into one role at a time:
+
+* password hashes (Argon2, deliberately slow) are computed across a small
+  process pool instead of one after another in the request thread. The pool
+  spawns fresh interpreters rather than forking: jobs run on a thread of a
+  multithreaded web worker, and a forked child could inherit a lock some
+  other thread (the delivery-queue flusher, say) was holding;
+* company IDs come from a single block reservation;
+* users and their ``UserSystemRole`` rows are inserted with ``bulk_create``
+  in batches, one transaction per batch;
+* invitation emails go onto the delivery queue.
+
+Existing users (matched by email) are not touched apart from getting the role.
+Rows that would break a unique constraint (duplicate email in the input,
+phone number already in use) are skipped and reported instead of failing the
+whole import.
+
+``start_provisioning_job`` runs the same thing on a background thread and
+keeps its progress in the cache for ``get_provisioning_job``. The thread
+refreshes the job's ``heartbeat_at`` every HEARTBEAT_SECONDS; a queued or
+running job whose heartbeat is older than JOB_STALE_SECONDS lost its worker
+(a restart, a crash) and is reported as failed.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+logger = logging.getLogger(__name__)
+
+USER_FIELDS = ('first_name', 'middle_name', 'last_name', 'suffix', 'phone_number', 'department')
+
+JOB_KEY = 'provisioning:job:{job_id}'
+JOB_TIMEOUT = 24 * 60 * 60
+HEARTBEAT_SECONDS = 15
+JOB_STALE_SECONDS = 4 * HEARTBEAT_SECONDS
+
+# Below this many passwords a pool costs more to start than it saves
+MIN_POOL_SIZE = 16
+# Default pool size: half the CPUs, so request handling keeps the rest
+MAX_DEFAULT_WORKERS = 4
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _init_hash_worker(settings_module):
+    # Spawned workers start without Django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _hash_chunk(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def hash_passwords(passwords, workers=None, chunk_size=32):
+    """Hash ``passwords`` in order, spreading the work over a process pool."""
+    passwords = list(passwords)
+    workers = workers or _setting('PROVISIONING_HASH_WORKERS', None) or max(
+        1, min(MAX_DEFAULT_WORKERS, (os.cpu_count() or 1) // 2)
+    )
+    if workers <= 1 or len(passwords) < MIN_POOL_SIZE:
+        return _hash_chunk(passwords)
+
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_hash_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'auth.settings'),),
+    ) as pool:
+        hashed = []
+        for chunk in pool.map(_hash_chunk, chunks):
+            hashed.extend(chunk)
+    return hashed
+
+
+def _clean_rows(rows, errors):
+    """Normalize emails and drop duplicates within the input."""
+    from users.models import User
+
+    seen = set()
+    cleaned = []
+    for index, row in enumerate(rows):
+        email = User.objects.normalize_email((row.get('email') or '').strip())
+        if not email or '@' not in email:
+            errors.append({'row': index, 'email': email, 'error': 'A valid email is required.'})
+            continue
+        if email.lower() in seen:
+            errors.append({'row': index, 'email': email, 'error': 'Duplicate email in input.'})
+            continue
+        seen.add(email.lower())
+        cleaned.append((index, email, row))
+    return cleaned
+
+
+def _unique_usernames(emails):
+    """Email local part as the username, falling back to the full email when taken."""
+    from users.models import User
+
+    wanted = {email: email.split('@')[0] for email in emails}
+    taken = set(User.objects.filter(username__in=set(wanted.values())).values_list('username', flat=True))
+    usernames = {}
+    for email, username in wanted.items():
+        if username in taken:
+            username = email
+        taken.add(username)
+        usernames[email] = username
+    return usernames
+
+
+def provision_users(rows, role, approved_by=None, send_invites=True, batch_size=500,
+                    workers=None, progress=None):
+    """
+    Create users from ``rows`` (dicts with ``email`` and optional profile fields
+    and ``password``) and assign them ``role``.
+
+    ``progress(processed, total)`` is called after each batch. Returns a summary
+    dict with ``total``, ``created``, ``existing``, ``assigned`` and ``errors``.
+    """
+    from tts.assignment import membership
+    from users.id_allocator import reserve_company_ids
+    from users.models import User
+    from .models import UserSystemRole
+    from .resolution import invalidate_user_roles
+    from .serializers import send_invitation_email
+
+    rows = list(rows)
+    errors = []
+    cleaned = _clean_rows(rows, errors)
+    summary = {'total': len(rows), 'created': 0, 'existing': 0, 'assigned': 0, 'errors': errors}
+
+    def report(processed):
+        if progress:
+            progress(processed, len(rows))
+
+    # Existing users only get the role
+    emails = [email for _index, email, _row in cleaned]
+    existing = {}
+    for i in range(0, len(emails), batch_size):
+        existing.update(User.objects.filter(email__in=emails[i:i + batch_size]).values_list('email', 'id'))
+    summary['existing'] = len(existing)
+
+    new_rows = [item for item in cleaned if item[1] not in existing]
+    phones = [row.get('phone_number') for _index, _email, row in new_rows if row.get('phone_number')]
+    used_phones = set(User.objects.filter(phone_number__in=phones).values_list('phone_number', flat=True)) if phones else set()
+    accepted = []
+    for index, email, row in new_rows:
+        phone = row.get('phone_number') or None
+        if phone and phone in used_phones:
+            errors.append({'row': index, 'email': email, 'error': 'Phone number is already in use.'})
+            continue
+        if phone:
+            used_phones.add(phone)
+        accepted.append((index, email, row))
+
+    passwords = [row.get('password') or get_random_string(12) for _index, _email, row in accepted]
+    hashes = hash_passwords(passwords, workers=workers)
+    company_ids = reserve_company_ids(len(accepted)) if accepted else []
+    usernames = _unique_usernames([email for _index, email, _row in accepted])
+    now = timezone.now()
+
+    processed = len(rows) - len(accepted)
+    if processed:
+        report(processed)
+
+    for start in range(0, len(accepted), batch_size):
+        batch = accepted[start:start + batch_size]
+        users = [
+            User(
+                email=email,
+                username=usernames[email],
+                password=hashes[start + offset],
+                company_id=company_ids[start + offset],
+                is_active=True,
+                status='Approved',
+                approved_at=now,
+                approved_by=approved_by,
+                **{field: row.get(field) or (None if field in ('suffix', 'phone_number', 'department') else '')
+                   for field in USER_FIELDS},
+            )
+            for offset, (_index, email, row) in enumerate(batch)
+        ]
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            UserSystemRole.objects.bulk_create(
+                [UserSystemRole(user=user, system_id=role.system_id, role=role) for user in users],
+                ignore_conflicts=True,
+            )
+        summary['created'] += len(users)
+        summary['assigned'] += len(users)
+
+        if send_invites:
+            for offset, user in enumerate(users):
+                send_invitation_email(
+                    user=user,
+                    temp_password=passwords[start + offset],
+                    system_name=role.system.name,
+                    role_name=role.name,
+                )
+        processed += len(batch)
+        report(processed)
+
+    # Users that already existed get the role; no password or email for them
+    existing_ids = list(existing.values())
+    if existing_ids:
+        already = set(UserSystemRole.objects.filter(
+            user_id__in=existing_ids, system_id=role.system_id, role=role
+        ).values_list('user_id', flat=True))
+        to_assign = [user_id for user_id in existing_ids if user_id not in already]
+        UserSystemRole.objects.bulk_create(
+            [UserSystemRole(user_id=user_id, system_id=role.system_id, role=role) for user_id in to_assign],
+            ignore_conflicts=True,
+        )
+        summary['assigned'] += len(to_assign)
+        # bulk_create skips the post_save receivers that keep role caches fresh
+        for user_id in to_assign:
+            invalidate_user_roles(user_id)
+
+    if summary['assigned']:
+        membership.invalidate()
+    return summary
+
+
+def _save_job(job_id, state):
+    state['heartbeat_at'] = time.time()
+    cache.set(JOB_KEY.format(job_id=job_id), state, JOB_TIMEOUT)
+
+
+def get_provisioning_job(job_id):
+    state = cache.get(JOB_KEY.format(job_id=job_id))
+    if (
+        state is not None
+        and state['status'] in ('queued', 'running')
+        and time.time() - state.get('heartbeat_at', 0) > JOB_STALE_SECONDS
+    ):
+        state.update(status='failed', error='The provisioning worker stopped before the job finished.')
+        _save_job(job_id, state)
+    return state
+
+
+def start_provisioning_job(rows, role, approved_by=None, send_invites=True):
+    """Run ``provision_users`` on a background thread; returns the job id."""
+    job_id = uuid.uuid4().hex
+    state = {
+        'status': 'queued',
+        'total': len(rows),
+        'processed': 0,
+        'requested_by': getattr(approved_by, 'pk', None),
+    }
+    _save_job(job_id, state)
+
+    # The heartbeat thread saves the same state; one writer at a time
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def save(**changes):
+        with lock:
+            state.update(changes)
+            _save_job(job_id, state)
+
+    def update(processed, total):
+        save(status='running', processed=processed, total=total)
+
+    def heartbeat():
+        while not done.wait(HEARTBEAT_SECONDS):
+            save()
+
+    def run():
+        beat = threading.Thread(target=heartbeat, name=f'provisioning-{job_id[:8]}-heartbeat', daemon=True)
+        beat.start()
+        try:
+            summary = provision_users(rows, role, approved_by=approved_by,
+                                      send_invites=send_invites, progress=update)
+            result = dict(summary, status='completed', processed=summary['total'])
+        except Exception as e:
+            logger.exception("Bulk provisioning job %s failed", job_id)
+            result = {'status': 'failed', 'error': str(e)}
+        finally:
+            done.set()
+            beat.join()
+            connection.close()
+        save(**result)
+
+    threading.Thread(target=run, name=f'provisioning-{job_id[:8]}', daemon=True).start()
+    return job_id
@@ -0,0 +1,104 @@
+"""
+Role and system membership resolution.
+
+A user's role assignments are loaded with a single query, memoized on the user
+object for the rest of the request and cached across requests under a
+versioned key. Saving or deleting a ``UserSystemRole`` bumps that user's
+version; saving or deleting a ``Role`` or ``System`` bumps a global version
+(see the receivers in ``system_roles.models``). Stale entries are never read
+again and simply expire.
+
+Bulk ``QuerySet.update()``/``bulk_create()`` calls bypass signals, so callers
+that use them must call ``invalidate_user_roles``/``invalidate_all_roles``.
+"""
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+RoleAssignment = namedtuple(
+    'RoleAssignment',
+    ['system_id', 'system_slug', 'system_name', 'role_id', 'role_name', 'assigned_at', 'is_active'],
+)
+
+GLOBAL_VERSION_KEY = 'roles:version'
+USER_VERSION_KEY = 'roles:version:{user_id}'
+ASSIGNMENTS_KEY = 'roles:assignments:{user_id}:{global_version}:{user_version}'
+
+# Attribute used to memoize assignments on the user instance for one request
+_MEMO_ATTR = '_role_assignments'
+
+
+def _timeout():
+    return getattr(settings, 'ROLE_CACHE_TIMEOUT', 300)
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _load_assignments(user_id):
+    from .models import UserSystemRole
+
+    rows = UserSystemRole.objects.filter(user_id=user_id).values_list(
+        'system_id', 'system__slug', 'system__name', 'role_id', 'role__name', 'assigned_at', 'is_active'
+    ).order_by('id')
+    return [RoleAssignment(*row) for row in rows]
+
+
+def get_user_roles(user):
+    """Return the user's role assignments as a list of ``RoleAssignment``."""
+    if user is None or not getattr(user, 'pk', None):
+        return []
+
+    memo = getattr(user, _MEMO_ATTR, None)
+    if memo is not None:
+        return memo
+
+    key = ASSIGNMENTS_KEY.format(
+        user_id=user.pk,
+        global_version=_get_version(GLOBAL_VERSION_KEY),
+        user_version=_get_version(USER_VERSION_KEY.format(user_id=user.pk)),
+    )
+    assignments = cache.get(key)
+    if assignments is None:
+        assignments = _load_assignments(user.pk)
+        cache.set(key, assignments, _timeout())
+
+    setattr(user, _MEMO_ATTR, assignments)
+    return assignments
+
+
+def has_role(user, system_slug, role_name):
+    """Case-insensitive check for ``role_name`` in the system ``system_slug``."""
+    system_slug = system_slug.lower()
+    role_name = role_name.lower()
+    return any(
+        a.system_slug.lower() == system_slug and a.role_name.lower() == role_name
+        for a in get_user_roles(user)
+    )
+
+
+def get_admin_system_ids(user):
+    """Ids of the systems in which the user holds the 'Admin' role."""
+    return {a.system_id for a in get_user_roles(user) if a.role_name == 'Admin'}
+
+
+def get_admin_system_slugs(user):
+    """Slugs of the systems in which the user holds the 'Admin' role."""
+    return {a.system_slug for a in get_user_roles(user) if a.role_name == 'Admin'}
+
+
+def invalidate_user_roles(user_id):
+    """Make every cached copy of this user's assignments stale."""
+    cache.set(USER_VERSION_KEY.format(user_id=user_id), uuid.uuid4().hex, None)
+
+
+def invalidate_all_roles():
+    """Make every cached assignment list stale (a role or system changed)."""
+    cache.set(GLOBAL_VERSION_KEY, uuid.uuid4().hex, None)
@@ -6,8 +6,9 @@ from systems.models import System
 from django.utils.crypto import get_random_string
 from django.utils import timezone
 from users.models import SUFFIX_CHOICES as USER_SUFFIX_CHOICES
-from django.core.mail import send_mail
+from users.serializers import SelectableFieldsMixin
 from django.conf import settings
+from delivery_queue import delivery_queue
 
 
 def send_invitation_email(user, temp_password, system_name, role_name):
@@ -33,19 +34,14 @@ Best regards,
 Authentication Service Team
     '''
     
-    try:
-        send_mail(
-            subject=subject,
-            message=message.strip(),
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com'),
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        # Log the error in production
-        print(f"Failed to send invitation email to {user.email}: {str(e)}")
-        return False
+    # Queued; the delivery worker sends it and retries on SMTP failures
+    return delivery_queue.enqueue_email(
+        subject=subject,
+        message=message.strip(),
+        recipient_list=[user.email],
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com'),
+        description=f"invitation email to {user.email}",
+    )
 
 
 # New: serializer to represent full user details safely (read-only)
@@ -320,7 +316,50 @@ class AdminInviteUserSerializer(serializers.Serializer):
         }
 
 
-class SystemUsersSerializer(serializers.ModelSerializer):
+class BulkInviteUserRowSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    first_name = serializers.CharField(required=False, allow_blank=True)
+    middle_name = serializers.CharField(required=False, allow_blank=True)
+    last_name = serializers.CharField(required=False, allow_blank=True)
+    suffix = serializers.ChoiceField(
+        choices=[('', 'None')] + USER_SUFFIX_CHOICES,
+        required=False,
+        allow_null=True,
+        allow_blank=True
+    )
+    phone_number = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True)
+    department = serializers.ChoiceField(
+        choices=[
+            ('IT Department', 'IT Department'),
+            ('Asset Department', 'Asset Department'),
+            ('Budget Department', 'Budget Department'),
+        ],
+        required=False,
+        allow_null=True,
+        allow_blank=True
+    )
+
+
+class BulkInviteUserSerializer(serializers.Serializer):
+    """Invite many users into one role; processed by system_roles.provisioning."""
+    role_id = serializers.IntegerField()
+    send_invites = serializers.BooleanField(default=True)
+    users = BulkInviteUserRowSerializer(many=True, allow_empty=False)
+
+    def validate_role_id(self, value):
+        try:
+            return Role.objects.select_related('system').get(id=value)
+        except Role.DoesNotExist:
+            raise serializers.ValidationError("Role does not exist.")
+
+    def validate_users(self, value):
+        max_rows = getattr(settings, 'PROVISIONING_MAX_ROWS', 10000)
+        if len(value) > max_rows:
+            raise serializers.ValidationError(f"At most {max_rows} users can be invited at once.")
+        return value
+
+
+class SystemUsersSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     """Serializer for listing users of a specific system with their roles."""
     id = serializers.IntegerField(source='user.id', read_only=True)
     email = serializers.EmailField(source='user.email', read_only=True)
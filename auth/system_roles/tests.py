@@ -1,3 +1,36 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.test import SimpleTestCase
+
+from . import provisioning
+
+
+class HashPasswordsTests(SimpleTestCase):
+    def test_spawned_pool_hashes_in_order(self):
+        passwords = [f'password-{i}' for i in range(provisioning.MIN_POOL_SIZE)]
+        with mock.patch.object(provisioning, 'ProcessPoolExecutor', wraps=provisioning.ProcessPoolExecutor) as pool:
+            hashes = provisioning.hash_passwords(passwords, workers=2, chunk_size=8)
+        self.assertEqual(pool.call_args.kwargs['mp_context'].get_start_method(), 'spawn')
+        self.assertEqual(pool.call_args.kwargs['max_workers'], 2)
+        self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+
+    def test_default_pool_leaves_cpus_for_requests(self):
+        with mock.patch.object(provisioning.os, 'cpu_count', return_value=32), \
+                mock.patch.object(provisioning, 'ProcessPoolExecutor') as pool:
+            pool.return_value.__enter__.return_value.map.return_value = []
+            provisioning.hash_passwords(['x'] * 1000)
+        self.assertEqual(pool.call_args.kwargs['max_workers'], provisioning.MAX_DEFAULT_WORKERS)
+
+
+class ProvisioningJobTests(SimpleTestCase):
+    def test_job_without_heartbeat_is_reported_failed(self):
+        job_id = 'a' * 32
+        provisioning._save_job(job_id, {'status': 'running', 'total': 10, 'processed': 3})
+        self.assertEqual(provisioning.get_provisioning_job(job_id)['status'], 'running')
+
+        with mock.patch.object(provisioning.time, 'time', return_value=time.time() + provisioning.JOB_STALE_SECONDS + 1):
+            job = provisioning.get_provisioning_job(job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(provisioning.get_provisioning_job(job_id)['status'], 'failed')
@@ -5,6 +5,7 @@ from rest_framework.decorators import action
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
 from drf_spectacular.openapi import OpenApiTypes
 from django.shortcuts import get_object_or_404
+from django.db.models import F
 
 from .models import UserSystemRole
 from .serializers import (
@@ -12,10 +13,15 @@ from .serializers import (
     AdminInviteUserSerializer, 
     SystemUsersSerializer,
     CreateUserSystemRoleSerializer,
-    SystemRoleListSerializer
+    SystemRoleListSerializer,
+    BulkInviteUserSerializer
 )
+from .provisioning import get_provisioning_job, start_provisioning_job
+from renderers import ORJSONParser
+from .resolution import get_admin_system_ids
 from systems.models import System
 from roles.models import Role
+from users.pagination import SystemUsersCursorPagination, get_requested_fields
 from permissions import IsSystemAdminOrSuperUser, IsSystemAdminOrSuperUserForSystem, filter_queryset_by_system_access
 
 
@@ -228,7 +234,9 @@ class UserSystemRoleViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema_view(
-    create=extend_schema(tags=['System Roles'], summary="Invite user to system", description="Admin can invite a new user and assign them to a role in a system")
+    create=extend_schema(tags=['System Roles'], summary="Invite user to system", description="Admin can invite a new user and assign them to a role in a system"),
+    bulk=extend_schema(tags=['System Roles'], summary="Bulk invite users", description="Start a background job that creates many users and assigns them one role"),
+    bulk_status=extend_schema(tags=['System Roles'], summary="Bulk invite progress", description="Progress and summary of a bulk invite job")
 )
 class AdminInviteUserViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     """
@@ -273,6 +281,43 @@ class AdminInviteUserViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
             "system": result["assigned_role"].system.slug
         }, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='bulk',
+            serializer_class=BulkInviteUserSerializer, parser_classes=[ORJSONParser])
+    def bulk(self, request):
+        """
+        Invite many users into one role. Runs in the background; poll the
+        returned status URL for progress and the final summary.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        role = serializer.validated_data['role_id']
+
+        if not request.user.is_superuser and role.system_id not in get_admin_system_ids(request.user):
+            return Response(
+                {"error": "Access denied to this system"}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        job_id = start_provisioning_job(
+            serializer.validated_data['users'],
+            role,
+            approved_by=request.user,
+            send_invites=serializer.validated_data['send_invites'],
+        )
+        return Response({
+            "job_id": job_id,
+            "status_url": request.build_absolute_uri(f"{job_id}/"),
+            "total": len(serializer.validated_data['users']),
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'bulk/(?P<job_id>[0-9a-f]{32})')
+    def bulk_status(self, request, job_id=None):
+        """Progress of a bulk invite job started by this user."""
+        job = get_provisioning_job(job_id)
+        if job is None or (not request.user.is_superuser and job.get('requested_by') != request.user.pk):
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({key: value for key, value in job.items() if key != 'requested_by'})
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -322,12 +367,22 @@ class SystemUsersViewSet(viewsets.ReadOnlyModelViewSet):
         if system_slug:
             return UserSystemRole.objects.filter(
                 system__slug=system_slug
-            ).select_related('user', 'role', 'system').order_by('user__email')
+            ).select_related('user', 'role', 'system').annotate(
+                user_email=F('user__email')
+            ).order_by('user_email', 'id')
         return UserSystemRole.objects.none()
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = get_requested_fields(self.request)
+        return context
+
     def list(self, request, *args, **kwargs):
         """
         List all users for a specific system.
+
+        Pass ``?cursor=``/``?page_size=`` for cursor pagination and
+        ``?fields=`` to limit the returned fields.
         """
         system_slug = kwargs.get('system_slug')
         if not system_slug:
@@ -338,16 +393,29 @@ class SystemUsersViewSet(viewsets.ReadOnlyModelViewSet):
         
         # Verify system exists
         system = get_object_or_404(System, slug=system_slug)
+        system_data = {
+            "id": system.id,
+            "name": system.name,
+            "slug": system.slug
+        }
         
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        paginator = SystemUsersCursorPagination()
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            serializer = self.get_serializer(page, many=True)
+            return Response({
+                "system": system_data,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+                "users": serializer.data
+            }, status=status.HTTP_200_OK)
+
+        rows = list(queryset)
+        serializer = self.get_serializer(rows, many=True)
         
         return Response({
-            "system": {
-                "id": system.id,
-                "name": system.name,
-                "slug": system.slug
-            },
-            "users_count": queryset.count(),
+            "system": system_data,
+            "users_count": len(rows),
             "users": serializer.data
         }, status=status.HTTP_200_OK)
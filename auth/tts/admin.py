@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import AssigneeLoad
 
 # Register your models here.
+@admin.register(AssigneeLoad)
+class AssigneeLoadAdmin(admin.ModelAdmin):
+    list_display = ('user', 'role', 'open_assignments', 'last_assigned_at')
+    list_filter = ('role',)
+    search_fields = ('user__email',)
+    raw_id_fields = ('user', 'role')
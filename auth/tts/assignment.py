@@ -0,0 +1,162 @@
+"""
+Assignee selection for TTS.
+
+``membership`` keeps an in-memory map of TTS role -> member user ids, built
+with one query and rebuilt when the shared membership version changes. Role
+assignment, role and system changes bump the version (see the receivers in
+``tts.models``), so with a shared cache (Redis) every worker picks up a change
+on its next call; with a per-process cache the index is also rebuilt every
+``TTS_MEMBERSHIP_INDEX_TTL`` seconds.
+
+The selection state lives in the database, so every TTS worker and every auth
+worker sees the same cursor:
+
+* round robin draws the next number from an ``IdSequence`` row per role
+  (``users.id_allocator.reserve``) and picks ``members[n % len(members)]``;
+* least loaded picks the member with the fewest open assignments in
+  ``AssigneeLoad`` and claims it with a conditional UPDATE, retrying if
+  another worker claimed the same row first.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+TTS_SYSTEM_SLUG = 'tts'
+MEMBERSHIP_VERSION_KEY = 'tts:membership:version'
+ROUND_ROBIN_SEQUENCE = 'tts:round-robin:{role_id}'
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+STRATEGIES = (ROUND_ROBIN, LEAST_LOADED)
+
+# Conditional-UPDATE attempts before least-loaded selection gives up
+CLAIM_RETRIES = 10
+
+
+class MembershipIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = None
+        self._by_id = {}
+        self._by_name = {}
+        # (version, role_id) pairs whose AssigneeLoad rows are known to exist
+        self._load_rows_ready = set()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TTS_MEMBERSHIP_INDEX_TTL', 60)
+
+    def _current_version(self):
+        version = cache.get(MEMBERSHIP_VERSION_KEY)
+        if version is None:
+            cache.add(MEMBERSHIP_VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(MEMBERSHIP_VERSION_KEY)
+        return version
+
+    def _is_fresh(self, version):
+        return (
+            self._version == version
+            and self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    def _refresh(self):
+        version = self._current_version()
+        if self._is_fresh(version):
+            return
+        with self._lock:
+            if self._is_fresh(version):
+                return
+            from system_roles.models import UserSystemRole
+
+            by_id, by_name = {}, {}
+            rows = UserSystemRole.objects.filter(system__slug=TTS_SYSTEM_SLUG).values_list(
+                'role_id', 'role__name', 'user_id'
+            ).order_by('role_id', 'user_id')
+            for role_id, role_name, user_id in rows:
+                by_id.setdefault(role_id, []).append(user_id)
+                by_name.setdefault(role_name.lower(), role_id)
+            self._by_id = {role_id: tuple(ids) for role_id, ids in by_id.items()}
+            self._by_name = by_name
+            self._version = version
+            self._loaded_at = time.monotonic()
+            self._load_rows_ready = set()
+
+    def resolve(self, role_id=None, role_name=None):
+        """Return ``(role_id, user_ids)``; ``role_id`` is ``None`` if the role has no TTS members."""
+        self._refresh()
+        if role_id is None and role_name:
+            role_id = self._by_name.get(role_name.lower())
+        return role_id, self._by_id.get(role_id, ())
+
+    def invalidate(self):
+        cache.set(MEMBERSHIP_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+membership = MembershipIndex()
+
+
+def next_round_robin(role_id, user_ids):
+    from users.id_allocator import reserve
+
+    if not user_ids:
+        return None
+    number = reserve(ROUND_ROBIN_SEQUENCE.format(role_id=role_id))[0]
+    return user_ids[number % len(user_ids)]
+
+
+def _ensure_load_rows(role_id, user_ids):
+    from .models import AssigneeLoad
+
+    key = (membership._version, role_id)
+    if key in membership._load_rows_ready:
+        return
+    AssigneeLoad.objects.bulk_create(
+        [AssigneeLoad(role_id=role_id, user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    membership._load_rows_ready.add(key)
+
+
+def next_least_loaded(role_id, user_ids):
+    from .models import AssigneeLoad
+
+    if not user_ids:
+        return None
+    _ensure_load_rows(role_id, user_ids)
+
+    for _ in range(CLAIM_RETRIES):
+        candidate = AssigneeLoad.objects.filter(role_id=role_id, user_id__in=user_ids).order_by(
+            'open_assignments', F('last_assigned_at').asc(nulls_first=True), 'user_id'
+        ).values_list('pk', 'user_id', 'open_assignments').first()
+        if candidate is None:
+            return None
+        pk, user_id, open_assignments = candidate
+        claimed = AssigneeLoad.objects.filter(pk=pk, open_assignments=open_assignments).update(
+            open_assignments=F('open_assignments') + 1,
+            last_assigned_at=timezone.now(),
+        )
+        if claimed:
+            return user_id
+    raise RuntimeError(f"Could not claim an assignee for role {role_id}")
+
+
+def next_assignee(role_id, user_ids, strategy=ROUND_ROBIN):
+    if strategy == LEAST_LOADED:
+        return next_least_loaded(role_id, user_ids)
+    return next_round_robin(role_id, user_ids)
+
+
+def release_assignee(role_id, user_id):
+    """Record that one of the user's assignments was closed or handed over."""
+    from .models import AssigneeLoad
+
+    return bool(AssigneeLoad.objects.filter(
+        role_id=role_id, user_id=user_id, open_assignments__gt=0
+    ).update(open_assignments=F('open_assignments') - 1))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('roles', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssigneeLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('open_assignments', models.PositiveIntegerField(default=0)),
+                ('last_assigned_at', models.DateTimeField(blank=True, null=True)),
+                ('role', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tts_loads', to='roles.role')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tts_loads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['role', 'open_assignments', 'last_assigned_at'], name='tts_load_pick_idx')],
+                'unique_together': {('user', 'role')},
+            },
+        ),
+    ]
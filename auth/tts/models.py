@@ -1,3 +1,28 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 # Create your models here.
+class AssigneeLoad(models.Model):
+    """Open assignment count per TTS role member, used for least-loaded selection."""
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='tts_loads')
+    role = models.ForeignKey('roles.Role', on_delete=models.CASCADE, related_name='tts_loads')
+    open_assignments = models.PositiveIntegerField(default=0)
+    last_assigned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('user', 'role')
+        indexes = [
+            models.Index(fields=['role', 'open_assignments', 'last_assigned_at'], name='tts_load_pick_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} in role {self.role_id}: {self.open_assignments} open"
+
+
+@receiver([post_save, post_delete], sender='system_roles.UserSystemRole')
+@receiver([post_save, post_delete], sender='roles.Role')
+@receiver([post_save, post_delete], sender='systems.System')
+def invalidate_membership_index(sender, **kwargs):
+    from .assignment import membership
+    membership.invalidate()
@@ -1,3 +1,35 @@
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from keys.models import APIKey
+
+
+class AssigneeEndpointAuthTests(TestCase):
+    """The assignee endpoints change shared state, so they need service credentials."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.api_key = APIKey.objects.create(name='tts')
+
+    def test_anonymous_post_is_rejected(self):
+        for name in ('tts:next_assignee', 'tts:release_assignee'):
+            response = self.client.post(reverse(name), {'role_id': 1, 'user_id': 7}, format='json')
+            self.assertIn(response.status_code, (401, 403), name)
+
+    def test_unknown_or_inactive_key_is_rejected(self):
+        inactive = APIKey.objects.create(name='old', is_active=False)
+        for key in ('0' * 40, inactive.key):
+            response = self.client.post(
+                reverse('tts:release_assignee'), {'role_id': 1, 'user_id': 7},
+                format='json', HTTP_X_API_KEY=key,
+            )
+            self.assertIn(response.status_code, (401, 403))
+
+    def test_service_key_is_accepted(self):
+        response = self.client.post(
+            reverse('tts:next_assignee'), {'role_id': 1}, format='json',
+            HTTP_AUTHORIZATION=f'Api-Key {self.api_key.key}',
+        )
+        # Authorized; the role simply has no TTS members here
+        self.assertEqual(response.status_code, 404)
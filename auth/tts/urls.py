@@ -2,7 +2,7 @@ from django.urls import path
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
-from .views import UserIDsByRoleView
+from .views import UserIDsByRoleView, NextAssigneeView, ReleaseAssigneeView
 
 app_name = 'tts'
 
@@ -10,9 +10,13 @@ app_name = 'tts'
 def tts_root(request, format=None):
     return Response({
         'round-robin': reverse('tts:user_ids_by_role', request=request),
+        'next-assignee': reverse('tts:next_assignee', request=request),
+        'release-assignee': reverse('tts:release_assignee', request=request),
     })
 
 urlpatterns = [
     path('', tts_root, name='tts_root'),
     path('round-robin/', UserIDsByRoleView.as_view(), name='user_ids_by_role'),
+    path('next-assignee/', NextAssigneeView.as_view(), name='next_assignee'),
+    path('release-assignee/', ReleaseAssigneeView.as_view(), name='release_assignee'),
 ]
\ No newline at end of file
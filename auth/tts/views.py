@@ -3,11 +3,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from users.models import User
-from roles.models import Role
-from systems.models import System
-from system_roles.models import UserSystemRole
-from django.db.models import Q
+from permissions import HasServiceAPIKey
+from .assignment import membership, next_assignee, release_assignee, ROUND_ROBIN, STRATEGIES
 
 # Create your views here.
 
@@ -19,43 +16,80 @@ class UserIDsByRoleView(APIView):
     permission_classes = [AllowAny]
     
     def get(self, request):
-        role_id = request.query_params.get('role_id')
-        role_name = request.query_params.get('role_name')
-        
-        if not role_id and not role_name:
-            return Response({"error": "Either role_id or role_name parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
-        
+        role_id, role_name, error = _role_from_request(request.query_params)
+        if error:
+            return error
+
         try:
-            # Get TTS system
-            try:
-                tts_system = System.objects.get(slug='tts')
-                
-                # Set up filter for UserSystemRole query
-                user_system_role_filter = {'system': tts_system}
-                
-                # If role_id is provided, try to use it
-                if role_id:
-                    try:
-                        # Convert role_id to integer
-                        role_id = int(role_id)
-                        user_system_role_filter['role__id'] = role_id
-                    except ValueError:
-                        return Response({"error": "role_id must be a number."}, status=status.HTTP_400_BAD_REQUEST)
-                # If role_name is provided, use case-insensitive matching
-                elif role_name:
-                    # Use iexact for case-insensitive matching
-                    user_system_role_filter['role__name__iexact'] = role_name
-                
-                # Find users with this role in TTS
-                user_system_roles = UserSystemRole.objects.filter(**user_system_role_filter)
-                
-                # Extract the user IDs
-                user_ids = user_system_roles.values_list('user__id', flat=True)
-                
-                return Response(list(user_ids), status=status.HTTP_200_OK)
-            
-            except System.DoesNotExist:
-                return Response([], status=status.HTTP_200_OK)
-            
+            # Members come from the in-memory TTS role index (role_name is case-insensitive)
+            _role_id, user_ids = membership.resolve(role_id=role_id, role_name=role_name)
+            return Response(list(user_ids), status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _role_from_request(data):
+    """Parse role_id/role_name from request data; returns (role_id, role_name, error_response)."""
+    role_id = data.get('role_id')
+    role_name = data.get('role_name')
+    if not role_id and not role_name:
+        return None, None, Response({"error": "Either role_id or role_name parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+    if role_id:
+        try:
+            role_id = int(role_id)
+        except (TypeError, ValueError):
+            return None, None, Response({"error": "role_id must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+    return role_id or None, role_name, None
+
+
+class NextAssigneeView(APIView):
+    """
+    Hand out the next TTS assignee for a role.
+
+    The cursor is kept server-side, so concurrent TTS workers never pick the
+    same round-robin slot. ``strategy`` is ``round_robin`` (default) or
+    ``least_loaded``; least-loaded picks count as open until released through
+    ``release-assignee/``.
+
+    Callers authenticate with a service APIKey (see ``HasServiceAPIKey``).
+    """
+    permission_classes = [HasServiceAPIKey]
+
+    def post(self, request):
+        role_id, role_name, error = _role_from_request(request.data)
+        if error:
+            return error
+
+        strategy = request.data.get('strategy') or ROUND_ROBIN
+        if strategy not in STRATEGIES:
+            return Response({"error": f"strategy must be one of: {', '.join(STRATEGIES)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        role_id, user_ids = membership.resolve(role_id=role_id, role_name=role_name)
+        if not user_ids:
+            return Response({"error": "No TTS users have this role."}, status=status.HTTP_404_NOT_FOUND)
+
+        user_id = next_assignee(role_id, user_ids, strategy)
+        return Response({
+            "user_id": user_id,
+            "role_id": role_id,
+            "strategy": strategy,
+            "candidates": len(user_ids),
+        }, status=status.HTTP_200_OK)
+
+
+class ReleaseAssigneeView(APIView):
+    """Decrement a user's open assignment count once TTS closes or reassigns the ticket."""
+    permission_classes = [HasServiceAPIKey]
+
+    def post(self, request):
+        role_id, role_name, error = _role_from_request(request.data)
+        if error:
+            return error
+        try:
+            user_id = int(request.data.get('user_id'))
+        except (TypeError, ValueError):
+            return Response({"error": "user_id must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+
+        role_id, _user_ids = membership.resolve(role_id=role_id, role_name=role_name)
+        released = release_assignee(role_id, user_id) if role_id else False
+        return Response({"released": released}, status=status.HTTP_200_OK)
@@ -8,6 +8,9 @@ class UserAdmin(admin.ModelAdmin):
 	actions = ["unlock_accounts"]
 
 	def unlock_accounts(self, request, queryset):
+		from .lockout import reset
+		for email in queryset.values_list("email", flat=True):
+			reset(email)
 		updated = queryset.update(is_locked=False, failed_login_attempts=0, lockout_time=None)
 		self.message_user(request, f"Unlocked {updated} account(s).")
 	unlock_accounts.short_description = "Unlock selected user accounts"
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Offline breached-password index.
+
+A Bloom filter over the SHA-1 hashes from the Pwned Passwords corpus, stored
+in a single file and memory-mapped read-only, so a lookup is a handful of bit
+probes with no network access. SHA-1 output is already uniformly distributed,
+so the probe positions are derived straight from the digest (double hashing)
+instead of hashing again.
+
+File layout (little-endian)::
+
+    magic    8 bytes   b'PWBLOOM1'
+    m        uint64    number of bits
+    k        uint32    number of probes
+    n        uint64    number of hashes inserted
+    bits     ceil(m / 8) bytes
+
+Build it with ``manage.py build_breached_password_index``. A Bloom filter has
+no false negatives; false positives (at the rate chosen at build time) only
+ever make a user pick another password.
+"""
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PWBLOOM1'
+HEADER = struct.Struct('<8sQIQ')
+
+# How often a process checks whether the index file was rebuilt
+RELOAD_CHECK_INTERVAL = 60
+
+
+def _probes(digest, m, k):
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:16], 'little') | 1
+    return [(h1 + i * h2) % m for i in range(k)]
+
+
+def optimal_parameters(n, fp_rate):
+    """Bits and probe count for ``n`` items at false-positive rate ``fp_rate``."""
+    n = max(n, 1)
+    m = int(math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2)))
+    k = max(1, int(round(m / n * math.log(2))))
+    return m, k
+
+
+class BloomIndex:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.m, self.k, self.n = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a breached-password index")
+        self.mtime = os.path.getmtime(path)
+
+    def __contains__(self, sha1_hex):
+        digest = bytes.fromhex(sha1_hex)
+        data = self._mmap
+        offset = HEADER.size
+        for bit in _probes(digest, self.m, self.k):
+            if not data[offset + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def close(self):
+        try:
+            self._mmap.close()
+        finally:
+            self._file.close()
+
+
+class BloomIndexBuilder:
+    """Accumulates SHA-1 hashes in memory and writes the index file."""
+
+    def __init__(self, expected_items, fp_rate=0.001):
+        self.m, self.k = optimal_parameters(expected_items, fp_rate)
+        self.bits = bytearray((self.m + 7) // 8)
+        self.n = 0
+
+    def add(self, sha1_hex):
+        digest = bytes.fromhex(sha1_hex)
+        bits = self.bits
+        for bit in _probes(digest, self.m, self.k):
+            bits[bit >> 3] |= 1 << (bit & 7)
+        self.n += 1
+
+    def write(self, path):
+        """Write atomically so running processes never map a half-written file."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(HEADER.pack(MAGIC, self.m, self.k, self.n))
+            fh.write(self.bits)
+        os.replace(tmp_path, path)
+
+
+_index = None
+_index_checked_at = None
+_index_lock = threading.Lock()
+
+
+def index_path():
+    return getattr(settings, 'PWNED_PASSWORDS_INDEX_PATH', None)
+
+
+def get_index():
+    """The mapped index for this process, or ``None`` if no index is built."""
+    global _index, _index_checked_at
+
+    now = time.monotonic()
+    if _index_checked_at is not None and now - _index_checked_at < RELOAD_CHECK_INTERVAL:
+        return _index
+
+    with _index_lock:
+        if _index_checked_at is not None and now - _index_checked_at < RELOAD_CHECK_INTERVAL:
+            return _index
+        _index_checked_at = now
+        path = index_path()
+        try:
+            if not path or not os.path.exists(path):
+                _index = None
+            elif _index is None or os.path.getmtime(path) != _index.mtime:
+                # The previous mapping is left to the garbage collector so
+                # lookups already holding it can finish.
+                _index = BloomIndex(path)
+                logger.info("Loaded breached-password index %s (%s hashes)", path, _index.n)
+        except (OSError, ValueError, struct.error) as e:
+            logger.error("Could not load breached-password index %s: %s", path, e)
+            _index = None
+        return _index
+
+
+def sha1_hex(password):
+    return hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
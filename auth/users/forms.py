@@ -320,8 +320,9 @@ class LoginForm(forms.Form):
         if email:
             try:
                 user = User.objects.get(email=email)
-                # Only show captcha if user has 5+ failed attempts or is locked
-                if user.failed_login_attempts < 5 and not user.is_locked:
+                # Only show captcha if user has 5+ recent failed attempts or is locked
+                from .lockout import captcha_required
+                if not captcha_required(email) and not user.is_locked:
                     self.fields.pop('captcha', None)
             except User.DoesNotExist:
                 # If user doesn't exist, still show captcha for security
@@ -0,0 +1,93 @@
+"""
+Atomic ID allocation backed by a counter row.
+
+``reserve()`` bumps an ``IdSequence`` row with a single conditional UPDATE,
+so concurrent callers are serialized by the database row lock instead of
+racing on ``MAX(company_id)`` and colliding on the unique constraint. Bulk
+callers reserve a whole block in one round-trip.
+
+Numbers handed out are never reused, even if the insert that needed them
+fails, so gaps are expected.
+"""
+import random
+import time
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+
+COMPANY_ID_SEQUENCE = 'company_id'
+COMPANY_ID_PREFIX = 'MA'
+
+# SQLite reports write contention as an error instead of blocking (always in
+# shared-cache mode, otherwise once the busy timeout runs out), so contended
+# reservations there are retried with a short jittered backoff.
+SQLITE_LOCK_RETRIES = 50
+
+
+def reserve(name, count=1, seed=None):
+    """
+    Reserve ``count`` consecutive numbers from the sequence ``name`` and return
+    them as a ``range``. ``seed`` is called to get the starting value the first
+    time the sequence is used.
+    """
+    from .models import IdSequence
+
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    attempt = 0
+    while True:
+        try:
+            return _reserve(IdSequence, name, count, seed)
+        except OperationalError as e:
+            attempt += 1
+            if connection.vendor != 'sqlite' or 'locked' not in str(e) or attempt >= SQLITE_LOCK_RETRIES:
+                raise
+            time.sleep(random.uniform(0.001, 0.005) * min(attempt, 10))
+
+
+def _reserve(IdSequence, name, count, seed):
+    for _ in range(2):
+        with transaction.atomic():
+            updated = IdSequence.objects.filter(name=name).update(value=F('value') + count)
+            if updated:
+                # Still inside the transaction, so the row lock taken by the
+                # UPDATE guarantees we read our own increment
+                end = IdSequence.objects.filter(name=name).values_list('value', flat=True).get()
+                return range(end - count + 1, end + 1)
+
+        # First use: create the row. If another caller creates it first the
+        # unique constraint rejects ours and the next loop uses theirs.
+        try:
+            with transaction.atomic():
+                IdSequence.objects.create(name=name, value=seed() if seed else 0)
+        except IntegrityError:
+            pass
+
+    raise RuntimeError(f"Could not reserve from sequence '{name}'")
+
+
+def format_company_id(number):
+    return f"{COMPANY_ID_PREFIX}{number:04d}"
+
+
+def _company_id_seed():
+    """Highest MA number already in use, so the counter continues after it."""
+    from .models import User
+
+    highest = 0
+    for company_id in User.objects.filter(company_id__startswith=COMPANY_ID_PREFIX).values_list('company_id', flat=True).iterator():
+        try:
+            highest = max(highest, int(company_id[len(COMPANY_ID_PREFIX):]))
+        except (TypeError, ValueError):
+            pass
+    return highest
+
+
+def reserve_company_ids(count):
+    """Reserve a block of ``count`` company IDs for bulk invites and imports."""
+    return [format_company_id(n) for n in reserve(COMPANY_ID_SEQUENCE, count, seed=_company_id_seed)]
+
+
+def next_company_id():
+    return reserve_company_ids(1)[0]
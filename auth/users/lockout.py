@@ -0,0 +1,148 @@
+"""
+Login attempt tracking and account lockout.
+
+Failed attempts are counted in the cache, per account (email) and per client
+IP, over a sliding window approximated with two fixed buckets: the current
+bucket plus the previous one weighted by how much of it still overlaps the
+window. Counters use ``cache.incr`` so concurrent attempts never lose updates
+and never touch the ``User`` row.
+
+The database is written only when the lock state actually changes: when an
+account crosses the threshold and is locked, when an expired lock is lifted,
+or when a successful login clears a row that still records failures.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def lockout_threshold():
+    return _setting('LOGIN_LOCKOUT_THRESHOLD', 10)
+
+
+def lockout_duration():
+    return _setting('LOGIN_LOCKOUT_TIME', timezone.timedelta(minutes=15))
+
+
+def captcha_threshold():
+    return _setting('LOGIN_CAPTCHA_THRESHOLD', 5)
+
+
+def ip_threshold():
+    return _setting('LOGIN_IP_THRESHOLD', 50)
+
+
+def attempt_window():
+    return int(_setting('LOGIN_ATTEMPT_WINDOW', 15 * 60))
+
+
+def get_client_ip(request):
+    if request is None:
+        return None
+    return request.META.get('REMOTE_ADDR')
+
+
+def _scope_key(scope, ident):
+    # Hash the identifier so raw emails never end up in cache keys
+    digest = hashlib.sha256(str(ident).strip().lower().encode()).hexdigest()[:32]
+    return f'login:{scope}:{digest}'
+
+
+def _buckets(scope, ident, now=None):
+    window = attempt_window()
+    now = time.time() if now is None else now
+    bucket = int(now // window)
+    elapsed = (now % window) / window
+    base = _scope_key(scope, ident)
+    return f'{base}:{bucket}', f'{base}:{bucket - 1}', elapsed
+
+
+def _count(scope, ident):
+    if not ident:
+        return 0
+    current_key, previous_key, elapsed = _buckets(scope, ident)
+    values = cache.get_many([current_key, previous_key])
+    current = values.get(current_key, 0)
+    previous = values.get(previous_key, 0)
+    return int(current + previous * (1 - elapsed))
+
+
+def _hit(scope, ident):
+    if not ident:
+        return 0
+    current_key, _previous_key, _elapsed = _buckets(scope, ident)
+    # Buckets must outlive the window they are weighted into
+    cache.add(current_key, 0, attempt_window() * 2)
+    try:
+        cache.incr(current_key)
+    except ValueError:
+        # Evicted between add() and incr(); start the bucket again
+        cache.set(current_key, 1, attempt_window() * 2)
+    return _count(scope, ident)
+
+
+def failed_attempts(email):
+    """Failed attempts for this account within the sliding window."""
+    return _count('account', email)
+
+
+def is_ip_blocked(ip):
+    return _count('ip', ip) >= ip_threshold()
+
+
+def captcha_required(email):
+    return failed_attempts(email) >= captcha_threshold()
+
+
+def record_failure(email, ip=None):
+    """Count a failed attempt for the account and IP; returns the account count."""
+    _hit('ip', ip)
+    return _hit('account', email)
+
+
+def reset(email):
+    """Forget the account's failed attempts (successful login, admin unlock)."""
+    current_key, previous_key, _elapsed = _buckets('account', email)
+    cache.delete_many([current_key, previous_key])
+
+
+def lock_expired(user):
+    return bool(user.lockout_time) and timezone.now() >= user.lockout_time + lockout_duration()
+
+
+def lock_user(user, attempts):
+    """Persist a lock. Only the transition to locked is written to the DB."""
+    if user.is_locked:
+        return False
+    user.is_locked = True
+    user.lockout_time = timezone.now()
+    user.failed_login_attempts = attempts
+    type(user).objects.filter(pk=user.pk).update(
+        is_locked=True,
+        lockout_time=user.lockout_time,
+        failed_login_attempts=attempts,
+    )
+    return True
+
+
+def unlock_user(user):
+    """Clear lock state and counters, writing the row only if it records any."""
+    reset(user.email)
+    if not (user.is_locked or user.failed_login_attempts or user.lockout_time):
+        return False
+    user.is_locked = False
+    user.lockout_time = None
+    user.failed_login_attempts = 0
+    type(user).objects.filter(pk=user.pk).update(
+        is_locked=False,
+        lockout_time=None,
+        failed_login_attempts=0,
+    )
+    return True
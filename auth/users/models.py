@@ -35,22 +35,9 @@ STATUS_CHOICES = [
 class CustomUserManager(BaseUserManager):
 
     def get_next_company_id(self):
-        """Generate the next company ID with MA prefix and auto-increment."""
-        # Find the highest existing company_id
-        latest_user = self.filter(
-            company_id__startswith='MA'
-        ).order_by('company_id').last()
-        
-        if latest_user and latest_user.company_id:
-            # Extract the numeric part and increment
-            current_number = int(latest_user.company_id[2:])  # Remove 'MA' prefix
-            next_number = current_number + 1
-        else:
-            # Start with 1 if no existing company_ids
-            next_number = 1
-        
-        # Format as MA0001, MA0002, etc.
-        return f"MA{next_number:04d}"
+        """Allocate the next company ID (MA0001, MA0002, ...) atomically."""
+        from .id_allocator import next_company_id
+        return next_company_id()
 
     def create_user(self, email, password=None, **extra_fields):
         """
@@ -94,6 +81,18 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
+class IdSequence(models.Model):
+    """
+    Named counter row used for atomic ID allocation (see users.id_allocator).
+    `value` is the last number handed out.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
 # Custom User model for authentication
 class User(AbstractBaseUser, PermissionsMixin):
     id = models.AutoField(primary_key=True)  # Integer primary key
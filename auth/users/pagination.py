@@ -0,0 +1,32 @@
+from rest_framework.pagination import CursorPagination
+
+
+class DirectoryCursorPagination(CursorPagination):
+    """
+    Cursor pagination for user directory endpoints.
+
+    Cursor pages never run a COUNT and stay fast however deep the client
+    pages. Pagination is opt-in per request (``?cursor=`` or ``?page_size=``)
+    so existing clients that expect the full list keep working.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+
+class SystemUsersCursorPagination(DirectoryCursorPagination):
+    """Pages ``UserSystemRole`` rows annotated with ``user_email``."""
+    ordering = ('user_email', 'id')
+
+
+def get_requested_fields(request):
+    """Parse ``?fields=a,b,c`` into a set, or ``None`` when not given."""
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
@@ -5,6 +5,7 @@ from django.core.mail import send_mail
 from django.conf import settings
 from .models import User, UserOTP, PasswordResetToken
 from notification_client import notification_client
+from delivery_queue import delivery_queue
 from system_roles.models import UserSystemRole
 import hashlib
 import requests
@@ -12,35 +13,67 @@ import requests
 
 def check_password_pwned(password):
     """
-    Check if password has been compromised using HaveIBeenPwned API.
-    Returns True if password is compromised, False otherwise.
+    Check if password has been compromised.
+    Returns (True, count) if compromised, (False, 0) otherwise. ``count`` is
+    None when the hit comes from the local index, which does not store counts.
+
+    The local breached-password index (users.breached_passwords) answers
+    offline when it has been built. Without it, the HaveIBeenPwned range API
+    is used as a fallback if PWNED_PASSWORDS_REMOTE_FALLBACK is enabled, with
+    range responses cached per prefix.
     """
+    from .breached_passwords import get_index, sha1_hex
+
+    # Create SHA-1 hash of the password
+    sha1_hash = sha1_hex(password)
+
+    index = get_index()
+    if index is not None:
+        # Bloom filters have no false negatives, so a miss is final
+        if sha1_hash in index:
+            return True, None
+        return False, 0
+
+    if not getattr(settings, 'PWNED_PASSWORDS_REMOTE_FALLBACK', True):
+        return False, 0
+
     try:
-        # Create SHA-1 hash of the password
-        sha1_hash = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
-        
+        from django.core.cache import cache
+
         # Use k-anonymity - only send first 5 characters of hash
         prefix = sha1_hash[:5]
         suffix = sha1_hash[5:]
-        
-        # Query HaveIBeenPwned API
-        url = f"https://api.pwnedpasswords.com/range/{prefix}"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            # Check if our hash suffix appears in the results
-            for line in response.text.splitlines():
-                hash_suffix, count = line.split(':')
-                if hash_suffix == suffix:
-                    return True, int(count)  # Password is compromised
-            return False, 0  # Password not found in breach database
-        else:
-            # If API is unavailable, don't block password creation
-            return False, 0
-            
+
+        cache_key = f'pwned:range:{prefix}'
+        body = cache.get(cache_key)
+        if body is None:
+            # Query HaveIBeenPwned API
+            url = f"https://api.pwnedpasswords.com/range/{prefix}"
+            response = requests.get(url, timeout=getattr(settings, 'PWNED_PASSWORDS_TIMEOUT', 5))
+            if response.status_code != 200:
+                # If API is unavailable, don't block password creation
+                return False, 0
+            body = response.text
+            cache.set(cache_key, body, getattr(settings, 'PWNED_PASSWORDS_CACHE_TIMEOUT', 60 * 60 * 24))
+
+        # Check if our hash suffix appears in the results
+        for line in body.splitlines():
+            hash_suffix, count = line.split(':')
+            if hash_suffix == suffix:
+                return True, int(count)  # Password is compromised
+        return False, 0  # Password not found in breach database
+
     except Exception:
         # If there's any error (network, timeout, etc.), don't block password creation
         return False, 0
+
+
+def breached_password_message(breach_count):
+    if breach_count:
+        return f"This password has been found in {breach_count:,} data breaches. Please choose a different password."
+    return "This password has been found in data breaches. Please choose a different password."
+
+
 import hashlib
 import requests
 
@@ -101,7 +134,21 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
 # Protected Profile endpoint (accessible if provided valid access token in the request header)
 # Serializer to safely display user data (without showing password)
-class UserProfileSerializer(serializers.ModelSerializer):
+class SelectableFieldsMixin:
+    """
+    Limit output to the field names passed as ``context['fields']`` (e.g. from
+    ``?fields=id,email``). Unknown names are ignored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+
+class UserProfileSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     system_roles = serializers.SerializerMethodField()
     profile_picture = serializers.SerializerMethodField()
     
@@ -124,7 +171,11 @@ class UserProfileSerializer(serializers.ModelSerializer):
     
     def get_system_roles(self, obj):
         """Get system roles for the user."""
-        system_roles = UserSystemRole.objects.filter(user=obj).select_related('system', 'role')
+        if 'system_roles' in getattr(obj, '_prefetched_objects_cache', {}):
+            # Directory endpoints prefetch these (with system and role) for the whole page
+            system_roles = obj.system_roles.all()
+        else:
+            system_roles = UserSystemRole.objects.filter(user=obj).select_related('system', 'role')
         return [
             {
                 'id': assignment.id,  # Include the UserSystemRole ID for updates
@@ -289,32 +340,47 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         # Add custom claims
         token['email'] = user.email
         token['username'] = user.username
+        # Profile claims let consumers build their user locally after verifying
+        # the signature against the JWKS, without calling back to this service
+        token['first_name'] = user.first_name
+        token['last_name'] = user.last_name
+        token['department'] = user.department
+        token['company_id'] = user.company_id
         
         # Add system-specific roles using the existing UserSystemRole model
         roles = []
         
-        # Get all user roles across different systems
-        user_system_roles = user.system_roles.select_related('system', 'role').all()
-        for user_role in user_system_roles:
+        # Get all user roles across different systems (cached, see system_roles.resolution)
+        from system_roles.resolution import get_user_roles
+        for assignment in get_user_roles(user):
             roles.append({
-                'system': user_role.system.slug,  # Using system slug as identifier
-                'role': user_role.role.name
+                'system': assignment.system_slug,  # Using system slug as identifier
+                'role': assignment.role_name
             })
         
         token['roles'] = roles
         return token
 
     def validate(self, attrs):
-        from django.utils import timezone
-        from datetime import timedelta
-        LOCKOUT_THRESHOLD = 10  # Number of allowed failed attempts
-        LOCKOUT_TIME = timedelta(minutes=15)  # Lockout duration
+        from . import lockout
 
         email = attrs.get(self.username_field)
         password = attrs.get('password')
         otp_code = attrs.get('otp_code', '')
 
         if email and password:
+            request = self.context.get('request')
+            ip_address = lockout.get_client_ip(request)
+            user_agent = request.META.get('HTTP_USER_AGENT') if request else None
+
+            # Refuse addresses spraying passwords across many accounts before
+            # spending a password hash on them
+            if lockout.is_ip_blocked(ip_address):
+                raise serializers.ValidationError(
+                    "Too many failed login attempts from this address. Please try again later.",
+                    code="ip_locked"
+                )
+
             try:
                 user = User.objects.get(email=email)
             except User.DoesNotExist:
@@ -324,16 +390,13 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             if user:
                 if user.is_locked:
                     # Check if lockout period has expired
-                    if user.lockout_time and timezone.now() >= user.lockout_time + LOCKOUT_TIME:
-                        user.is_locked = False
-                        user.failed_login_attempts = 0
-                        user.lockout_time = None
-                        user.save(update_fields=["is_locked", "failed_login_attempts", "lockout_time"])
+                    if lockout.lock_expired(user):
+                        lockout.unlock_user(user)
                         # Send account unlocked notification via microservice
                         notification_client.send_account_unlocked_notification(
                             user=user,
-                            ip_address=self.context.get('request').META.get('REMOTE_ADDR') if self.context.get('request') else None,
-                            user_agent=self.context.get('request').META.get('HTTP_USER_AGENT') if self.context.get('request') else None
+                            ip_address=ip_address,
+                            user_agent=user_agent
                         )
                     else:
                         raise serializers.ValidationError(
@@ -342,45 +405,39 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
                         )
 
             user_auth = authenticate(
-                request=self.context.get('request'),
+                request=request,
                 username=email,
                 password=password
             )
 
             if not user_auth:
-                # Increment failed attempts if user exists
+                # Attempts are counted in the cache; the user row is only
+                # written when this failure locks the account
+                attempts = lockout.record_failure(email, ip_address)
                 if user:
-                    user.failed_login_attempts += 1
-                    if user.failed_login_attempts >= LOCKOUT_THRESHOLD:
-                        user.is_locked = True
-                        user.lockout_time = timezone.now()
-                        # Send account locked notification via microservice
-                        notification_client.send_account_locked_notification(
-                            user=user,
-                            failed_attempts=user.failed_login_attempts,
-                            ip_address=self.context.get('request').META.get('REMOTE_ADDR') if self.context.get('request') else None,
-                            user_agent=self.context.get('request').META.get('HTTP_USER_AGENT') if self.context.get('request') else None
-                        )
-                    else:
-                        # Send failed login attempt notification for multiple attempts (but not locked yet)
-                        if user.failed_login_attempts >= 5:  # Start notifying after 5 attempts
-                            notification_client.send_failed_login_notification(
+                    if attempts >= lockout.lockout_threshold():
+                        if lockout.lock_user(user, attempts):
+                            # Send account locked notification via microservice
+                            notification_client.send_account_locked_notification(
                                 user=user,
-                                ip_address=self.context.get('request').META.get('REMOTE_ADDR') if self.context.get('request') else None,
-                                user_agent=self.context.get('request').META.get('HTTP_USER_AGENT') if self.context.get('request') else None
+                                failed_attempts=attempts,
+                                ip_address=ip_address,
+                                user_agent=user_agent
                             )
-                    user.save(update_fields=["failed_login_attempts", "is_locked", "lockout_time"])
+                    elif attempts >= lockout.captcha_threshold():
+                        # Send failed login attempt notification for multiple attempts (but not locked yet)
+                        notification_client.send_failed_login_notification(
+                            user=user,
+                            ip_address=ip_address,
+                            user_agent=user_agent
+                        )
                 raise serializers.ValidationError(
                     'Invalid email or password.',
                     code='authorization'
                 )
 
-            # Reset failed attempts on successful login
-            if user:
-                user.failed_login_attempts = 0
-                user.is_locked = False
-                user.lockout_time = None
-                user.save(update_fields=["failed_login_attempts", "is_locked", "lockout_time"])
+            # Reset failed attempts on successful login (no write if the row is clean)
+            lockout.unlock_user(user_auth)
 
             # Check if 2FA is enabled for this user
             if user_auth.otp_enabled:
@@ -411,12 +468,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             # --- START: HDTS restriction ---
             # Prevent users who are Employees for the HDTS system and are not Approved from logging in
             try:
-                from system_roles.models import UserSystemRole
-                is_hdts_employee = UserSystemRole.objects.filter(
-                    user=user_auth,
-                    system__slug__iexact='hdts',
-                    role__name__iexact='Employee'
-                ).exists()
+                from system_roles.resolution import has_role
+                is_hdts_employee = has_role(user_auth, 'hdts', 'Employee')
             except Exception:
                 # If the system_roles app/models are not available for any reason,
                 # do not block login here; let higher-level checks handle it.
@@ -573,9 +626,7 @@ class ResetPasswordSerializer(serializers.Serializer):
         # Check against HaveIBeenPwned API for breached passwords
         is_pwned, breach_count = check_password_pwned(password)
         if is_pwned:
-            raise serializers.ValidationError(
-                f"This password has been found in {breach_count:,} data breaches. Please choose a different password."
-            )
+            raise serializers.ValidationError(breached_password_message(breach_count))
 
         attrs['reset_token'] = reset_token
         return attrs
@@ -638,19 +689,14 @@ Best regards,
 Authentication Service Team
     '''
     
-    try:
-        send_mail(
-            subject=subject,
-            message=message.strip(),
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com'),
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        # Log the error in production
-        print(f"Failed to send password reset email to {user.email}: {str(e)}")
-        return False
+    # Queued; the delivery worker sends it and retries on SMTP failures
+    return delivery_queue.enqueue_email(
+        subject=subject,
+        message=message.strip(),
+        recipient_list=[user.email],
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com'),
+        description=f"password_reset email to {user.email}",
+    )
 
 
 class ProfilePasswordResetSerializer(serializers.Serializer):
@@ -695,7 +741,7 @@ class ProfilePasswordResetSerializer(serializers.Serializer):
         is_pwned, breach_count = check_password_pwned(new_password)
         if is_pwned:
             raise serializers.ValidationError({
-                'new_password': f"This password has been found in {breach_count:,} data breaches. Please choose a different password."
+                'new_password': breached_password_message(breach_count)
             })
 
         return attrs
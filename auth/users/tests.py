@@ -1,3 +1,57 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from .id_allocator import reserve, reserve_company_ids
+from .models import User
+
+
+class CompanyIdAllocatorTests(TestCase):
+    def test_continues_after_existing_ids(self):
+        User.objects.create_user(email='old@example.com', password='x', company_id='MA0041')
+        self.assertEqual(User.objects.create_user(email='new@example.com', password='x').company_id, 'MA0042')
+
+    def test_reserves_consecutive_block(self):
+        first = reserve_company_ids(1)[0]
+        block = reserve_company_ids(5)
+        self.assertEqual(len(block), 5)
+        self.assertEqual(block[0], f"MA{int(first[2:]) + 1:04d}")
+        self.assertEqual(reserve_company_ids(1)[0], f"MA{int(block[-1][2:]) + 1:04d}")
+
+
+class CompanyIdAllocatorConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    ROUNDS = 25
+
+    def test_no_duplicates_under_concurrency(self):
+        reserve('concurrency-test')  # create the row before the threads start
+        results = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+
+        def worker():
+            try:
+                start.wait()
+                for i in range(self.ROUNDS):
+                    numbers = list(reserve('concurrency-test', count=1 + i % 3))
+                    with lock:
+                        results.extend(numbers)
+            except Exception as e:  # pragma: no cover - surfaced below
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        expected = self.THREADS * sum(1 + i % 3 for i in range(self.ROUNDS))
+        self.assertEqual(len(results), expected)
+        self.assertEqual(len(set(results)), expected)
+        # Blocks are contiguous, so every number from 2 up to the end was handed out once
+        self.assertEqual(sorted(results), list(range(2, expected + 2)))
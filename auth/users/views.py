@@ -6,6 +6,7 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework.exceptions import ValidationError
+from rest_framework.throttling import ScopedRateThrottle
 from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer, extend_schema_view, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -39,6 +40,7 @@ from django.contrib.auth import login
 from permissions import IsSystemAdminOrSuperUser, filter_users_by_system_access
 import json
 from system_roles.models import UserSystemRole
+from system_roles.resolution import get_user_roles, has_role
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from .forms import ProfileSettingsForm, ForgotPasswordForm
@@ -223,6 +225,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     """Custom token obtain view that supports 2FA with OTP and sets JWT tokens as regular cookies (non-HTTP-only)."""
 
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'login'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -279,11 +283,9 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         # --- START: HDTS LOGIC ---
         # Check if the user is an 'Employee' in the 'HDTS' system.
         # We use system__slug='hdts' and role__name='Employee' for reverse lookup.
-        is_hdts_employee = UserSystemRole.objects.filter(
-            user=user,
-            system__slug='hdts',
-            role__name='Employee'
-        ).exists()
+        # Roles were already resolved for this user by the serializer, so
+        # this and the lookups below are served from the per-request memo.
+        is_hdts_employee = has_role(user, 'hdts', 'Employee')
         
         # If they are an HDTS Employee, check their approval status
         if is_hdts_employee and user.status != 'Approved':
@@ -304,12 +306,11 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
         # Get system roles for the user (keep existing code)
         system_roles_data = []
-        user_system_roles = UserSystemRole.objects.filter(user=user).select_related('system', 'role')
-        for role_assignment in user_system_roles:
+        for role_assignment in get_user_roles(user):
             system_roles_data.append({
-                'system_name': role_assignment.system.name,
-                'system_slug': role_assignment.system.slug,
-                'role_name': role_assignment.role.name,
+                'system_name': role_assignment.system_name,
+                'system_slug': role_assignment.system_slug,
+                'role_name': role_assignment.role_name,
                 'assigned_at': role_assignment.assigned_at,
             })
 
@@ -414,6 +415,8 @@ class RequestOTPView(generics.CreateAPIView):
     """Generate OTP for user with valid credentials and send via email."""
     permission_classes = [AllowAny]
     serializer_class = OTPRequestSerializer
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'otp'
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -536,6 +539,8 @@ class ForgotPasswordView(generics.CreateAPIView):
     """Request password reset via email."""
     permission_classes = [AllowAny]
     serializer_class = ForgotPasswordSerializer
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'password_reset'
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -1319,8 +1324,9 @@ class LoginView(FormView):
             if email:
                 try:
                     user = User.objects.get(email=email)
-                    # Check if captcha is needed (5+ failed attempts or locked)
-                    captcha_needed = user.failed_login_attempts >= 5 or user.is_locked
+                    # Check if captcha is needed (5+ recent failed attempts or locked)
+                    from .lockout import captcha_required
+                    captcha_needed = captcha_required(email) or user.is_locked
                 except User.DoesNotExist:
                     # For non-existent users, don't reveal they don't exist
                     captcha_needed = True
@@ -1381,11 +1387,10 @@ class LoginView(FormView):
             access_token = str(refresh.access_token)
             refresh_token = str(refresh)
         
-        # Reset failed login attempts on successful login (already done in serializer)
-        user.failed_login_attempts = 0
-        user.is_locked = False
-        user.lockout_time = None
-        user.save(update_fields=["failed_login_attempts", "is_locked", "lockout_time"])
+        # Reset failed login attempts on successful login (already done in
+        # serializer, so this only writes if the fallback path was taken)
+        from .lockout import unlock_user
+        unlock_user(user)
         
         # Create response with system redirect
         print(f"DEBUG: About to call create_system_redirect_response with system slug: {selected_system.slug}")
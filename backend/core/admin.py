@@ -6,6 +6,8 @@ from django.contrib.auth.forms import ReadOnlyPasswordHashField
 from .models import Employee, Ticket, TicketAttachment, KnowledgeArticle, ActivityLog
 from django.utils import timezone
 from django.conf import settings
+from django.db.models import Q
+from .admin_paging import PaginatedInlineMixin, ScalableAdminMixin
 
 # Custom form for creating users
 class EmployeeCreationForm(forms.ModelForm):
@@ -49,7 +51,7 @@ class EmployeeChangeForm(forms.ModelForm):
 
 # Register Employee with custom admin
 @admin.register(Employee)
-class EmployeeAdmin(UserAdmin):
+class EmployeeAdmin(ScalableAdminMixin, UserAdmin):
     add_form = EmployeeCreationForm
     form = EmployeeChangeForm
     model = Employee
@@ -59,9 +61,15 @@ class EmployeeAdmin(UserAdmin):
         'department', 'role', 'status', 'notified'
     )
     list_filter = ('department', 'role', 'status', 'notified')
-    search_fields = ('email', 'first_name', 'last_name', 'company_id')
+    list_select_related = False  # Nothing listed is a foreign key
+    search_fields = ('email', 'company_id')
+    search_help_text = 'Exact email address or company ID (e.g. MA0001).'
     ordering = ('email',)
 
+    def indexed_search(self, term):
+        # Both columns are unique, so indexed
+        return Q(email=term) | Q(email=term.lower()) | Q(company_id=term.upper())
+
     fieldsets = (
         (None, {
             'fields': (
@@ -146,11 +154,11 @@ class TicketAdminForm(forms.ModelForm):
 class TicketAttachmentInline(admin.TabularInline):
     model = TicketAttachment
     extra = 0
-    readonly_fields = ('file', 'file_name', 'file_type', 'file_size', 'uploaded_by', 'upload_date')
+    readonly_fields = ('file', 'file_name', 'file_type', 'file_size', 'uploaded_by', 'upload_date', 'preview', 'preview_status')
 
 # Register Ticket with attachment inline
 @admin.register(Ticket)
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(ScalableAdminMixin, admin.ModelAdmin):
     form = TicketAdminForm
     inlines = [TicketAttachmentInline]
 
@@ -159,11 +167,9 @@ class TicketAdmin(admin.ModelAdmin):
         'status', 'scheduled_date', 'submit_date', 'assigned_to'
     )
     list_filter = ('department', 'priority', 'status')
-    search_fields = (
-        'subject',
-        'employee__first_name', 'employee__last_name',
-        'assigned_to__first_name', 'assigned_to__last_name'
-    )
+    list_select_related = ('employee', 'assigned_to')
+    search_fields = ('id', 'ticket_number', 'employee__email', 'employee__company_id')
+    search_help_text = "Ticket ID or number, or the requester's exact email or company ID."
     autocomplete_fields = ['employee', 'assigned_to']
     readonly_fields = ('submit_date', 'update_date')
 
@@ -180,6 +186,15 @@ class TicketAdmin(admin.ModelAdmin):
         }),
     )
 
+    def indexed_search(self, term):
+        # Primary key, unique ticket_number, then the requester through
+        # Employee's unique columns
+        condition = Q(ticket_number=term.upper())
+        if term.isdigit() and len(term) < 19:  # Fits a bigint
+            condition |= Q(pk=int(term))
+        requesters = Employee.objects.filter(Q(email=term) | Q(email=term.lower()) | Q(company_id=term.upper()))
+        return condition | Q(employee__in=requesters.values('pk'))
+
 
 @admin.register(KnowledgeArticle)
 class KnowledgeArticleAdmin(admin.ModelAdmin):
@@ -198,7 +213,7 @@ class KnowledgeArticleAdmin(admin.ModelAdmin):
     )
 
 
-class ActivityLogInline(admin.TabularInline):
+class ActivityLogInline(PaginatedInlineMixin, admin.TabularInline):
     model = ActivityLog
     # ActivityLog references Employee twice (user, actor). For the inline on the
     # Employee admin detail page we want to show logs about the employee (the
@@ -207,6 +222,11 @@ class ActivityLogInline(admin.TabularInline):
     extra = 0
     readonly_fields = ('action_type', 'actor', 'message', 'ticket', 'metadata', 'timestamp')
     can_delete = False
+    # A user's history can run to thousands of rows; show it a page at a time
+    per_page = 20
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'actor', 'ticket')
 
 # Attach inline to EmployeeAdmin so activity logs are visible on the user profile page
 # Ensure we concatenate tuples (Django expects a tuple for `inlines` on the class)
@@ -0,0 +1,118 @@
+"""
+Admin pages that stay fast on large tables.
+
+``ScalableAdminMixin`` changes three things about a ModelAdmin changelist.
+
+- Counting: ``EstimatedCountPaginator`` counts exactly only up to
+  EXACT_COUNT_LIMIT rows, and that scan is bounded. Past that it takes the
+  planner's row estimate on PostgreSQL, or ``Max(pk)`` for an unfiltered list
+  elsewhere. A filtered list on another database is counted as
+  EXACT_COUNT_LIMIT + 1 rows. The unfiltered "N total" count is switched off
+  as well (``show_full_result_count``).
+- Searching: it only uses lookups an index can answer (``indexed_search``),
+  never ``icontains`` over several columns, which would scan every row for
+  each term.
+- Duplicates: searches never follow a to-many relation, so results need
+  no DISTINCT.
+
+With the count estimated, the last pages of a very large list may come up
+empty.
+
+``PaginatedInlineMixin`` shows an inline one page at a time, in the model's
+ordering, instead of loading every related row onto the change page.
+"""
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, QuerySet
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimated_count(queryset):
+    """A cheap estimate of ``queryset.count()``, or None if there is none."""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    if not queryset.query.where and queryset.model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+        # Highest id, from the primary key index; an upper bound
+        return queryset.aggregate(highest=Max('pk'))['highest'] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        queryset = self.object_list.order_by()
+        exact = queryset[:EXACT_COUNT_LIMIT + 1].count()
+        if exact <= EXACT_COUNT_LIMIT:
+            return exact
+        return max(estimated_count(queryset) or 0, exact)
+
+
+class ScalableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def indexed_search(self, term):
+        """A Q matching ``term`` through indexed columns only, or None for no match."""
+        raise NotImplementedError
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = self.indexed_search(term)
+        if condition is None:
+            return queryset.none(), False
+        return queryset.filter(condition), False
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    per_page = 20
+    page_number = None
+
+    def get_queryset(self):
+        if not hasattr(self, '_paginated_queryset'):
+            queryset = super().get_queryset()
+            self.page = Paginator(queryset, self.per_page).get_page(self.page_number)
+            self.previous_page_url = self.page_url(self.page.previous_page_number()) if self.page.has_previous() else None
+            self.next_page_url = self.page_url(self.page.next_page_number()) if self.page.has_next() else None
+            self._paginated_queryset = self.page.object_list
+        return self._paginated_queryset
+
+
+class PaginatedInlineMixin:
+    formset = PaginatedInlineFormSet
+    template = 'admin/core/paginated_tabular.html'
+    per_page = 20
+
+    @property
+    def page_param(self):
+        return f'{self.opts.model_name}_page'
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        page_param = self.page_param
+
+        def page_url(number):
+            query = request.GET.copy()
+            query[page_param] = number
+            return f'?{query.urlencode()}'
+
+        return type(formset.__name__, (formset,), {
+            'per_page': self.per_page,
+            'page_number': request.GET.get(page_param),
+            'page_url': staticmethod(page_url),
+        })
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Verify auth-service tokens against its JWKS instead of a shared secret
+        from rest_framework_simplejwt.tokens import Token
+        from .authentication import token_backend
+        Token._token_backend = token_backend
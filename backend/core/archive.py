@@ -0,0 +1,188 @@
+"""
+Archival of closed tickets.
+
+``archive_tickets(days)`` moves Closed and Withdrawn tickets closed more than
+``days`` ago out of Ticket, together with their comments, attachments and
+activity rows, into the Archived* tables. Work is done in batches; each batch
+is one transaction, so a ticket is either fully live or fully archived.
+Attachment files move from MEDIA_ROOT to ARCHIVE_ROOT under the same relative
+name. If the batch fails, they are moved back.
+
+Archived rows keep their original ids. Tickets leave a TicketTombstone marked
+``archived``, so sync clients drop them and the reporting aggregates keep
+counting them. Lookups by id or number fall back to the archive (see
+``_ticket_detail_response``), and ``search`` backs the archive search endpoint.
+"""
+import logging
+import os
+import shutil
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import JSONField, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import (
+    ActivityLog,
+    ArchivedActivityLog,
+    ArchivedTicket,
+    ArchivedTicketAttachment,
+    ArchivedTicketComment,
+    Ticket,
+    TicketAttachment,
+    TicketComment,
+    TicketTombstone,
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_STATUSES = ['Closed', 'Withdrawn']
+BATCH_SIZE = 100
+
+
+def archivable(days):
+    """Tickets eligible for archiving: closed more than ``days`` days ago."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return Ticket.objects.filter(status__in=ARCHIVE_STATUSES).filter(
+        Q(time_closed__lt=cutoff) | Q(time_closed__isnull=True, update_date__lt=cutoff)
+    )
+
+
+def _snapshot(ticket):
+    # Strings as the fields write them (full precision), read back by ArchivedTicket.ticket_fields()
+    values = {}
+    for field in Ticket._meta.concrete_fields:
+        value = field.value_from_object(ticket)
+        if value is not None and not isinstance(field, JSONField) and not isinstance(value, (bool, int, str)):
+            value = field.value_to_string(ticket)
+        values[field.attname] = value
+    return values
+
+
+def _move(name, source_root, target_root):
+    source = os.path.join(source_root, name)
+    if not os.path.exists(source):
+        return False
+    target = os.path.join(target_root, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+    return True
+
+
+def _archive_batch(ids, days):
+    moved = []
+    try:
+        with transaction.atomic():
+            # Re-check under lock: a ticket may have been reopened meanwhile
+            tickets = list(archivable(days).select_for_update().filter(id__in=ids))
+            if not tickets:
+                return 0
+            ids = [ticket.id for ticket in tickets]
+            comments = [
+                ArchivedTicketComment(
+                    id=comment.id, ticket_id=comment.ticket_id, user_id=comment.user_id,
+                    user_cookie_id=comment.user_cookie_id, comment=comment.comment,
+                    is_internal=comment.is_internal, created_at=comment.created_at,
+                )
+                for comment in TicketComment.objects.filter(ticket_id__in=ids)
+            ]
+            attachments = [
+                ArchivedTicketAttachment(
+                    id=attachment.id, ticket_id=attachment.ticket_id, file=attachment.file.name,
+                    preview=attachment.preview.name,
+                    file_name=attachment.file_name, file_type=attachment.file_type,
+                    file_size=attachment.file_size, upload_date=attachment.upload_date,
+                    uploaded_by_id=attachment.uploaded_by_id,
+                )
+                for attachment in TicketAttachment.objects.filter(ticket_id__in=ids)
+            ]
+            logs = [
+                ArchivedActivityLog(
+                    id=log.id, user_id=log.user_id, action_type=log.action_type, actor_id=log.actor_id,
+                    message=log.message, ticket_id=log.ticket_id, metadata=log.metadata, timestamp=log.timestamp,
+                )
+                for log in ActivityLog.objects.filter(ticket_id__in=ids)
+            ]
+
+            ArchivedTicket.objects.bulk_create([
+                ArchivedTicket(
+                    id=ticket.id, ticket_number=ticket.ticket_number, employee_id=ticket.employee_id,
+                    employee_cookie_id=ticket.employee_cookie_id, assigned_to_id=ticket.assigned_to_id,
+                    subject=ticket.subject, category=ticket.category, department=ticket.department,
+                    status=ticket.status, submit_date=ticket.submit_date, time_closed=ticket.time_closed,
+                    resolution_time=ticket.resolution_time, data=_snapshot(ticket),
+                )
+                for ticket in tickets
+            ])
+            ArchivedTicketComment.objects.bulk_create(comments)
+            ArchivedTicketAttachment.objects.bulk_create(attachments)
+            ArchivedActivityLog.objects.bulk_create(logs)
+
+            for attachment in attachments:
+                for name in (attachment.file.name, attachment.preview.name):
+                    if name and _move(name, settings.MEDIA_ROOT, settings.ARCHIVE_ROOT):
+                        moved.append(name)
+
+            last_tombstone = TicketTombstone.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            ActivityLog.objects.filter(ticket_id__in=ids).delete()
+            Ticket.objects.filter(id__in=ids).delete()  # Cascades to comments and attachments
+            TicketTombstone.objects.filter(id__gt=last_tombstone, ticket_id__in=ids).update(archived=True)
+            return len(tickets)
+    except Exception:
+        for name in moved:
+            try:
+                _move(name, settings.ARCHIVE_ROOT, settings.MEDIA_ROOT)
+            except OSError:
+                logger.exception("Could not move %s back from the archive", name)
+        raise
+
+
+def archive_tickets(days=None, batch_size=BATCH_SIZE, limit=None):
+    """Archive eligible tickets in batches; returns how many were archived."""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    total = 0
+    last_id = 0
+    while limit is None or total < limit:
+        size = batch_size if limit is None else min(batch_size, limit - total)
+        ids = list(archivable(days).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:size])
+        if not ids:
+            break
+        total += _archive_batch(ids, days)
+        last_id = ids[-1]
+    return total
+
+
+def search(user, params):
+    """
+    Archived tickets visible to ``user`` matching the search ``params``, most
+    recently closed first. Raises ValueError for malformed filters.
+    """
+    from .authentication import ExternalUser
+    from .ticket_detail import COORDINATOR_ROLES
+
+    queryset = ArchivedTicket.objects.all()
+    # Same visibility as live tickets (core.ticket_detail.can_view)
+    if isinstance(user, ExternalUser):
+        if user.role not in ['Ticket Coordinator', 'Admin']:
+            queryset = queryset.filter(employee_cookie_id=user.id)
+    elif not (user.is_staff or getattr(user, 'role', None) in COORDINATOR_ROLES):
+        queryset = queryset.filter(employee_id=user.id)
+
+    q = (params.get('q') or '').strip()
+    if q:
+        queryset = queryset.filter(Q(ticket_number__iexact=q) | Q(subject__icontains=q))
+    for name in ('category', 'status', 'department'):
+        if params.get(name):
+            queryset = queryset.filter(**{name: params[name]})
+    if params.get('employee_id'):
+        queryset = queryset.filter(employee_id=int(params['employee_id']))
+    for name, lookup, offset in (('since', 'gte', 0), ('until', 'lt', 1)):
+        if params.get(name):
+            day = parse_date(params[name])
+            if day is None:
+                raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+            bound = timezone.make_aware(datetime.combine(day + timedelta(days=offset), time.min))
+            queryset = queryset.filter(**{f'time_closed__{lookup}': bound})
+    return queryset.order_by('-time_closed', '-id')
@@ -0,0 +1,98 @@
+"""
+Concurrent user profile lookups on the auth service for async views.
+
+Ticket detail needs the profile of each external (cookie-auth) user it names.
+``fetch_profiles`` looks them all up at once and forwards the caller's
+cookies as ``_fetch_external_user_profile`` does: the HDTS-scoped endpoint
+first, then the generic one. All lookups share one deadline
+(``AUTH_PROFILE_FETCH_BUDGET`` seconds), so a slow auth service delays a
+request by at most the budget rather than five seconds per profile. A profile
+that misses the deadline or fails comes back as ``{}``, as before.
+
+Under ASGI the lookups go through one pooled ``httpx.AsyncClient`` per event
+loop, which keeps connections to the auth service open between requests.
+Under WSGI each async view runs on a short-lived loop, so a client is opened
+for the request and closed afterwards.
+"""
+import asyncio
+import logging
+import weakref
+
+import httpx
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_COOKIES = ('access_token', 'csrftoken', 'refresh_token')
+PROFILE_PATHS = ('/api/v1/hdts/users/{user_id}/', '/api/v1/users/{user_id}/')
+MAX_CONNECTIONS = 50
+
+# event loop -> AsyncClient
+_clients = weakref.WeakKeyDictionary()
+
+
+def _new_client():
+    return httpx.AsyncClient(
+        base_url=settings.AUTH_SERVICE_URL,
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+    )
+
+
+def _shared_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = _new_client()
+    return client
+
+
+def _forwarded_headers(request):
+    cookies = {name: request.COOKIES[name] for name in FORWARDED_COOKIES if request.COOKIES.get(name)}
+    headers = {}
+    if cookies:
+        headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in cookies.items())
+    if cookies.get('access_token'):
+        headers['Authorization'] = f"Bearer {cookies['access_token']}"
+    return headers
+
+
+async def _fetch_one(client, user_id, headers, deadline):
+    loop = asyncio.get_running_loop()
+    for path in PROFILE_PATHS:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            response = await asyncio.wait_for(client.get(path.format(user_id=user_id), headers=headers), remaining)
+        except asyncio.TimeoutError:
+            logger.warning("Profile lookup for user %s ran out of time", user_id)
+            return {}
+        except httpx.HTTPError as e:
+            logger.warning("Profile lookup for user %s failed: %s", user_id, e)
+            return {}
+        if response.status_code == 200:
+            try:
+                return response.json()
+            except ValueError:
+                return {}
+    return {}
+
+
+async def _fetch_all(client, user_ids, headers, budget):
+    deadline = asyncio.get_running_loop().time() + budget
+    profiles = await asyncio.gather(*(_fetch_one(client, user_id, headers, deadline) for user_id in user_ids))
+    return dict(zip(user_ids, profiles))
+
+
+async def fetch_profiles(request, user_ids, budget=None):
+    """Return ``{user_id: profile}`` for ``user_ids``, fetched concurrently."""
+    user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id is not None]
+    if not user_ids:
+        return {}
+    budget = settings.AUTH_PROFILE_FETCH_BUDGET if budget is None else budget
+    headers = _forwarded_headers(request)
+    if isinstance(request, ASGIRequest):
+        return await _fetch_all(_shared_client(), user_ids, headers, budget)
+    async with _new_client() as client:
+        return await _fetch_all(client, user_ids, headers, budget)
@@ -1,8 +1,136 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError, TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
 from django.conf import settings
+import logging
+import threading
+import time
+import jwt
 import requests
 
+logger = logging.getLogger(__name__)
+
+
+class JWKSKeySet:
+    """
+    Public keys of the auth service, fetched from its JWKS endpoint.
+
+    The key set is refreshed every AUTH_JWKS_REFRESH_SECONDS, or sooner when a
+    token names a `kid` we do not know yet (the auth service rotated its key).
+    If a refresh fails the previous keys are kept so a brief auth-service
+    outage does not lock everyone out.
+    """
+    # Minimum gap between refreshes forced by an unknown kid
+    UNKNOWN_KID_REFRESH_INTERVAL = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._fetched_at = None
+
+    @property
+    def url(self):
+        return getattr(settings, 'AUTH_JWKS_URL', None)
+
+    @property
+    def refresh_interval(self):
+        return getattr(settings, 'AUTH_JWKS_REFRESH_SECONDS', 300)
+
+    def _age(self):
+        if self._fetched_at is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    def _fetch(self):
+        # Record the attempt first so failures are also rate-limited
+        self._fetched_at = time.monotonic()
+        try:
+            response = requests.get(self.url, timeout=5)
+            response.raise_for_status()
+            key_set = jwt.PyJWKSet.from_dict(response.json())
+        except Exception as e:
+            logger.warning("Could not refresh JWKS from %s: %s", self.url, e)
+            return
+        self._keys = {key.key_id: key for key in key_set.keys if key.key_id}
+
+    def _refresh(self, force=False):
+        if not self.url:
+            return
+        age = self._age()
+        if not force and age is not None and age < self.refresh_interval:
+            return
+        with self._lock:
+            age = self._age()
+            if age is None or age >= self.refresh_interval or (force and age >= self.UNKNOWN_KID_REFRESH_INTERVAL):
+                self._fetch()
+
+    def get(self, kid):
+        """Return the PyJWK for `kid`, or None if the auth service does not publish it."""
+        self._refresh()
+        if kid not in self._keys:
+            self._refresh(force=True)
+        return self._keys.get(kid)
+
+
+class JWKSTokenBackend(TokenBackend):
+    """
+    Verifies auth-service tokens locally using the JWKS key matching their
+    `kid` header. Tokens without a `kid` (legacy auth tokens and the media
+    tokens this service mints itself) use the configured HS256 key.
+    """
+
+    def __init__(self, key_set, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key_set = key_set
+
+    def decode(self, token, verify=True):
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError('Token is invalid') from ex
+
+        kid = header.get('kid')
+        if not kid:
+            return super().decode(token, verify)
+
+        jwk = self.key_set.get(kid)
+        if jwk is None:
+            raise TokenBackendError('Token is invalid')
+
+        try:
+            return jwt.decode(
+                token,
+                jwk.key,
+                algorithms=[jwk.algorithm_name],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    'verify_aud': self.audience is not None,
+                    'verify_signature': verify,
+                },
+            )
+        except jwt.ExpiredSignatureError as ex:
+            raise TokenBackendExpiredToken('Token is expired') from ex
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError('Token is invalid') from ex
+
+
+jwks_key_set = JWKSKeySet()
+
+token_backend = JWKSTokenBackend(
+    jwks_key_set,
+    api_settings.ALGORITHM,
+    api_settings.SIGNING_KEY,
+    api_settings.VERIFYING_KEY,
+    api_settings.AUDIENCE,
+    api_settings.ISSUER,
+    None,
+    api_settings.LEEWAY,
+    api_settings.JSON_ENCODER,
+)
+
 
 class ExternalUser:
     """
@@ -75,8 +203,12 @@ class CookieJWTAuthentication(JWTAuthentication):
                 if hdts_role is None:
                     raise ValueError('No valid role found for system hdts')
                 
-                # Fetch complete user profile from auth service
-                user_profile = self._fetch_user_profile(raw_token)
+                # Tokens from the auth service carry the profile claims; only
+                # older tokens without them need a round-trip for the profile
+                if 'first_name' in validated_token.payload:
+                    user_profile = validated_token.payload
+                else:
+                    user_profile = self._fetch_user_profile(raw_token)
                 
                 user = ExternalUser(
                     user_id=validated_token['user_id'],
@@ -138,7 +270,15 @@ class CookieJWTAuthentication(JWTAuthentication):
                 except Exception:
                     email = None
 
-                return ExternalUser(user_id=user_id, email=email, role=hdts_role)
+                return ExternalUser(
+                    user_id=user_id,
+                    email=email,
+                    role=hdts_role,
+                    first_name=validated_token.get('first_name'),
+                    last_name=validated_token.get('last_name'),
+                    department=validated_token.get('department'),
+                    company_id=validated_token.get('company_id'),
+                )
 
         # Fallback: token corresponds to local DB user — perform normal lookup
         try:
@@ -0,0 +1,177 @@
+"""
+Conditional GET for read endpoints.
+
+A view describes the current state of what it would return with validators
+taken from one aggregate query (``Max('update_date')`` and ``Count('pk')`` for
+a list, the row's own ``update_date`` for a single object), never by building
+the body. When the client's ``If-None-Match`` / ``If-Modified-Since`` still
+match, the view answers 304 without running; otherwise the response carries
+``ETag`` (and ``Last-Modified`` for single objects) for the next request.
+
+ETags mix in the requesting user, their role, the full path and the Accept
+header, because the same URL renders differently per user (scoping, internal
+comments) and per query string. They also roll over with the signed media URL
+period (MEDIA_URL_BUCKET), so a 304 never keeps attachment links that expired.
+
+Lists only get an ETag. A row leaving a filtered list (e.g. a New ticket
+being approved) or being deleted does not move ``Max(update_date)``, so a
+Last-Modified date would wrongly report the list as unchanged; the count in
+the ETag catches both.
+
+Validators are computed before the view body runs, so a validators function
+must return ``None`` when the caller may not see the resource; the view then
+runs as usual and produces its own 403/404.
+"""
+import hashlib
+import time
+from collections import namedtuple
+from datetime import datetime
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+Validators = namedtuple('Validators', ['etag', 'last_modified'])
+
+
+def make_etag(request, *parts):
+    user = getattr(request, 'user', None)
+    key = '|'.join(str(part) for part in (
+        type(user).__name__,
+        getattr(user, 'id', None),
+        getattr(user, 'role', None),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        int(time.time() // settings.MEDIA_URL_BUCKET),
+        *parts,
+    ))
+    return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+def _aggregates(field, extra):
+    return dict(
+        _latest=Max(field),
+        # Aggregates over related rows join them in; count each object once
+        _count=Count('pk', distinct=bool(extra)),
+        **extra,
+    )
+
+
+def _validators(request, values, single):
+    if single and not values['_count']:
+        return None
+    etag = make_etag(request, *(values[key] for key in sorted(values)))
+    last_modified = None
+    if single:
+        last_modified = max((value for value in values.values() if isinstance(value, datetime)), default=None)
+    return Validators(etag, last_modified)
+
+
+def queryset_validators(request, queryset, field='update_date', extra=None, single=False):
+    """
+    Validators for ``queryset`` from one aggregate query.
+
+    ``extra`` maps names to further aggregates the representation depends on,
+    e.g. ``{'comments': Max('comments__id')}``. With ``single=True`` the
+    queryset is one object: returns ``None`` if it does not exist, and the
+    newest datetime among the aggregates becomes Last-Modified.
+    """
+    values = queryset.order_by().aggregate(**_aggregates(field, extra or {}))
+    return _validators(request, values, single)
+
+
+async def aqueryset_validators(request, queryset, field='update_date', extra=None, single=False):
+    """``queryset_validators`` for async views."""
+    values = await queryset.order_by().aaggregate(**_aggregates(field, extra or {}))
+    return _validators(request, values, single)
+
+
+def _not_modified(request, validators):
+    last_modified = int(validators.last_modified.timestamp()) if validators.last_modified else None
+    return get_conditional_response(request, etag=validators.etag, last_modified=last_modified)
+
+
+def _attach(response, validators):
+    response['ETag'] = validators.etag
+    if validators.last_modified is not None:
+        response['Last-Modified'] = http_date(int(validators.last_modified.timestamp()))
+    # Browsers may keep the body but must revalidate; shared caches must not keep it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_response(request, validators, render):
+    """Return 304 if ``validators`` match the request, else ``render()`` with validators attached."""
+    if validators is None or request.method not in ('GET', 'HEAD'):
+        return render()
+    response = _not_modified(request, validators)
+    if response is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+    return _attach(response, validators)
+
+
+async def aconditional_response(request, validators, render):
+    """``conditional_response`` for async views; ``render`` is a coroutine function."""
+    if validators is None or request.method not in ('GET', 'HEAD'):
+        return await render()
+    response = _not_modified(request, validators)
+    if response is None:
+        response = await render()
+        if response.status_code != 200:
+            return response
+    return _attach(response, validators)
+
+
+def conditional_get(validators_func):
+    """
+    Decorator for function views, applied below ``@api_view`` and friends.
+    ``validators_func`` takes the view's arguments and returns ``Validators``
+    or ``None``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            return conditional_response(
+                request,
+                validators_func(request, *args, **kwargs),
+                lambda: view(request, *args, **kwargs),
+            )
+        return wrapper
+    return decorator
+
+
+class ConditionalGetMixin:
+    """
+    Conditional ``list`` and ``retrieve`` for model viewsets whose
+    ``get_queryset`` already limits rows to what the user may see.
+    """
+    conditional_field = 'update_date'
+
+    def get_conditional_extra(self):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        validators = queryset_validators(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            self.conditional_field,
+            self.get_conditional_extra(),
+        )
+        return conditional_response(request, validators, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        validators = queryset_validators(
+            request,
+            self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup_url_kwarg]}),
+            self.conditional_field,
+            self.get_conditional_extra(),
+            single=True,
+        )
+        return conditional_response(request, validators, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
@@ -0,0 +1,366 @@
+"""
+Streaming CSV/XLSX export of tickets and activity logs.
+
+Rows are read with ``QuerySet.iterator(chunk_size=EXPORT_CHUNK_SIZE)`` (a
+server-side cursor on PostgreSQL) and written out as they arrive, so memory
+use does not grow with the date range:
+
+* CSV rows are encoded in small batches and handed to a streaming response.
+* XLSX is written by XlsxWriter in ``constant_memory`` mode, which flushes
+  each row to a temporary file. A workbook is a zip and cannot be sent before
+  it is complete, so the finished file is then streamed from disk.
+
+Ticket exports flatten ``dynamic_data`` into ``dynamic_data.<key>`` columns
+(nested objects get dotted keys). A streamed file needs its header first, so
+the keys are collected by an extra pass that reads only that column.
+
+Under ASGI a response has to be fed by an async iterator, or Django reads the
+whole body into memory before sending it; ``export_response`` pulls the sync
+row generator through ``sync_to_async`` a batch at a time.
+"""
+import csv
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ActivityLog, Ticket
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+# Bytes of CSV gathered before a chunk is sent
+CSV_BUFFER_SIZE = 64 * 1024
+FILE_BLOCK_SIZE = 64 * 1024
+# Response chunks produced per sync_to_async hop under ASGI
+ASGI_BATCH = 16
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_STRING = 32767
+# Leading characters that make spreadsheet apps evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportError(Exception):
+    pass
+
+
+def flatten(value, prefix=''):
+    """Flatten nested dicts into dotted keys; lists and scalars are kept as values."""
+    items = {}
+    for key, item in value.items():
+        name = f'{prefix}{key}'
+        if isinstance(item, dict) and item:
+            items.update(flatten(item, f'{name}.'))
+        else:
+            items[name] = item
+    return items
+
+
+def _parse_bound(value, name):
+    """Parse a date or datetime; a bare date means midnight at its start."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ExportError(f'{name} must be a date (YYYY-MM-DD) or an ISO datetime')
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _date_range(queryset, field, params):
+    since = _parse_bound(params.get('since'), 'since')
+    until = _parse_bound(params.get('until'), 'until')
+    if since:
+        queryset = queryset.filter(**{f'{field}__gte': since})
+    if until:
+        # A bare date includes the whole day
+        if parse_datetime(params['until']) is None:
+            until += timedelta(days=1)
+        queryset = queryset.filter(**{f'{field}__lt': until})
+    return queryset
+
+
+class TicketExport:
+    name = 'tickets'
+    # (column, values() lookup)
+    fields = [
+        ('id', 'id'),
+        ('ticket_number', 'ticket_number'),
+        ('subject', 'subject'),
+        ('category', 'category'),
+        ('sub_category', 'sub_category'),
+        ('status', 'status'),
+        ('priority', 'priority'),
+        ('department', 'department'),
+        ('employee_id', 'employee_id'),
+        ('employee_cookie_id', 'employee_cookie_id'),
+        ('employee_company_id', 'employee__company_id'),
+        ('employee_first_name', 'employee__first_name'),
+        ('employee_last_name', 'employee__last_name'),
+        ('employee_email', 'employee__email'),
+        ('employee_department', 'employee__department'),
+        ('assigned_to_id', 'assigned_to_id'),
+        ('assigned_to_first_name', 'assigned_to__first_name'),
+        ('assigned_to_last_name', 'assigned_to__last_name'),
+        ('approved_by', 'approved_by'),
+        ('rejected_by', 'rejected_by'),
+        ('submit_date', 'submit_date'),
+        ('update_date', 'update_date'),
+        ('time_closed', 'time_closed'),
+        ('response_time_seconds', 'response_time'),
+        ('resolution_time_seconds', 'resolution_time'),
+        ('scheduled_date', 'scheduled_date'),
+        ('asset_name', 'asset_name'),
+        ('serial_number', 'serial_number'),
+        ('location', 'location'),
+        ('requested_budget', 'requested_budget'),
+        ('fiscal_year', 'fiscal_year'),
+        ('rejection_reason', 'rejection_reason'),
+        ('description', 'description'),
+    ]
+
+    def __init__(self, params):
+        queryset = _date_range(Ticket.objects.all(), 'submit_date', params)
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'])
+        if params.get('department'):
+            queryset = queryset.filter(department=params['department'])
+        self.queryset = queryset.order_by('id')
+        self._dynamic_keys = None
+
+    def dynamic_keys(self):
+        if self._dynamic_keys is None:
+            keys = {}
+            values = self.queryset.exclude(dynamic_data=None).values_list('dynamic_data', flat=True)
+            for dynamic in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                if isinstance(dynamic, dict):
+                    keys.update(dict.fromkeys(flatten(dynamic)))
+            self._dynamic_keys = sorted(keys)
+        return self._dynamic_keys
+
+    def columns(self):
+        return [column for column, _lookup in self.fields] + [f'dynamic_data.{key}' for key in self.dynamic_keys()]
+
+    def rows(self):
+        keys = self.dynamic_keys()
+        lookups = [lookup for _column, lookup in self.fields] + ['dynamic_data']
+        for *values, dynamic in self.queryset.values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            flat = flatten(dynamic) if isinstance(dynamic, dict) else {}
+            yield values + [flat.get(key) for key in keys]
+
+
+class ActivityLogExport:
+    name = 'activity_logs'
+    fields = [
+        ('id', 'id'),
+        ('timestamp', 'timestamp'),
+        ('action_type', 'action_type'),
+        ('user_id', 'user_id'),
+        ('user_email', 'user__email'),
+        ('user_first_name', 'user__first_name'),
+        ('user_last_name', 'user__last_name'),
+        ('actor_id', 'actor_id'),
+        ('actor_email', 'actor__email'),
+        ('ticket_id', 'ticket_id'),
+        ('ticket_number', 'ticket__ticket_number'),
+        ('message', 'message'),
+        ('metadata', 'metadata'),
+    ]
+
+    def __init__(self, params):
+        queryset = _date_range(ActivityLog.objects.all(), 'timestamp', params)
+        if params.get('action_type'):
+            queryset = queryset.filter(action_type=params['action_type'])
+        if params.get('user_id'):
+            try:
+                queryset = queryset.filter(user_id=int(params['user_id']))
+            except ValueError:
+                raise ExportError('user_id must be an integer')
+        self.queryset = queryset.order_by('id')
+
+    def columns(self):
+        return [column for column, _lookup in self.fields]
+
+    def rows(self):
+        lookups = [lookup for _column, lookup in self.fields]
+        for values in self.queryset.values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield list(values)
+
+
+EXPORTS = {
+    'tickets': TicketExport,
+    'activity_logs': ActivityLogExport,
+}
+
+
+def build_export(kind, params):
+    if kind not in EXPORTS:
+        raise ExportError(f"Unknown export. Choose one of: {', '.join(EXPORTS)}")
+    return EXPORTS[kind](params)
+
+
+# CSV
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(export):
+    writer = csv.writer(_Echo())
+    # BOM so Excel opens the file as UTF-8
+    buffer = ['﻿' + writer.writerow(export.columns())]
+    size = len(buffer[0])
+    for row in export.rows():
+        line = writer.writerow([_csv_value(value) for value in row])
+        buffer.append(line)
+        size += len(line)
+        if size >= CSV_BUFFER_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+# XLSX
+
+def write_xlsx(export, fileobj):
+    """Write ``export`` to ``fileobj`` (a path or binary file) as an XLSX workbook."""
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise ExportError('XLSX export needs the XlsxWriter package')
+
+    workbook = xlsxwriter.Workbook(fileobj, {
+        'constant_memory': True,
+        # Cells hold data, never formulas or links typed in by users
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+    })
+    header = workbook.add_format({'bold': True})
+    formats = {
+        datetime: workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'}),
+        date: workbook.add_format({'num_format': 'yyyy-mm-dd'}),
+    }
+    columns = export.columns()
+
+    def new_sheet(number):
+        sheet = workbook.add_worksheet(export.name if number == 1 else f'{export.name} ({number})')
+        sheet.write_row(0, 0, columns, header)
+        sheet.freeze_panes(1, 0)
+        return sheet
+
+    sheet_number = 1
+    sheet = new_sheet(sheet_number)
+    row_index = 0
+    for row in export.rows():
+        row_index += 1
+        if row_index >= XLSX_MAX_ROWS:
+            sheet_number += 1
+            sheet = new_sheet(sheet_number)
+            row_index = 1
+        for column, value in enumerate(row):
+            _write_cell(sheet, row_index, column, value, formats)
+    workbook.close()
+
+
+def _write_cell(sheet, row, column, value, formats):
+    if value is None:
+        return
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value).replace(tzinfo=None)
+        sheet.write_datetime(row, column, value, formats[datetime])
+    elif isinstance(value, date):
+        sheet.write_datetime(row, column, value, formats[date])
+    elif isinstance(value, bool):
+        sheet.write_boolean(row, column, value)
+    elif isinstance(value, (int, float, Decimal)):
+        sheet.write_number(row, column, float(value))
+    elif isinstance(value, timedelta):
+        sheet.write_number(row, column, int(value.total_seconds()))
+    elif isinstance(value, (dict, list)):
+        sheet.write_string(row, column, json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)[:XLSX_MAX_STRING])
+    else:
+        sheet.write_string(row, column, str(value)[:XLSX_MAX_STRING])
+
+
+def xlsx_chunks(export):
+    with tempfile.TemporaryFile() as fh:
+        write_xlsx(export, fh)
+        fh.seek(0)
+        while True:
+            block = fh.read(FILE_BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+
+# Responses
+
+def _next_batch(iterator):
+    batch = []
+    for chunk in iterator:
+        batch.append(chunk)
+        if len(batch) >= ASGI_BATCH:
+            break
+    return batch
+
+
+async def _async_chunks(chunks):
+    iterator = iter(chunks)
+    while True:
+        batch = await sync_to_async(_next_batch)(iterator)
+        if not batch:
+            return
+        for chunk in batch:
+            yield chunk
+
+
+def export_chunks(export, file_format):
+    if file_format == 'xlsx':
+        return xlsx_chunks(export)
+    return csv_chunks(export)
+
+
+def export_response(request, export, file_format):
+    if file_format not in FORMATS:
+        raise ExportError(f"Unknown format. Choose one of: {', '.join(FORMATS)}")
+    chunks = export_chunks(export, file_format)
+    if isinstance(request, ASGIRequest):
+        chunks = _async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[file_format])
+    filename = f'{export.name}-{timezone.localtime():%Y%m%d-%H%M%S}.{file_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.archive import BATCH_SIZE, archivable, archive_tickets
+
+
+class Command(BaseCommand):
+    help = 'Move Closed and Withdrawn tickets closed more than N days ago into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                            help=f'Archive tickets closed more than N days ago (default {settings.ARCHIVE_AFTER_DAYS})')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Tickets per transaction')
+        parser.add_argument('--limit', type=int, help='Stop after this many tickets')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tickets that would be archived')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archivable(options['days']).count()
+            self.stdout.write(f'{count} ticket(s) would be archived')
+            return
+        count = archive_tickets(options['days'], options['batch_size'], options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {count} ticket(s)'))
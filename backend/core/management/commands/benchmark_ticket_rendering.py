@@ -0,0 +1,110 @@
+import io
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import compression
+from core.models import Employee, Ticket
+from core.renderers import ORJSONParser, ORJSONRenderer
+from core.serializers import TicketSerializer
+
+
+def best_of(rounds, func):
+    timings = []
+    result = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the stdlib and orjson renderers/parsers and gzip/brotli on a '
+        'ticket list. Tickets are created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=10000, help='Tickets in the list (default 10000)')
+        parser.add_argument('--rounds', type=int, default=5, help='Runs per measurement; the best is reported')
+
+    def handle(self, *args, **options):
+        count, rounds = options['tickets'], options['rounds']
+        with transaction.atomic():
+            self._create_tickets(count)
+            queryset = Ticket.objects.filter(ticket_number__startswith='BENCH').order_by('id')
+
+            seconds, serialized = best_of(1, lambda: TicketSerializer(
+                queryset.select_related('employee', 'assigned_to').prefetch_related('attachments'), many=True
+            ).data)
+            self.stdout.write(f'{count} tickets, best of {rounds} runs')
+            self.stdout.write(f'  TicketSerializer (one run, same for both renderers): {seconds * 1000:.0f} ms')
+
+            # Serializer output is strings; raw values() carry Decimal/date/datetime
+            # the way the hand-built payloads in core.views do
+            raw = list(queryset.values())
+            for label, data in (('serialized', serialized), ('raw values', raw)):
+                self._compare(label, data, rounds)
+            transaction.set_rollback(True)
+
+    def _create_tickets(self, count):
+        employee = Employee.objects.first() or Employee.objects.create_user(
+            email='benchmark@example.invalid', password=None, company_id='MA9999',
+            first_name='Bench', last_name='Mark', department='IT Department',
+        )
+        now = timezone.now()
+        Ticket.objects.bulk_create([
+            Ticket(
+                ticket_number=f'BENCH{i:06d}',
+                employee=employee,
+                subject=f'Laptop does not boot after update #{i}',
+                category='IT Support',
+                sub_category='Hardware Troubleshooting',
+                description='The laptop shows a black screen after the latest update. ' * 3,
+                priority=['Critical', 'High', 'Medium', 'Low'][i % 4],
+                department='IT Department',
+                asset_name='Dell Latitude 5420',
+                serial_number=f'SN-{i:08d}',
+                location='Main Office - 2nd Floor',
+                expected_return_date=date.today() + timedelta(days=i % 30),
+                requested_budget=Decimal('12500.50') + i,
+                cost_items=[{'item': 'Replacement SSD', 'cost': '4500.00'}],
+                dynamic_data={'issueType': 'Not Functioning', 'notes': 'café – “quoted”'},
+                status='Open',
+                submit_date=now,
+            )
+            for i in range(count)
+        ], batch_size=1000)
+
+    def _compare(self, label, data, rounds):
+        std_seconds, std_body = best_of(rounds, lambda: JSONRenderer().render(data))
+        fast_seconds, fast_body = best_of(rounds, lambda: ORJSONRenderer().render(data))
+        self.stdout.write(f'  [{label}] {len(std_body) / 1024:.0f} KiB, identical output: {std_body == fast_body}')
+        self.stdout.write(
+            f'    render  json {std_seconds * 1000:7.1f} ms   orjson {fast_seconds * 1000:7.1f} ms'
+            f'   ({std_seconds / fast_seconds:.1f}x)'
+        )
+
+        context = {'encoding': 'utf-8'}
+        std_seconds, _ = best_of(rounds, lambda: JSONParser().parse(io.BytesIO(std_body), parser_context=context))
+        fast_seconds, _ = best_of(rounds, lambda: ORJSONParser().parse(io.BytesIO(std_body), parser_context=context))
+        self.stdout.write(
+            f'    parse   json {std_seconds * 1000:7.1f} ms   orjson {fast_seconds * 1000:7.1f} ms'
+            f'   ({std_seconds / fast_seconds:.1f}x)'
+        )
+
+        seconds, body = best_of(rounds, lambda: compress_string(fast_body, max_random_bytes=compression.GZIP_MAX_RANDOM_BYTES))
+        self.stdout.write(f'    gzip    {seconds * 1000:7.1f} ms   {len(body) / 1024:.0f} KiB')
+        if compression.brotli is not None:
+            seconds, body = best_of(rounds, lambda: compression.brotli.compress(fast_body, quality=compression.BROTLI_QUALITY))
+            self.stdout.write(f'    brotli  {seconds * 1000:7.1f} ms   {len(body) / 1024:.0f} KiB')
+        else:
+            self.stdout.write('    brotli  not installed')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import EXPORTS, FORMATS, ExportError, build_export, csv_chunks, write_xlsx
+
+
+class Command(BaseCommand):
+    help = 'Export tickets or activity logs to a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS), help='What to export')
+        parser.add_argument('--format', choices=list(FORMATS), default='csv', dest='file_format')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout, CSV only)')
+        parser.add_argument('--since', help='Start date or ISO datetime (inclusive)')
+        parser.add_argument('--until', help='End date (inclusive) or ISO datetime (exclusive)')
+        parser.add_argument('--status', help='Tickets only: filter by status')
+        parser.add_argument('--department', help='Tickets only: filter by department')
+        parser.add_argument('--action-type', dest='action_type', help='Activity logs only: filter by action type')
+        parser.add_argument('--user-id', dest='user_id', help='Activity logs only: filter by user')
+
+    def handle(self, *args, **options):
+        params = {key: options[key] for key in ('since', 'until', 'status', 'department', 'action_type', 'user_id') if options[key]}
+        output = options['output']
+        try:
+            export = build_export(options['kind'], params)
+            if options['file_format'] == 'xlsx':
+                if not output:
+                    raise CommandError('--output is required for XLSX')
+                write_xlsx(export, output)
+            elif output:
+                with open(output, 'wb') as fh:
+                    for chunk in csv_chunks(export):
+                        fh.write(chunk)
+            else:
+                for chunk in csv_chunks(export):
+                    self.stdout.write(chunk.decode(), ending='')
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if output:
+            self.stderr.write(self.style.SUCCESS(f'Wrote {output}'))
@@ -0,0 +1,53 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Employee
+from core.ticket_intake import BATCH_SIZE, ingest
+
+
+def _records(reader):
+    for row in reader:
+        record = {key: value for key, value in row.items() if key and value not in ('', None)}
+        if 'cost_items' in record:
+            try:
+                record['cost_items'] = json.loads(record['cost_items'])
+            except ValueError:
+                pass
+        yield record
+
+
+class Command(BaseCommand):
+    help = (
+        'Create tickets from a CSV file with a header row of ticket field names '
+        '(plus employee_company_id, employee_email or employee_cookie_id for the owner)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file, or - for standard input")
+        parser.add_argument('--owner', help='Company id of the employee who owns rows naming no owner, and is logged as their creator')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per transaction')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            owner = Employee.objects.filter(company_id=options['owner']).first()
+            if owner is None:
+                raise CommandError(f"No employee with company id {options['owner']}")
+
+        actor_name = f'{owner.first_name} {owner.last_name}'.strip() if owner else ''
+        if options['path'] == '-':
+            result = ingest(_records(csv.DictReader(sys.stdin)), owner, actor_name, options['batch_size'])
+        else:
+            with open(options['path'], newline='', encoding=options['encoding']) as f:
+                result = ingest(_records(csv.DictReader(f)), owner, actor_name, options['batch_size'])
+
+        for error in result['errors']:
+            # Row 1 is the header
+            self.stderr.write(f"Row {error['index'] + 2}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(f"Created {len(result['created'])} ticket(s)"))
+        if result['errors']:
+            self.stdout.write(self.style.WARNING(f"Skipped {len(result['errors'])} row(s)"))
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.ticket_events import RETENTION_DAYS, prune_events
+
+
+class Command(BaseCommand):
+    help = 'Delete streamed ticket events older than the given number of days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=RETENTION_DAYS, help='Keep events from the last N days (default TICKET_EVENTS_RETENTION_DAYS, 7)')
+
+    def handle(self, *args, **options):
+        deleted = prune_events(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} ticket event(s)'))
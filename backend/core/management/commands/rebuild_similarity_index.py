@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.ticket_similarity import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the near-duplicate index (MinHash signatures and LSH buckets) of open tickets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} open ticket(s)'))
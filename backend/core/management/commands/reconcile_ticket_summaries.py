@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.ticket_summary import reconcile, reconcile_archived
+
+
+class Command(BaseCommand):
+    help = "Recompute every ticket's summary columns (comment and attachment counts, last activity, coordinator) from its comments and attachments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--skip-archived', action='store_true', help='Leave the snapshots of archived tickets alone')
+
+    def handle(self, *args, **options):
+        fixed = reconcile(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Corrected {fixed} ticket(s)'))
+        if not options['skip_archived']:
+            fixed = reconcile_archived(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Corrected {fixed} archived ticket(s)'))
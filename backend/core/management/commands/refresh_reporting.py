@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.reporting import BATCH_SIZE, rebuild, refresh
+
+
+class Command(BaseCommand):
+    help = 'Fold ticket changes since the last run into the reporting aggregates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Drop the aggregates and recompute them from every ticket')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = rebuild(options['batch_size'])
+        else:
+            count = refresh(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {count} ticket change(s)'))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from core.models import Employee
+from core.id_allocator import reserve_company_ids
 import random
 
 FIRST_NAMES = [
@@ -30,17 +31,6 @@ ROLES = ['Employee', 'Ticket Coordinator', 'System Admin']
 STATUSES = ['Pending', 'Approved', 'Denied']
 
 
-def generate_company_id(existing_ids):
-    # format MA0001 -> MA9999
-    for _ in range(10000):
-        num = random.randint(1, 9999)
-        cid = f"MA{num:04d}"
-        if cid not in existing_ids:
-            existing_ids.add(cid)
-            return cid
-    raise RuntimeError('Exhausted company id space')
-
-
 class Command(BaseCommand):
     help = 'Seed the database with 150 Employee users (gmail addresses).'
 
@@ -51,7 +41,8 @@ class Command(BaseCommand):
         count = options['count']
         created = 0
         existing_emails = set(Employee.objects.values_list('email', flat=True))
-        existing_company_ids = set(Employee.objects.values_list('company_id', flat=True))
+        # Reserve the whole block of company IDs up front from the shared counter
+        company_ids = iter(reserve_company_ids(count))
 
         # Distribute roles roughly (total count will be --count)
         role_cycle = (['Employee'] * 80) + (['Ticket Coordinator'] * 40) + (['System Admin'] * 30)
@@ -74,8 +65,8 @@ class Command(BaseCommand):
                 email = f"{base_email}{suffix_num}@gmail.com"
                 suffix_num += 1
 
-            # generate unique company id
-            company_id = generate_company_id(existing_company_ids)
+            # (failed saves burn an ID, so top up one at a time if the block runs out)
+            company_id = next(company_ids, None) or reserve_company_ids(1)[0]
 
             department = DEPARTMENTS[created % len(DEPARTMENTS)]
             role = role_cycle[i % len(role_cycle)]
@@ -1,25 +1,88 @@
-from rest_framework_simplejwt.tokens import AccessToken
+"""
+Media URLs.
+
+A media URL carries ``?sig=<user>.<expiry>.<mac>``, where mac is an HMAC of
+the file path, user and expiry keyed from SECRET_KEY. Checking it is one
+HMAC: no JWT decoding and no database lookup. Expiries are rounded up to a
+MEDIA_URL_BUCKET boundary, so a user gets the same URL for a file for a while
+and the browser cache can reuse the download.
+"""
+import hmac
+import math
+import time
+from base64 import urlsafe_b64encode
+from functools import lru_cache
+
 from django.conf import settings
+from django.utils.crypto import salted_hmac
 from urllib.parse import urlencode
 
+SIGNATURE_PARAM = 'sig'
+_SALT = 'core.media_utils.signed-media-url'
+
+
+def _user_scope(user):
+    # Local employees and auth-service users have separate id spaces
+    from .authentication import ExternalUser
+    return f"{'x' if isinstance(user, ExternalUser) else 'e'}{user.id}"
+
+
+def _mac(file_path, scope, expires):
+    digest = salted_hmac(_SALT, f'{file_path}\n{scope}\n{expires}', algorithm='sha256').digest()
+    return urlsafe_b64encode(digest[:16]).decode().rstrip('=')
+
+
+@lru_cache(maxsize=4096)
+def _signature(file_path, scope, expires):
+    return f'{scope}.{expires}.{_mac(file_path, scope, expires)}'
+
+
+def sign_media_path(file_path, user, now=None):
+    """The ``sig`` value granting ``user`` access to ``file_path`` for at least MEDIA_URL_TTL seconds."""
+    now = time.time() if now is None else now
+    bucket = settings.MEDIA_URL_BUCKET
+    expires = math.ceil((now + settings.MEDIA_URL_TTL) / bucket) * bucket
+    return _signature(file_path, _user_scope(user), expires)
+
+
+def verify_media_signature(file_path, signature, now=None):
+    """
+    Seconds left on a valid ``signature`` for ``file_path``, or None if it is
+    missing, malformed, forged or expired.
+    """
+    if not signature:
+        return None
+    try:
+        scope, expires, mac = signature.split('.')
+        expires = int(expires)
+    except ValueError:
+        return None
+    remaining = expires - (time.time() if now is None else now)
+    if remaining <= 0:
+        return None
+    if not hmac.compare_digest(mac, _mac(file_path, scope, expires)):
+        return None
+    return int(remaining)
+
+
+def signed_media_url(base_url, file_path, user):
+    return f'{base_url}?{urlencode({SIGNATURE_PARAM: sign_media_path(file_path, user)})}'
+
 
 def generate_secure_media_url(file_path, user):
     """
-    Generate a secure media URL with authentication token
-    
+    Generate a secure media URL with an expiring signature
+
     Args:
         file_path: The relative path to the media file (e.g., 'employee_images/profile.jpg')
         user: The authenticated user requesting the file
-    
+
     Returns:
-        A secure URL with embedded access token
+        A secure URL with an embedded signature (see sign_media_path)
     """
     if not file_path:
         return None
-    
-    # Generate a fresh access token for the user
-    token = AccessToken.for_user(user)
-    
+
     # Build the base URL
     if settings.DEBUG:
         # In development, files are served directly
@@ -27,28 +90,24 @@ def generate_secure_media_url(file_path, user):
     else:
         # In production, files go through our secure media view
         base_url = f"https://smartsupport-hdts-backend.up.railway.app/media/{file_path}"
-    
-    # Add token as query parameter
-    params = {'token': str(token)}
-    secure_url = f"{base_url}?{urlencode(params)}"
-    
-    return secure_url
+
+    return signed_media_url(base_url, file_path, user)
 
 
 def get_media_url_with_token(file_field, user):
     """
-    Get a secure media URL for a Django FileField with authentication token
-    
+    Get a secure media URL for a Django FileField with an expiring signature
+
     Args:
         file_field: Django FileField instance
         user: The authenticated user requesting the file
-    
+
     Returns:
-        A secure URL with embedded access token, or None if no file
+        A secure signed URL, or None if no file
     """
     if not file_field:
         return None
-    
+
     try:
         file_path = file_field.name  # Get relative path from MEDIA_ROOT
         return generate_secure_media_url(file_path, user)
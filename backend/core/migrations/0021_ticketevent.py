@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_idsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('ticket_created', 'Ticket Created'), ('status_changed', 'Status Changed'), ('ticket_assigned', 'Ticket Assigned'), ('comment_added', 'Comment Added')], max_length=32)),
+                ('ticket_id', models.BigIntegerField(db_index=True)),
+                ('ticket_number', models.CharField(blank=True, max_length=32, null=True)),
+                ('status', models.CharField(blank=True, max_length=20, null=True)),
+                ('employee_id', models.BigIntegerField(blank=True, null=True)),
+                ('employee_cookie_id', models.IntegerField(blank=True, null=True)),
+                ('assigned_to_id', models.BigIntegerField(blank=True, null=True)),
+                ('is_internal', models.BooleanField(default=False)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_ticketevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket_id', models.BigIntegerField()),
+                ('ticket_number', models.CharField(blank=True, max_length=32, null=True)),
+                ('employee_id', models.BigIntegerField(blank=True, null=True)),
+                ('employee_cookie_id', models.IntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['update_date', 'id'], name='ticket_update_date_id_idx'),
+        ),
+    ]
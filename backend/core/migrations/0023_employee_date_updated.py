@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_ticket_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='date_updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
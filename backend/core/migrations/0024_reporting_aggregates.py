@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_employee_date_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportingWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('update_date', models.DateTimeField(blank=True, null=True)),
+                ('ticket_id', models.BigIntegerField(default=0)),
+                ('tombstone_id', models.BigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TicketFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket_id', models.BigIntegerField(unique=True)),
+                ('category', models.CharField(max_length=100)),
+                ('department', models.CharField(blank=True, default='', max_length=50)),
+                ('status', models.CharField(max_length=20)),
+                ('opened_on', models.DateField()),
+                ('closed_on', models.DateField(blank=True, null=True)),
+                ('resolution_seconds', models.BigIntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyTicketStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=100)),
+                ('department', models.CharField(blank=True, default='', max_length=50)),
+                ('opened', models.IntegerField(default=0)),
+                ('closed', models.IntegerField(default=0)),
+                ('resolved_count', models.IntegerField(default=0)),
+                ('resolution_seconds', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('day', 'category', 'department')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DepartmentBacklog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(blank=True, default='', max_length=50)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('department', 'status')},
+            },
+        ),
+    ]
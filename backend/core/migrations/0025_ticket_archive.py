@@ -0,0 +1,78 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:49
+
+import core.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_reporting_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickettombstone',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ArchivedTicket',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('ticket_number', models.CharField(blank=True, max_length=32, null=True, unique=True)),
+                ('employee_cookie_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('subject', models.CharField(max_length=255)),
+                ('category', models.CharField(max_length=100)),
+                ('department', models.CharField(blank=True, max_length=50, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('submit_date', models.DateTimeField()),
+                ('time_closed', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('resolution_time', models.DurationField(blank=True, null=True)),
+                ('data', models.JSONField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_assigned_tickets', to=settings.AUTH_USER_MODEL)),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_tickets', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedActivityLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action_type', models.CharField(max_length=64)),
+                ('message', models.TextField(blank=True, null=True)),
+                ('metadata', models.JSONField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_logs', to='core.archivedticket')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTicketAttachment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('file', models.FileField(max_length=255, storage=core.models.archive_storage, upload_to='')),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_type', models.CharField(max_length=100)),
+                ('file_size', models.IntegerField()),
+                ('upload_date', models.DateTimeField()),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='core.archivedticket')),
+                ('uploaded_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTicketComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_cookie_id', models.IntegerField(blank=True, null=True)),
+                ('comment', models.TextField()),
+                ('is_internal', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.archivedticket')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:55
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_ticket_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedticketattachment',
+            name='preview',
+            field=models.FileField(blank=True, max_length=255, storage=core.models.archive_storage, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='ticketattachment',
+            name='preview',
+            field=models.FileField(blank=True, max_length=255, upload_to='ticket_attachments/previews/'),
+        ),
+        migrations.AddField(
+            model_name='ticketattachment',
+            name='preview_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('none', 'No preview')], default='pending', max_length=12),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_counts(apps, schema_editor):
+    # Counts and last activity in one set-based UPDATE; coordinators need
+    # the reconcile_ticket_summaries command (core.ticket_summary)
+    Ticket = apps.get_model('core', 'Ticket')
+    TicketComment = apps.get_model('core', 'TicketComment')
+    TicketAttachment = apps.get_model('core', 'TicketAttachment')
+
+    def per_ticket(model, aggregate):
+        rows = model.objects.filter(ticket=OuterRef('pk')).order_by().values('ticket').annotate(value=aggregate)
+        return Subquery(rows.values('value')[:1])
+
+    Ticket.objects.update(
+        comment_count=Coalesce(per_ticket(TicketComment, Count('pk', filter=Q(is_internal=False))), Value(0)),
+        attachment_count=Coalesce(per_ticket(TicketAttachment, Count('pk')), Value(0)),
+        # Null-safe max of the two; stays null for tickets with neither
+        last_activity_at=Greatest(
+            Coalesce(per_ticket(TicketComment, Max('created_at')), per_ticket(TicketAttachment, Max('upload_date'))),
+            Coalesce(per_ticket(TicketAttachment, Max('upload_date')), per_ticket(TicketComment, Max('created_at'))),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_attachment_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='attachment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='coordinator',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='coordinator_cookie_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='coordinator_name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
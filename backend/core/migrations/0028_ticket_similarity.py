@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_ticket_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSignature',
+            fields=[
+                ('ticket', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core.ticket')),
+                ('text_hash', models.CharField(max_length=32)),
+                ('minhash', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TicketSimilarityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.ticket')),
+            ],
+        ),
+    ]
@@ -1,11 +1,11 @@
 import re
 import random
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.exceptions import ValidationError
 from django.conf import settings
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 SUFFIX_CHOICES = [
@@ -31,6 +31,17 @@ STATUS_CHOICES = [
     ('Denied', 'Denied'),
 ]
 
+class IdSequence(models.Model):
+    """
+    Named counter row used for atomic ID allocation (see core.id_allocator).
+    `value` is the last number handed out.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
 class EmployeeManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -68,6 +79,7 @@ class Employee(AbstractBaseUser, PermissionsMixin):
     is_superuser = models.BooleanField(default=False)
 
     date_created = models.DateTimeField(auto_now_add=True)  # <-- Add this line
+    date_updated = models.DateTimeField(auto_now=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['last_name', 'first_name', 'company_id']
@@ -202,9 +214,19 @@ def generate_unique_ticket_number():
 class Ticket(models.Model):
     ticket_number = models.CharField(max_length=32, unique=True, blank=True, null=True)
 
+    # Only ever written by core.ticket_summary's own UPDATEs, so a full save()
+    # of a ticket loaded earlier cannot put back an outdated count
+    COUNTER_FIELDS = ('comment_count', 'attachment_count', 'last_activity_at')
+
     def save(self, *args, **kwargs):
         if not self.ticket_number:
             self.ticket_number = generate_unique_ticket_number()
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            skipped = set(self.COUNTER_FIELDS) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped and field.name not in skipped
+            ]
         super().save(*args, **kwargs)
 
     employee = models.ForeignKey(
@@ -255,6 +277,19 @@ class Ticket(models.Model):
     resolution_time = models.DurationField(blank=True, null=True)
     time_closed = models.DateTimeField(blank=True, null=True)
     rejection_reason = models.TextField(blank=True, null=True)
+    # Summary of child rows, kept current on write (see core.ticket_summary)
+    comment_count = models.PositiveIntegerField(default=0)
+    attachment_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    coordinator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    coordinator_cookie_id = models.IntegerField(null=True, blank=True)
+    coordinator_name = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Delta sync walks tickets in (update_date, id) order (see core.ticket_sync)
+            models.Index(fields=['update_date', 'id'], name='ticket_update_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"Ticket #{self.id} - {self.subject}"
@@ -289,6 +324,137 @@ def send_ticket_to_workflow(sender, instance, created, **kwargs):
             import logging
             logging.getLogger(__name__).exception("Error preparing push_ticket_to_workflow task")
         
+@receiver(post_save, sender=Ticket)
+def index_ticket_text(sender, instance, created, update_fields=None, **kwargs):
+    from .ticket_similarity import ticket_saved
+    ticket_saved(instance, created, update_fields)
+
+class TicketSignature(models.Model):
+    """
+    MinHash signature of an open ticket's subject and description (see
+    core.ticket_similarity), with a hash of the text it was computed from.
+    """
+    ticket = models.OneToOneField(Ticket, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    text_hash = models.CharField(max_length=32)
+    minhash = models.BinaryField()
+
+    def __str__(self):
+        return f"Signature of ticket {self.ticket_id}"
+
+class TicketSimilarityBucket(models.Model):
+    """One LSH band of a TicketSignature; tickets sharing a key are duplicate candidates."""
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='+')
+    key = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"Bucket {self.key} of ticket {self.ticket_id}"
+
+class TicketEvent(models.Model):
+    """
+    Append-only log of ticket changes streamed to clients (see core.ticket_events).
+    The auto-increment id is the resumable SSE event id. Owner/assignee ids are
+    copied in so events can be filtered per subscriber without joins, and so
+    they outlive the ticket.
+    """
+    EVENT_TYPES = [
+        ('ticket_created', 'Ticket Created'),
+        ('status_changed', 'Status Changed'),
+        ('ticket_assigned', 'Ticket Assigned'),
+        ('comment_added', 'Comment Added'),
+    ]
+
+    event_type = models.CharField(max_length=32, choices=EVENT_TYPES)
+    ticket_id = models.BigIntegerField(db_index=True)
+    ticket_number = models.CharField(max_length=32, blank=True, null=True)
+    status = models.CharField(max_length=20, blank=True, null=True)
+    employee_id = models.BigIntegerField(null=True, blank=True)
+    employee_cookie_id = models.IntegerField(null=True, blank=True)
+    assigned_to_id = models.BigIntegerField(null=True, blank=True)
+    is_internal = models.BooleanField(default=False)  # Only coordinators/admins receive it
+    data = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id} on ticket {self.ticket_id}"
+
+class TicketTombstone(models.Model):
+    """Left behind when a ticket is deleted so sync clients can drop their copy."""
+    ticket_id = models.BigIntegerField()
+    ticket_number = models.CharField(max_length=32, blank=True, null=True)
+    employee_id = models.BigIntegerField(null=True, blank=True)
+    employee_cookie_id = models.IntegerField(null=True, blank=True)
+    archived = models.BooleanField(default=False)  # Moved to ArchivedTicket rather than deleted
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Deleted ticket {self.ticket_number or self.ticket_id}"
+
+
+class ReportingWatermark(models.Model):
+    """
+    How far the reporting job (core.reporting) has read: the last
+    ``(update_date, id)`` of Ticket and the last TicketTombstone id processed.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    update_date = models.DateTimeField(null=True, blank=True)
+    ticket_id = models.BigIntegerField(default=0)
+    tombstone_id = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.update_date}"
+
+class TicketFact(models.Model):
+    """A ticket as the reporting aggregates currently count it."""
+    ticket_id = models.BigIntegerField(unique=True)  # No FK: facts outlive deleted tickets until subtracted
+    category = models.CharField(max_length=100)
+    department = models.CharField(max_length=50, blank=True, default='')
+    status = models.CharField(max_length=20)
+    opened_on = models.DateField()
+    closed_on = models.DateField(null=True, blank=True)
+    resolution_seconds = models.BigIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Fact for ticket {self.ticket_id}"
+
+class DailyTicketStats(models.Model):
+    """Tickets opened and closed per day, category and department."""
+    day = models.DateField()
+    category = models.CharField(max_length=100)
+    department = models.CharField(max_length=50, blank=True, default='')
+    opened = models.IntegerField(default=0)
+    closed = models.IntegerField(default=0)
+    resolved_count = models.IntegerField(default=0)  # Closed tickets with a resolution_time
+    resolution_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('day', 'category', 'department')
+
+    def __str__(self):
+        return f"{self.day} {self.category} / {self.department or '-'}"
+
+class DepartmentBacklog(models.Model):
+    """Open tickets per department and status."""
+    department = models.CharField(max_length=50, blank=True, default='')
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('department', 'status')
+
+    def __str__(self):
+        return f"{self.department or '-'} {self.status}: {self.count}"
+
+
+@receiver(post_delete, sender=Ticket)
+def record_ticket_tombstone(sender, instance, **kwargs):
+    TicketTombstone.objects.create(
+        ticket_id=instance.pk,
+        ticket_number=instance.ticket_number,
+        employee_id=instance.employee_id,
+        employee_cookie_id=instance.employee_cookie_id,
+    )
+
 class TicketAttachment(models.Model):
     ticket = models.ForeignKey('Ticket', on_delete=models.CASCADE, related_name='attachments')
     file = models.FileField(upload_to='ticket_attachments/')
@@ -297,10 +463,39 @@ class TicketAttachment(models.Model):
     file_size = models.IntegerField()  # Size in bytes
     upload_date = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
+    # Small JPEG rendered by core.previews; 'pending' until it has been tried
+    preview = models.FileField(upload_to='ticket_attachments/previews/', max_length=255, blank=True)
+    preview_status = models.CharField(max_length=12, default='pending', choices=[
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('none', 'No preview'),
+    ])
+
+    def save(self, *args, **kwargs):
+        # The post_save receiver bumps the ticket's counters; commit both together
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.file_name} - {self.ticket.id}"
 
+@receiver(post_save, sender=TicketAttachment)
+def queue_attachment_preview(sender, instance, created, **kwargs):
+    if created and instance.preview_status == 'pending':
+        from .previews import queue_preview
+        queue_preview(instance.pk)
+
+@receiver(post_save, sender=TicketAttachment)
+def count_attachment(sender, instance, created, **kwargs):
+    if created:
+        from .ticket_summary import attachment_added
+        attachment_added(instance)
+
+@receiver(post_delete, sender=TicketAttachment)
+def uncount_attachment(sender, instance, **kwargs):
+    from .ticket_summary import attachment_deleted
+    attachment_deleted(instance)
+
 class TicketComment(models.Model):
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
@@ -316,10 +511,100 @@ class TicketComment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+
+    def save(self, *args, **kwargs):
+        # The post_save receiver bumps the ticket's counters; commit both together
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"Comment on {self.ticket.ticket_number} by {self.user}"
 
+@receiver(post_save, sender=TicketComment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        from .ticket_summary import comment_added
+        comment_added(instance)
+
+@receiver(post_delete, sender=TicketComment)
+def uncount_comment(sender, instance, **kwargs):
+    from .ticket_summary import comment_deleted
+    comment_deleted(instance)
+
+
+def archive_storage():
+    from django.core.files.storage import FileSystemStorage
+    return FileSystemStorage(location=settings.ARCHIVE_ROOT)
+
+class ArchivedTicket(models.Model):
+    """
+    A ticket moved out of Ticket by core.archive. Keeps the ticket's id;
+    ``data`` holds every Ticket field as it was, the columns are for lookups.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    ticket_number = models.CharField(max_length=32, unique=True, blank=True, null=True)
+    employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_tickets')
+    employee_cookie_id = models.IntegerField(null=True, blank=True, db_index=True)
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_assigned_tickets')
+    subject = models.CharField(max_length=255)
+    category = models.CharField(max_length=100)
+    department = models.CharField(max_length=50, blank=True, null=True)
+    status = models.CharField(max_length=20)
+    submit_date = models.DateTimeField()
+    time_closed = models.DateTimeField(null=True, blank=True, db_index=True)
+    resolution_time = models.DurationField(null=True, blank=True)
+    data = models.JSONField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def ticket_fields(self):
+        """``data`` with each value converted back to its Ticket field's type."""
+        return {
+            field.attname: field.to_python(self.data.get(field.attname))
+            for field in Ticket._meta.concrete_fields
+        }
+
+    def __str__(self):
+        return f"Archived ticket {self.ticket_number}"
+
+class ArchivedTicketAttachment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    ticket = models.ForeignKey(ArchivedTicket, on_delete=models.CASCADE, related_name='attachments')
+    file = models.FileField(storage=archive_storage, max_length=255)
+    preview = models.FileField(storage=archive_storage, max_length=255, blank=True)
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=100)
+    file_size = models.IntegerField()
+    upload_date = models.DateTimeField()
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+
+    def __str__(self):
+        return f"{self.file_name} - {self.ticket_id}"
+
+class ArchivedTicketComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    ticket = models.ForeignKey(ArchivedTicket, on_delete=models.CASCADE, related_name='comments')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    user_cookie_id = models.IntegerField(null=True, blank=True)
+    comment = models.TextField()
+    is_internal = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived comment on ticket {self.ticket_id}"
+
+class ArchivedActivityLog(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    action_type = models.CharField(max_length=64)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    message = models.TextField(blank=True, null=True)
+    ticket = models.ForeignKey(ArchivedTicket, on_delete=models.CASCADE, related_name='activity_logs')
+    metadata = models.JSONField(blank=True, null=True)
+    timestamp = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.action_type} on archived ticket {self.ticket_id}"
+
 
 VISIBILITY_CHOICES = [
     ('Employee', 'Employee'),
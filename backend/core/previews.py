@@ -0,0 +1,139 @@
+"""
+Attachment previews.
+
+Image attachments get a thumbnail, and PDFs a raster of their first page. The
+longest side is at most PREVIEW_SIZE pixels, saved as JPEG under
+ticket_attachments/previews/ next to the originals, so the ticket UI can show
+a few KB instead of downloading the upload.
+
+Rendering happens in the Celery worker (``core.tasks.generate_attachment_preview``).
+A new attachment is queued once its upload commits. Attachments from before
+previews existed stay 'pending' and are queued the first time they are
+serialized, so the backlog fills in as tickets are looked at. Attachments
+that cannot be previewed (other types, unreadable files) end up 'none' and are
+not tried again.
+
+PDFs are rendered with pypdfium2 when it is installed; without it they get no
+preview.
+"""
+import logging
+import mimetypes
+import os
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # optional: no PDF previews
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SIZE = 480
+JPEG_QUALITY = 80
+# While a job is queued, serializing the attachment again does not queue another
+QUEUE_LOCK_SECONDS = 600
+
+
+def _kind(attachment):
+    content_type = attachment.file_type or mimetypes.guess_type(attachment.file.name)[0] or ''
+    if content_type == 'application/pdf':
+        return 'pdf'
+    if content_type.startswith('image/') and content_type != 'image/svg+xml':
+        return 'image'
+    return None
+
+
+def _render_image(fileobj):
+    image = Image.open(fileobj)
+    # Lets the JPEG decoder scale down by up to 8x while decoding, instead of
+    # decoding a phone photo at full size only to shrink it
+    image.draft('RGB', (PREVIEW_SIZE, PREVIEW_SIZE))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+    return image
+
+
+def _render_pdf(fileobj):
+    if pdfium is None:
+        return None
+    pdf = pdfium.PdfDocument(fileobj)
+    try:
+        page = pdf[0]
+        # Page sizes are in points; scale 1 renders at 72 dpi
+        scale = PREVIEW_SIZE / max(page.get_size())
+        return page.render(scale=scale).to_pil()
+    finally:
+        pdf.close()
+
+
+def _jpeg(image):
+    if image.mode in ('RGBA', 'LA', 'P', 'PA'):
+        image = image.convert('RGBA')
+        flattened = Image.new('RGB', image.size, 'white')
+        flattened.paste(image, mask=image.getchannel('A'))
+        image = flattened
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def render_preview(attachment):
+    """JPEG bytes of ``attachment``'s preview, or None if it has none."""
+    kind = _kind(attachment)
+    if kind is None or not attachment.file:
+        return None
+    try:
+        with attachment.file.open('rb') as fileobj:
+            image = _render_pdf(fileobj) if kind == 'pdf' else _render_image(fileobj)
+            return _jpeg(image) if image is not None else None
+    except Exception:
+        logger.warning("Could not render a preview of attachment %s", attachment.pk, exc_info=True)
+        return None
+
+
+def generate_preview(attachment_id):
+    """Render and store the preview of a pending attachment; returns its preview_status."""
+    from .models import TicketAttachment
+
+    attachment = TicketAttachment.objects.filter(pk=attachment_id).first()
+    if attachment is None or attachment.preview_status != 'pending':
+        return attachment and attachment.preview_status
+
+    data = render_preview(attachment)
+    pending = TicketAttachment.objects.filter(pk=attachment_id, preview_status='pending')
+    if data is None:
+        pending.update(preview_status='none')
+        return 'none'
+
+    stem = os.path.splitext(os.path.basename(attachment.file.name))[0]
+    name = attachment.preview.storage.save(f'ticket_attachments/previews/{stem}.jpg', ContentFile(data))
+    # The attachment may have been archived or deleted while rendering
+    if not pending.update(preview=name, preview_status='ready'):
+        attachment.preview.storage.delete(name)
+        return None
+    return 'ready'
+
+
+def queue_preview(attachment_id):
+    """Have the worker render a preview for ``attachment_id`` once the current transaction commits."""
+    key = f'core.previews.queued:{attachment_id}'
+    if not cache.add(key, True, QUEUE_LOCK_SECONDS):
+        return
+
+    def enqueue():
+        # A broker outage must not fail the upload or the page listing it
+        try:
+            from .tasks import generate_attachment_preview
+            generate_attachment_preview.delay(attachment_id)
+        except Exception:
+            cache.delete(key)
+            logger.exception("Failed to enqueue the preview of attachment %s", attachment_id)
+
+    transaction.on_commit(enqueue)
@@ -0,0 +1,67 @@
+"""
+orjson-backed JSON renderer and parsers for DRF.
+
+Output matches ``rest_framework.renderers.JSONRenderer`` byte for byte for the
+payloads these views return: compact separators, UTF-8 rather than ``\\u``
+escapes, ``Z`` for UTC datetimes, and U+2028/U+2029 escaped. Anything orjson
+does not handle natively (Decimal, timedelta, lazy strings, querysets) goes
+through DRF's own ``JSONEncoder.default``, so hand-built dicts holding raw
+model values render the same as before.
+
+Requests for indented output (``Accept: application/json; indent=4`` and the
+browsable API) fall back to the stdlib renderer.
+
+``NDJSONParser`` does not read the body up front: ``request.data`` is an
+iterator of the records, parsed line by line as the view consumes it.
+"""
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits, which the stdlib encodes
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same JavaScript-safe escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        # orjson only reads UTF-8
+        if encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        from .ticket_intake import read_ndjson
+        return read_ndjson(stream or [])
@@ -0,0 +1,364 @@
+"""
+Reporting aggregates, kept up to date incrementally.
+
+Reports read from three small tables that never need a scan of Ticket:
+
+* ``DailyTicketStats``: tickets opened and closed per (day, category,
+  department), with summed resolution time, so mean resolution time over any
+  range is ``sum(resolution_seconds) / sum(resolved_count)``.
+* ``DepartmentBacklog``: open tickets per (department, status).
+* ``TicketFact``: each ticket as the aggregates currently count it.
+
+``refresh()`` (run by Celery beat, see ``core.tasks``) reads tickets changed
+after the watermark in ``(update_date, id)`` order, as ``core.ticket_sync``
+does, and deleted tickets from ``TicketTombstone``. For each one it takes the
+old fact's contribution out of the aggregates and puts the new one in, so a
+run costs time in proportion to what changed, not to history. Each batch is
+applied in one transaction together with the watermark, and the watermark
+row is locked so overlapping runs queue up instead of double counting.
+
+The watermark alone would miss a change that commits after a later one has
+been read: its ``update_date`` (or tombstone id) is then already behind the
+watermark. So every run also re-reads what changed in the last
+``REPORTING_LOOKBACK_SECONDS`` behind the watermark, tickets by
+``update_date`` and tombstones by ``deleted_at``. Folding is idempotent (a
+ticket whose fact is unchanged is skipped, a deleted ticket's fact is only
+subtracted while it exists), so re-reading costs reads but never counts twice.
+Tickets moved to the archive (core.archive) keep their facts and stay counted.
+
+A ticket counts as closed once its status is in ``CLOSED_STATUSES``. It is
+closed on the local date of ``time_closed``. Statuses that do not set
+``time_closed`` (Resolved, Rejected) use the date the job first saw them
+closed, which then stays put.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import ArchivedTicket, DailyTicketStats, DepartmentBacklog, ReportingWatermark, Ticket, TicketFact, TicketTombstone
+from .ticket_sync import SETTLE_SECONDS
+
+WATERMARK = 'tickets'
+BATCH_SIZE = 1000
+
+CLOSED_STATUSES = ['Resolved', 'Closed', 'Rejected', 'Withdrawn']
+
+FACT_FIELDS = ['category', 'department', 'status', 'opened_on', 'closed_on', 'resolution_seconds']
+STAT_FIELDS = ['opened', 'closed', 'resolved_count', 'resolution_seconds']
+
+
+def _local_date(value):
+    return timezone.localtime(value).date() if value else None
+
+
+def _fact(row, old, today):
+    closed_on = None
+    if row['status'] in CLOSED_STATUSES:
+        closed_on = _local_date(row['time_closed']) or (old and old['closed_on']) or today
+    resolution = row['resolution_time']
+    return {
+        'category': row['category'] or '',
+        'department': row['department'] or '',
+        'status': row['status'],
+        'opened_on': _local_date(row['submit_date']),
+        'closed_on': closed_on,
+        'resolution_seconds': int(resolution.total_seconds()) if resolution is not None and closed_on else None,
+    }
+
+
+def _contribute(fact, sign, daily, backlog):
+    """Add ``sign`` times ``fact``'s contribution to the delta counters."""
+    if fact is None:
+        return
+    category, department = fact['category'], fact['department']
+    daily[(fact['opened_on'], category, department)]['opened'] += sign
+    if fact['closed_on']:
+        closed = daily[(fact['closed_on'], category, department)]
+        closed['closed'] += sign
+        if fact['resolution_seconds'] is not None:
+            closed['resolved_count'] += sign
+            closed['resolution_seconds'] += sign * fact['resolution_seconds']
+    else:
+        backlog[(department, fact['status'])] += sign
+
+
+def _apply_daily(daily):
+    daily = {key: delta for key, delta in daily.items() if any(delta.values())}
+    if not daily:
+        return
+    existing = {
+        (row.day, row.category, row.department): row
+        for row in DailyTicketStats.objects.filter(day__in={day for day, _c, _d in daily})
+    }
+    changed, created = [], []
+    for key, delta in daily.items():
+        row = existing.get(key)
+        if row is None:
+            day, category, department = key
+            created.append(DailyTicketStats(day=day, category=category, department=department, **delta))
+            continue
+        for field, value in delta.items():
+            setattr(row, field, getattr(row, field) + value)
+        changed.append(row)
+    DailyTicketStats.objects.bulk_update(changed, STAT_FIELDS)
+    DailyTicketStats.objects.bulk_create(created)
+
+
+def _apply_backlog(backlog):
+    backlog = {key: delta for key, delta in backlog.items() if delta}
+    if not backlog:
+        return
+    existing = {(row.department, row.status): row for row in DepartmentBacklog.objects.all()}
+    changed, created = [], []
+    for (department, status), delta in backlog.items():
+        row = existing.get((department, status))
+        if row is None:
+            created.append(DepartmentBacklog(department=department, status=status, count=delta))
+        else:
+            row.count += delta
+            changed.append(row)
+    DepartmentBacklog.objects.bulk_update(changed, ['count'])
+    DepartmentBacklog.objects.bulk_create(created)
+    DepartmentBacklog.objects.filter(count=0).delete()
+
+
+def _watermark():
+    ReportingWatermark.objects.get_or_create(name=WATERMARK)
+    return ReportingWatermark.objects.select_for_update().get(name=WATERMARK)
+
+
+def _fold(rows, deleted_ids):
+    """Bring the facts and aggregates in line with ticket ``rows`` and deleted tickets."""
+    facts = {fact.ticket_id: fact for fact in TicketFact.objects.filter(ticket_id__in=[row['id'] for row in rows] + deleted_ids)}
+    daily = defaultdict(Counter)
+    backlog = Counter()
+    today = timezone.localdate()
+
+    changed, created = [], []
+    for row in rows:
+        fact = facts.get(row['id'])
+        old = {field: getattr(fact, field) for field in FACT_FIELDS} if fact else None
+        new = _fact(row, old, today)
+        if new == old:
+            continue
+        _contribute(old, -1, daily, backlog)
+        _contribute(new, 1, daily, backlog)
+        if fact is None:
+            created.append(TicketFact(ticket_id=row['id'], **new))
+        else:
+            for field, value in new.items():
+                setattr(fact, field, value)
+            changed.append(fact)
+
+    deleted = []
+    for ticket_id in deleted_ids:
+        fact = facts.get(ticket_id)
+        if fact is not None:
+            _contribute({field: getattr(fact, field) for field in FACT_FIELDS}, -1, daily, backlog)
+            deleted.append(fact.pk)
+
+    _apply_daily(daily)
+    _apply_backlog(backlog)
+    TicketFact.objects.bulk_update(changed, FACT_FIELDS)
+    TicketFact.objects.bulk_create(created)
+    TicketFact.objects.filter(pk__in=deleted).delete()
+
+
+def _refresh_batch(settled, batch_size):
+    """Process one batch; returns ``(rows read, whether more are waiting)``."""
+    with transaction.atomic():
+        mark = _watermark()
+        tickets = Ticket.objects.filter(update_date__lte=settled)
+        if mark.update_date is not None:
+            tickets = tickets.filter(
+                Q(update_date__gt=mark.update_date) | Q(update_date=mark.update_date, id__gt=mark.ticket_id)
+            )
+        rows = list(
+            tickets.order_by('update_date', 'id').values(
+                'id', 'category', 'department', 'status', 'submit_date', 'time_closed', 'resolution_time', 'update_date'
+            )[:batch_size]
+        )
+        tombstones = list(
+            TicketTombstone.objects.filter(id__gt=mark.tombstone_id).order_by('id').values('id', 'ticket_id', 'archived')[:batch_size]
+        )
+        if not rows and not tombstones:
+            return 0, False
+
+        # Archived tickets still count in reports; only deletions are subtracted
+        _fold(rows, [row['ticket_id'] for row in tombstones if not row['archived']])
+
+        if rows:
+            mark.update_date, mark.ticket_id = rows[-1]['update_date'], rows[-1]['id']
+        if tombstones:
+            mark.tombstone_id = tombstones[-1]['id']
+        mark.refreshed_at = timezone.now()
+        mark.save()
+        return len(rows) + len(tombstones), batch_size in (len(rows), len(tombstones))
+
+
+def _recheck_batch(since, after, batch_size):
+    """
+    Re-fold one batch of the tickets and tombstones changed since ``since``
+    that the watermark has already passed, starting after the ``after``
+    position; returns the next position, or None when done.
+    """
+    last_key, last_tombstone = after
+    with transaction.atomic():
+        mark = _watermark()
+        rows = []
+        if mark.update_date is not None and last_key is not None:
+            tickets = Ticket.objects.filter(update_date__gte=since).filter(
+                Q(update_date__lt=mark.update_date) | Q(update_date=mark.update_date, id__lte=mark.ticket_id)
+            )
+            if last_key:
+                tickets = tickets.filter(Q(update_date__gt=last_key[0]) | Q(update_date=last_key[0], id__gt=last_key[1]))
+            rows = list(
+                tickets.order_by('update_date', 'id').values(
+                    'id', 'category', 'department', 'status', 'submit_date', 'time_closed', 'resolution_time', 'update_date'
+                )[:batch_size]
+            )
+        tombstones = []
+        if last_tombstone is not None:
+            tombstones = list(
+                TicketTombstone.objects.filter(
+                    deleted_at__gte=since, id__gt=last_tombstone, id__lte=mark.tombstone_id
+                ).order_by('id').values('id', 'ticket_id', 'archived')[:batch_size]
+            )
+        _fold(rows, [row['ticket_id'] for row in tombstones if not row['archived']])
+
+    if len(rows) < batch_size and len(tombstones) < batch_size:
+        return None
+    return (
+        (rows[-1]['update_date'], rows[-1]['id']) if len(rows) == batch_size else None,
+        tombstones[-1]['id'] if len(tombstones) == batch_size else None,
+    )
+
+
+def refresh(batch_size=BATCH_SIZE, max_batches=None):
+    """Fold ticket changes since the watermark into the aggregates; returns rows read."""
+    now = timezone.now()
+    settled = now - timedelta(seconds=SETTLE_SECONDS)
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        count, more = _refresh_batch(settled, batch_size)
+        total += count
+        batches += 1
+        if not more:
+            break
+
+    # Late commits behind the watermark; not counted in the total
+    since = now - timedelta(seconds=settings.REPORTING_LOOKBACK_SECONDS)
+    position = ((), 0)
+    while position is not None:
+        position = _recheck_batch(since, position, batch_size)
+    if total == 0:
+        ReportingWatermark.objects.filter(name=WATERMARK).update(refreshed_at=timezone.now())
+    return total
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Drop the aggregates and recompute them from every ticket, archived ones included."""
+    with transaction.atomic():
+        _watermark()
+        TicketFact.objects.all().delete()
+        DailyTicketStats.objects.all().delete()
+        DepartmentBacklog.objects.all().delete()
+        ReportingWatermark.objects.filter(name=WATERMARK).update(
+            update_date=None,
+            ticket_id=0,
+            tombstone_id=TicketTombstone.objects.order_by('-id').values_list('id', flat=True).first() or 0,
+            refreshed_at=None,
+        )
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                ArchivedTicket.objects.filter(id__gt=last_id).order_by('id').values(
+                    'id', 'category', 'department', 'status', 'submit_date', 'time_closed', 'resolution_time'
+                )[:batch_size]
+            )
+            _fold(rows, [])
+        if len(rows) < batch_size:
+            break
+        last_id = rows[-1]['id']
+    return refresh(batch_size)
+
+
+def last_refreshed():
+    return ReportingWatermark.objects.filter(name=WATERMARK).values_list('refreshed_at', flat=True).first()
+
+
+# Reports: read the aggregate tables only
+
+DEFAULT_REPORT_DAYS = 30
+
+
+class InvalidReportRange(ValueError):
+    pass
+
+
+def report_range(params):
+    """``(since, until)`` dates from ?since=&until=, both inclusive; defaults to the last 30 days."""
+    try:
+        until = parse_date(params['until']) if params.get('until') else timezone.localdate()
+        since = parse_date(params['since']) if params.get('since') else until - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+    except ValueError:
+        since = until = None
+    if since is None or until is None:
+        raise InvalidReportRange('since and until must be dates (YYYY-MM-DD)')
+    if since > until:
+        raise InvalidReportRange('since must not be after until')
+    return since, until
+
+
+def _mean(seconds, count):
+    return round(seconds / count) if count else None
+
+
+def daily_report(since, until, category=None, department=None):
+    stats = DailyTicketStats.objects.filter(day__range=(since, until))
+    if category:
+        stats = stats.filter(category=category)
+    if department:
+        stats = stats.filter(department=department)
+    rows = stats.values('day').annotate(**{field: Sum(field) for field in STAT_FIELDS}).order_by('day')
+    return [
+        {
+            'day': row['day'],
+            'opened': row['opened'],
+            'closed': row['closed'],
+            'mean_resolution_seconds': _mean(row['resolution_seconds'], row['resolved_count']),
+        }
+        for row in rows
+    ]
+
+
+def resolution_report(since, until, department=None):
+    stats = DailyTicketStats.objects.filter(day__range=(since, until), closed__gt=0)
+    if department:
+        stats = stats.filter(department=department)
+    rows = stats.values('category').annotate(
+        closed=Sum('closed'), resolved_count=Sum('resolved_count'), resolution_seconds=Sum('resolution_seconds')
+    ).order_by('category')
+    return [
+        {
+            'category': row['category'],
+            'closed': row['closed'],
+            'mean_resolution_seconds': _mean(row['resolution_seconds'], row['resolved_count']),
+        }
+        for row in rows
+    ]
+
+
+def backlog_report():
+    departments = {}
+    for row in DepartmentBacklog.objects.order_by('department', 'status'):
+        entry = departments.setdefault(row.department, {'department': row.department, 'total': 0, 'by_status': {}})
+        entry['by_status'][row.status] = row.count
+        entry['total'] += row.count
+    return list(departments.values())
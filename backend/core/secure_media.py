@@ -4,6 +4,7 @@ from django.http import HttpResponse, Http404, HttpResponseForbidden
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import cache_control
+from django.utils.cache import patch_cache_control
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -11,6 +12,7 @@ from rest_framework import status
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth import get_user_model
+from .media_utils import SIGNATURE_PARAM, verify_media_signature
 from .models import TicketAttachment, Ticket
 import logging
 
@@ -37,13 +39,25 @@ def authenticate_token_from_query(request):
 
 
 @csrf_exempt
-@cache_control(private=True, max_age=3600)  # Cache for 1 hour privately
 def serve_secure_media(request, file_path):
     """
     Serve media files with authentication check
-    Supports both Authorization header and token query parameter
+    Supports signed URLs (?sig=, see core.media_utils), the Authorization
+    header and token query parameter
     Also supports external system access with API key
     """
+    # Signed URL: one HMAC check, no token decoding or user lookup.
+    # Cacheable for as long as the signature is valid.
+    remaining = verify_media_signature(file_path, request.GET.get(SIGNATURE_PARAM))
+    if remaining is not None:
+        response = serve_media_file(file_path, request, skip_auth_check=True)
+        patch_cache_control(response, private=True, max_age=remaining)
+        return response
+    return _serve_authenticated_media(request, file_path)
+
+
+@cache_control(private=True, max_age=3600)  # Cache for 1 hour privately
+def _serve_authenticated_media(request, file_path):
     # Check for external system API key first
     api_key = request.GET.get('api_key') or request.headers.get('X-API-Key')
     if api_key:
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import Employee, Ticket, TicketAttachment, KnowledgeArticle
-from .models import ActivityLog
+from .models import ActivityLog, ArchivedTicketAttachment
+from .media_utils import signed_media_url
+from .previews import queue_preview
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.exceptions import AuthenticationFailed
@@ -143,25 +145,52 @@ class AdminTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class TicketAttachmentSerializer(serializers.ModelSerializer):
     file = serializers.SerializerMethodField()
+    preview = serializers.SerializerMethodField()
+    media_path = '/api/media/'
     
     class Meta:
         model = TicketAttachment
-        fields = ['id', 'file', 'file_name', 'file_type', 'file_size', 'upload_date']
+        fields = ['id', 'file', 'preview', 'file_name', 'file_type', 'file_size', 'upload_date']
         read_only_fields = ['id', 'upload_date', 'file_size']
     
+    def _media_url(self, name):
+        # Return API endpoint URL that requires authentication
+        # Format: /api/media/ticket_attachments/filename.ext
+        url = f'{self.media_path}{name}'
+        # Signed for the requesting user, so fetching it needs no token
+        # check (see core.media_utils); cookies still work without it
+        request = self.context.get('request')
+        user = self.context.get('user') or getattr(request, 'user', None)
+        if getattr(user, 'is_authenticated', False):
+            url = signed_media_url(url, name, user)
+        # Get the request from context to build absolute URL
+        if request:
+            return request.build_absolute_uri(url)
+        # Fallback to relative URL
+        return url
+
     def get_file(self, obj):
         """Return the protected API URL for the file"""
         if obj.file:
-            # Return API endpoint URL that requires authentication
-            # Format: /api/media/ticket_attachments/filename.ext
-            # Get the request from context to build absolute URL
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(f'/api/media/{obj.file.name}')
-            # Fallback to relative URL
-            return f'/api/media/{obj.file.name}'
+            return self._media_url(obj.file.name)
+        return None
+
+    def get_preview(self, obj):
+        """URL of the thumbnail / first-page image (core.previews), null until rendered or if there is none"""
+        if obj.preview:
+            return self._media_url(obj.preview.name)
+        if getattr(obj, 'preview_status', None) == 'pending':
+            # Attachments from before previews existed are rendered on first sight
+            queue_preview(obj.pk)
         return None
 
+class ArchivedTicketAttachmentSerializer(TicketAttachmentSerializer):
+    """Attachments of archived tickets, served from cold storage."""
+    media_path = '/api/archive/media/'
+
+    class Meta(TicketAttachmentSerializer.Meta):
+        model = ArchivedTicketAttachment
+
 class EmployeeInfoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Employee
@@ -196,16 +225,19 @@ class TicketSerializer(serializers.ModelSerializer):
                 'issue_type', 'other_issue', 'performance_start_date', 'performance_end_date',
                 'approved_by', 'cost_items', 'requested_budget', 'fiscal_year', 'department_input',
                 'dynamic_data', 'status', 'submit_date', 'update_date', 'assigned_to', 'attachments',
-        'employee', 'rejected_by'
+        'employee', 'rejected_by', 'comment_count', 'attachment_count', 'last_activity_at',
+        'coordinator_id', 'coordinator_name'
         ]
         read_only_fields = [
             'id', 'ticket_number', 'submit_date', 'update_date',
             'response_time', 'resolution_time', 'time_closed', 'assigned_to',
-            'employee'
+            'employee', 'comment_count', 'attachment_count', 'last_activity_at',
+            'coordinator_id', 'coordinator_name'
         ]
 
-    def create(self, validated_data):
-        user = self.context['request'].user
+    def ticket_fields(self, validated_data):
+        """Model field values for a new ticket, with the known dynamic_data keys mapped onto their fields."""
+        validated_data = dict(validated_data)
         # Pop dynamic_data if present and pass to model
         dynamic = validated_data.pop('dynamic_data', None)
 
@@ -248,19 +280,21 @@ class TicketSerializer(serializers.ModelSerializer):
             except Exception:
                 pass
 
-        # Get employee from validated_data instead of assuming user
-        employee = validated_data.pop('employee', None)
-        ticket = Ticket.objects.create(employee=employee, dynamic_data=dynamic, **validated_data)
-        
+        validated_data['dynamic_data'] = dynamic
+
         # Set budget-specific defaults when category is "New Budget Proposal"
         if validated_data.get('category') == 'New Budget Proposal':
-            if ticket.fiscal_year is None:
-                ticket.fiscal_year = 2
-            if ticket.department_input is None:
-                ticket.department_input = 2
-            ticket.save(update_fields=['fiscal_year', 'department_input'])
-        
-        return ticket
+            if validated_data.get('fiscal_year') is None:
+                validated_data['fiscal_year'] = 2
+            if validated_data.get('department_input') is None:
+                validated_data['department_input'] = 2
+
+        return validated_data
+
+    def create(self, validated_data):
+        # Get employee from validated_data instead of assuming user
+        employee = validated_data.pop('employee', None)
+        return Ticket.objects.create(employee=employee, **self.ticket_fields(validated_data))
 
 
 class ActivityLogSerializer(serializers.ModelSerializer):
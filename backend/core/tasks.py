@@ -14,4 +14,32 @@ def update_ticket_status_from_queue(ticket_number, new_status):
         ticket.save()
         print(f"Ticket with ticket_number {ticket_number} status updated to {new_status}")
     except Ticket.DoesNotExist:
-        print(f"Ticket with ticket_number {ticket_number} does not exist")
\ No newline at end of file
+        print(f"Ticket with ticket_number {ticket_number} does not exist")
+
+@shared_task(name='core.tasks.refresh_reporting')
+def refresh_reporting():
+    # Scheduled by CELERY_BEAT_SCHEDULE; see core.reporting
+    from .reporting import refresh
+    return refresh()
+
+@shared_task(name='core.tasks.archive_closed_tickets')
+def archive_closed_tickets():
+    # Scheduled by CELERY_BEAT_SCHEDULE; see core.archive
+    from .archive import archive_tickets
+    return archive_tickets()
+
+@shared_task(name='core.tasks.prune_ticket_events')
+def prune_ticket_events():
+    # Scheduled by CELERY_BEAT_SCHEDULE; see core.ticket_events
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from .ticket_events import RETENTION_DAYS, prune_events
+    return prune_events(timezone.now() - timedelta(days=RETENTION_DAYS))
+
+@shared_task(name='core.tasks.generate_attachment_preview')
+def generate_attachment_preview(attachment_id):
+    # Queued on upload and by lazy backfill; see core.previews
+    from .previews import generate_preview
+    return generate_preview(attachment_id)
@@ -1,3 +1,798 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import brotli
+import orjson
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import archive, compression, reporting, ticket_events, ticket_intake, ticket_similarity, work_queue
+from .authentication import ExternalUser
+from .compression import CompressionMiddleware
+from .id_allocator import reserve_company_ids, reserve_ticket_numbers
+from .media_utils import SIGNATURE_PARAM, sign_media_path, verify_media_signature
+from .models import (
+    ArchivedTicket, ArchivedTicketAttachment, ArchivedTicketComment, DailyTicketStats,
+    DepartmentBacklog, Employee, ReportingWatermark, Ticket, TicketAttachment, TicketComment,
+    TicketEvent, TicketFact, TicketSignature, TicketSimilarityBucket, TicketTombstone,
+)
+from .renderers import ORJSONRenderer
+from .tasks import prune_ticket_events
+from .ticket_summary import reconcile
+from .ticket_sync import sync
+
+
+
+def make_ticket(subject='Printer jam', status=None, **fields):
+    """A ticket owned by auth-service user 1; ``status`` is set without running the save receivers."""
+    fields.setdefault('category', 'IT Support')
+    fields.setdefault('description', 'It does not work.')
+    fields.setdefault('employee_cookie_id', 1)
+    ticket = Ticket.objects.create(subject=subject, **fields)
+    if status:
+        Ticket.objects.filter(pk=ticket.pk).update(status=status)
+        ticket.status = status
+    return ticket
+
+
+_company_ids = itertools.count(9000)
+
+
+def make_employee(email='agent@example.com', role='Ticket Coordinator', **fields):
+    fields.setdefault('company_id', f'MA{next(_company_ids)}')
+    return Employee.objects.create_user(
+        email=email, password='x', first_name='Test', last_name='User',
+        department='IT Department', role=role, **fields,
+    )
+
+class CompanyIdAllocatorTests(TestCase):
+    def test_continues_after_existing_ids(self):
+        Employee.objects.create_user(
+            email='old@example.com', password='x', company_id='MA0041',
+            first_name='Old', last_name='Hire', department='IT Department',
+        )
+        self.assertEqual(reserve_company_ids(1)[0], 'MA0042')
+
+    def test_reserves_consecutive_block(self):
+        first = reserve_company_ids(1)[0]
+        block = reserve_company_ids(5)
+        self.assertEqual(len(block), 5)
+        self.assertEqual(block[0], f"MA{int(first[2:]) + 1:04d}")
+        self.assertEqual(reserve_company_ids(1)[0], f"MA{int(block[-1][2:]) + 1:04d}")
+
+
+class TicketNumberAllocatorConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    ROUNDS = 10
+
+    def test_no_duplicates_under_concurrency(self):
+        now = timezone.now()
+        date_part = now.strftime('%Y%m%d')
+        # Taken by generate_unique_ticket_number's random pick; the allocator must skip it
+        taken = make_ticket(ticket_number=f'TX{date_part}000005').ticket_number
+        results = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+
+        def worker():
+            try:
+                start.wait()
+                for i in range(self.ROUNDS):
+                    numbers = reserve_ticket_numbers(1 + i % 3)
+                    with lock:
+                        results.extend(numbers)
+            except Exception as e:  # pragma: no cover - surfaced below
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        # One day's sequence, even if the test runs across midnight
+        with mock.patch.object(timezone, 'now', return_value=now):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        expected = self.THREADS * sum(1 + i % 3 for i in range(self.ROUNDS))
+        self.assertEqual(len(results), expected)
+        self.assertEqual(len(set(results)), expected)
+        self.assertNotIn(taken, results)
+        self.assertTrue(all(number.startswith(f'TX{date_part}') for number in results))
+
+
+class TicketSyncOwnershipTests(TestCase):
+    def test_local_employee_does_not_get_external_user_with_same_id(self):
+        employee = Employee.objects.create_user(
+            email='local@example.com', password='x', company_id='MA0001',
+            first_name='Local', last_name='User', department='IT Department',
+        )
+        mine = Ticket.objects.create(employee=employee, subject='Mine', category='IT Support', description='d')
+        theirs = Ticket.objects.create(employee_cookie_id=employee.id, subject='Theirs', category='IT Support', description='d')
+        Ticket.objects.filter(pk__in=[mine.pk, theirs.pk]).update(update_date=theirs.update_date - timedelta(minutes=1))
+        TicketTombstone.objects.create(ticket_id=999, employee_cookie_id=employee.id)
+
+        tickets, tombstones, _, _ = sync(employee)
+        self.assertEqual([ticket.pk for ticket in tickets], [mine.pk])
+        self.assertEqual(tombstones, [])
+
+        external = ExternalUser(employee.id, 'external@example.com', 'Employee')
+        tickets, tombstones, _, _ = sync(external)
+        self.assertEqual([ticket.pk for ticket in tickets], [theirs.pk])
+        self.assertEqual([tombstone['id'] for tombstone in tombstones], [999])
+
+
+class TicketEventGapTests(TestCase):
+    """An event that commits after one with a higher id must still be streamed, once."""
+
+    def make_events(self):
+        def event(number):
+            return TicketEvent.objects.create(event_type='ticket_created', ticket_id=number, ticket_number=f'TX{number}', status='New')
+        first, late, last = event(1), event(2), event(3)
+        late_id = late.id
+        late.delete()  # Not committed yet as far as readers can tell
+        return first.id, late_id, last.id
+
+    async def next_frame(self, stream):
+        while True:
+            frame = await asyncio.wait_for(stream.__anext__(), timeout=5)
+            if frame.startswith('id:'):
+                return frame.split('\n')[0][len('id: '):], frame
+
+    @mock.patch.object(ticket_events, 'POLL_INTERVAL', 0.01)
+    async def test_late_commit_is_streamed_once(self):
+        first, late, last = await self.async_events()
+        coordinator = ExternalUser(1, 'coordinator@example.com', 'Ticket Coordinator')
+        stream = ticket_events.event_stream(coordinator, str(first))
+        try:
+            token, _ = await self.next_frame(stream)
+            self.assertEqual(token, f'{last}~{late}')
+
+            await TicketEvent.objects.acreate(id=late, event_type='ticket_created', ticket_id=2, ticket_number='TX2', status='New')
+            token, frame = await self.next_frame(stream)
+            self.assertEqual(token, str(last))
+            self.assertIn('"ticket_number": "TX2"', frame)
+        finally:
+            await stream.aclose()
+            ticket_events.broker._task.cancel()
+
+        # A client that disconnected while waiting for it gets it on resume
+        resumed = ticket_events.event_stream(coordinator, f'{last}~{late}')
+        try:
+            token, frame = await self.next_frame(resumed)
+            self.assertEqual(token, str(last))
+            self.assertIn('"ticket_number": "TX2"', frame)
+        finally:
+            await resumed.aclose()
+            ticket_events.broker._task.cancel()
+
+    async def async_events(self):
+        from asgiref.sync import sync_to_async
+        return await sync_to_async(self.make_events)()
+
+    def test_cursor_token_round_trip(self):
+        cursor = ticket_events.EventCursor(5)
+        self.assertTrue(cursor.advance(8))
+        self.assertEqual(cursor.token(), '8~6.7')
+        self.assertFalse(cursor.advance(8))
+        self.assertTrue(cursor.advance(7))
+        self.assertFalse(cursor.advance(7))
+        self.assertEqual(ticket_events.EventCursor.parse(cursor.token()).token(), '8~6')
+        with self.assertRaises(ValueError):
+            ticket_events.EventCursor.parse('abc')
+
+
+class TicketEventVisibilityTests(TestCase):
+    """Streams show what the ticket detail view shows: internal notes only to coordinators and staff."""
+
+    def make_events(self):
+        def event(ticket_number, is_internal):
+            return TicketEvent.objects.create(
+                event_type='comment_added', ticket_id=1, ticket_number=ticket_number, status='Open',
+                employee_cookie_id=5, is_internal=is_internal,
+            ).id
+        return event('TX-INTERNAL', True), event('TX-PUBLIC', False)
+
+    @mock.patch.object(ticket_events, 'POLL_INTERVAL', 0.01)
+    async def test_admin_stream_skips_internal_events(self):
+        from asgiref.sync import sync_to_async
+
+        internal, public = await sync_to_async(self.make_events)()
+        admin = ExternalUser(5, 'admin@example.com', 'Admin')
+        self.assertFalse(ticket_events.visible_to({'is_internal': True, 'employee_cookie_id': 5}, admin))
+
+        stream = ticket_events.event_stream(admin, '0')
+        try:
+            while True:
+                frame = await asyncio.wait_for(stream.__anext__(), timeout=5)
+                if frame.startswith('id:'):
+                    break
+            self.assertIn('TX-PUBLIC', frame)
+            self.assertEqual(frame.split('\n')[0], f'id: {public}')
+        finally:
+            await stream.aclose()
+            if ticket_events.broker._task:
+                ticket_events.broker._task.cancel()
+
+    def test_coordinator_sees_internal_events(self):
+        coordinator = ExternalUser(9, 'coordinator@example.com', 'Ticket Coordinator')
+        self.assertTrue(ticket_events.visible_to({'is_internal': True, 'employee_cookie_id': 5}, coordinator))
+
+    def test_prune_task_keeps_recent_events(self):
+        old, recent = (
+            TicketEvent.objects.create(event_type='ticket_created', ticket_id=n, status='New').id for n in (1, 2)
+        )
+        TicketEvent.objects.filter(pk=old).update(
+            created_at=timezone.now() - timedelta(days=ticket_events.RETENTION_DAYS + 1)
+        )
+        self.assertEqual(prune_ticket_events(), 1)
+        self.assertEqual(list(TicketEvent.objects.values_list('id', flat=True)), [recent])
+
+
+class ReportingLateCommitTests(TestCase):
+    """Changes that commit behind the watermark are folded in once, on a later run."""
+
+    def opened(self):
+        return sum(DailyTicketStats.objects.values_list('opened', flat=True))
+
+    def test_late_ticket_and_tombstone_are_folded_once(self):
+        def ticket(subject):
+            return Ticket.objects.create(subject=subject, category='IT Support', description='d', employee_cookie_id=1)
+
+        first, second = ticket('First'), ticket('Second')
+        earlier = timezone.now() - timedelta(minutes=1)
+        Ticket.objects.filter(pk__in=[first.pk, second.pk]).update(update_date=earlier)
+        reporting.refresh()
+        self.assertEqual(self.opened(), 2)
+
+        # Committed after the watermark moved past its update_date
+        late = ticket('Late')
+        Ticket.objects.filter(pk=late.pk).update(update_date=earlier - timedelta(minutes=1))
+        reporting.refresh()
+        self.assertTrue(TicketFact.objects.filter(ticket_id=late.pk).exists())
+        self.assertEqual(self.opened(), 3)
+
+        # A tombstone whose id is below one already read
+        first_id = first.pk
+        first.delete()
+        tombstone = TicketTombstone.objects.get(ticket_id=first_id)
+        ReportingWatermark.objects.filter(name=reporting.WATERMARK).update(tombstone_id=tombstone.id + 5)
+        reporting.refresh()
+        self.assertFalse(TicketFact.objects.filter(ticket_id=first_id).exists())
+        self.assertEqual(self.opened(), 2)
+
+        reporting.refresh()
+        self.assertEqual(self.opened(), 2)
+        self.assertEqual(sum(DepartmentBacklog.objects.values_list('count', flat=True)), 2)
+
+
+class ORJSONRendererTests(TestCase):
+    def test_matches_drf_renderer(self):
+        data = {
+            'created': timezone.now().replace(microsecond=123456),
+            'naive': datetime(2024, 1, 2, 3, 4, 5, 678901),
+            'day': date(2024, 1, 2),
+            'amount': Decimal('1.50'),
+            'duration': timedelta(hours=1, seconds=3),
+            'id': uuid.uuid4(),
+            'text': 'Señor "quoted"   line',
+            'label': gettext_lazy('Hello'),
+            'numbers': [1, 2.5, True, None, 2 ** 70],
+            7: 'integer key',
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class CompressionTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.body = b'{"subject": "Printer jam", "status": "Open"}' * 100
+
+    def compress(self, accept_encoding, body=None, content_type='application/json'):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        response = HttpResponse(body or self.body, content_type=content_type)
+        response['ETag'] = '"abc"'
+        return CompressionMiddleware(lambda r: response)(request)
+
+    def test_negotiation(self):
+        self.assertEqual(compression.choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(compression.choose_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(compression.choose_encoding('*'), 'br')
+        self.assertEqual(compression.choose_encoding('gzip;q=0, br;q=0'), None)
+        self.assertEqual(compression.choose_encoding('identity'), None)
+        self.assertEqual(compression.choose_encoding(''), None)
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(compression.choose_encoding('br, gzip'), 'gzip')
+
+    def test_responses_decode_to_the_original_and_are_padded(self):
+        decode = {'br': brotli.decompress, 'gzip': gzip.decompress}
+        for encoding in ('br', 'gzip'):
+            sizes = set()
+            for _ in range(20):
+                response = self.compress(encoding)
+                self.assertEqual(response['Content-Encoding'], encoding)
+                self.assertEqual(response['ETag'], 'W/"abc"')
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(decode[encoding](response.content), self.body)
+                sizes.add(len(response.content))
+            self.assertGreater(len(sizes), 1, encoding)
+
+    def test_small_binary_and_unaccepted_responses_are_left_alone(self):
+        self.assertFalse(self.compress('br', body=b'{}').has_header('Content-Encoding'))
+        self.assertFalse(self.compress('br', content_type='image/png').has_header('Content-Encoding'))
+        self.assertFalse(self.compress('identity').has_header('Content-Encoding'))
+
+
+class ReconcileSummaryTests(TestCase):
+    def test_corrects_drifted_counts_only(self):
+        def ticket(subject):
+            return Ticket.objects.create(subject=subject, category='IT Support', description='d', employee_cookie_id=1)
+
+        correct, drifted = ticket('Correct'), ticket('Drifted')
+        for t in (correct, drifted):
+            TicketComment.objects.create(ticket=t, user_cookie_id=1, comment='Any update?')
+        Ticket.objects.filter(pk=drifted.pk).update(comment_count=5, attachment_count=2)
+
+        self.assertEqual(reconcile(), 1)
+        self.assertEqual(
+            list(Ticket.objects.order_by('pk').values_list('comment_count', 'attachment_count')),
+            [(1, 0), (1, 0)],
+        )
+        self.assertEqual(reconcile(), 0)
+
+
+
+class WorkQueueTests(TestCase):
+    def setUp(self):
+        self.agent = make_employee()
+        self.client = APIClient()
+        self.client.force_authenticate(self.agent)
+
+    def test_priority_then_age_order(self):
+        low = make_ticket('Low', status='Open', priority='Low')
+        old_high = make_ticket('Old high', status='Open', priority='High')
+        new_high = make_ticket('New high', status='Open', priority='High')
+        critical = make_ticket('Critical', status='Open', priority='Critical')
+        unranked = make_ticket('No priority', status='Open')
+        Ticket.objects.filter(pk=old_high.pk).update(submit_date=timezone.now() - timedelta(days=1))
+
+        claimed = [work_queue.claim_next_ticket(self.agent, 'Agent').pk for _ in range(5)]
+        self.assertEqual(claimed, [critical.pk, old_high.pk, new_high.pk, low.pk, unranked.pk])
+        self.assertIsNone(work_queue.claim_next_ticket(self.agent, 'Agent'))
+
+    def test_skip_locked_path_claims_in_order(self):
+        first = make_ticket('First', status='Open', priority='High')
+        second = make_ticket('Second', status='Open', priority='Low')
+        # SQLite ignores the row lock, but the rest of the PostgreSQL path runs
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True):
+            claimed = [work_queue.claim_next_ticket(self.agent, 'Agent') for _ in range(3)]
+        self.assertEqual([ticket and ticket.pk for ticket in claimed], [first.pk, second.pk, None])
+        self.assertEqual(claimed[0].status, 'In Progress')
+        self.assertEqual(claimed[0].assigned_to_id, self.agent.pk)
+
+    def test_claiming_a_claimed_ticket_conflicts(self):
+        ticket = make_ticket(status='Open')
+        url = reverse('claim_ticket', args=[ticket.pk])
+        self.assertEqual(self.client.post(url).status_code, 200)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Ticket.objects.get(pk=ticket.pk).assigned_to_id, self.agent.pk)
+
+    def test_lost_race_after_read_conflicts(self):
+        ticket = make_ticket(status='Open')
+        with mock.patch.object(work_queue, 'claim_ticket', return_value=False):
+            response = self.client.post(reverse('claim_ticket', args=[ticket.pk]))
+        self.assertEqual(response.status_code, 409)
+
+
+class WorkQueueConcurrencyTests(TransactionTestCase):
+    THREADS = 6
+
+    def race(self, func):
+        results, errors = [], []
+        start = threading.Barrier(self.THREADS)
+
+        def worker(index):
+            try:
+                start.wait()
+                results.append(func(index))
+            except Exception as e:  # pragma: no cover - surfaced below
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_one_ticket_is_claimed_once(self):
+        ticket = make_ticket(status='Open')
+        agents = [make_employee(f'agent{i}@example.com') for i in range(self.THREADS)]
+        results = self.race(lambda i: work_queue.claim_ticket(ticket.pk, agents[i], f'Agent {i}'))
+        self.assertEqual(sorted(results), [False] * (self.THREADS - 1) + [True])
+        self.assertEqual(TicketEvent.objects.filter(event_type='ticket_assigned').count(), 1)
+
+    def test_racing_agents_get_different_tickets_or_none(self):
+        tickets = {make_ticket(f'Ticket {i}', status='Open').pk for i in range(2)}
+        agents = [make_employee(f'agent{i}@example.com') for i in range(self.THREADS)]
+        results = self.race(lambda i: work_queue.claim_next_ticket(agents[i], f'Agent {i}'))
+        claimed = [ticket.pk for ticket in results if ticket is not None]
+        self.assertEqual(sorted(claimed), sorted(tickets))
+        self.assertEqual(results.count(None), self.THREADS - 2)
+        owners = dict(Ticket.objects.values_list('pk', 'assigned_to_id'))
+        self.assertEqual({ticket.pk: ticket.assigned_to_id for ticket in results if ticket}, owners)
+
+
+class TicketIntakeTests(TestCase):
+    def setUp(self):
+        self.coordinator = make_employee('coordinator@example.com')
+        self.owner = make_employee('owner@example.com', role='Employee')
+        self.client = APIClient()
+        self.client.force_authenticate(self.coordinator)
+
+    def record(self, subject='Laptop will not boot', **fields):
+        return {'subject': subject, 'category': 'IT Support', 'description': 'Black screen after the logo.', **fields}
+
+    def test_json_records_are_created_or_reported_by_index(self):
+        records = [
+            self.record(employee_company_id=self.owner.company_id),
+            {'category': 'IT Support', 'description': 'No subject'},
+            self.record(employee_company_id='MA0000'),
+            self.record('Mouse is broken'),
+        ]
+        response = self.client.post(reverse('bulk_create_tickets'), records, format='json')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (2, 2))
+        self.assertEqual([ticket['index'] for ticket in body['tickets']], [0, 3])
+        errors = {error['index']: error['errors'] for error in body['errors']}
+        self.assertIn('subject', errors[1])
+        self.assertIn('employee_company_id', errors[2])
+
+        owners = dict(Ticket.objects.values_list('subject', 'employee_id'))
+        self.assertEqual(owners, {'Laptop will not boot': self.owner.pk, 'Mouse is broken': self.coordinator.pk})
+        numbers = [ticket['ticket_number'] for ticket in body['tickets']]
+        self.assertEqual(len(set(numbers)), 2)
+
+    def test_ndjson_reports_unparsable_lines(self):
+        lines = [orjson.dumps(self.record()), b'{"subject": ', b'', orjson.dumps(self.record('Second'))]
+        response = self.client.post(
+            reverse('bulk_create_tickets'), b'\n'.join(lines), content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual([ticket['index'] for ticket in body['tickets']], [0, 2])
+        self.assertEqual(body['errors'][0]['index'], 1)
+        self.assertIn('Invalid JSON', body['errors'][0]['errors']['non_field_errors'][0])
+
+    def test_nothing_valid_is_a_bad_request(self):
+        response = self.client.post(reverse('bulk_create_tickets'), [{'subject': ''}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Ticket.objects.count(), 0)
+
+    def test_csv_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as f:
+            f.write('subject,category,description,employee_email\n')
+            f.write('VPN drops,IT Support,Every hour,owner@example.com\n')
+            f.write(',IT Support,Missing subject,\n')
+            f.write('Monitor flickers,IT Support,Since Monday,\n')
+        self.addCleanup(os.remove, f.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_tickets', f.name, '--owner', self.coordinator.company_id, stdout=out, stderr=err)
+        self.assertIn('Created 2 ticket(s)', out.getvalue())
+        self.assertIn('Row 3:', err.getvalue())
+        owners = dict(Ticket.objects.values_list('subject', 'employee_id'))
+        self.assertEqual(owners, {'VPN drops': self.owner.pk, 'Monitor flickers': self.coordinator.pk})
+
+    def test_open_records_are_pushed_to_the_workflow_on_commit(self):
+        with mock.patch.object(ticket_intake, 'push_to_workflow') as push:
+            with self.captureOnCommitCallbacks(execute=True):
+                result = ticket_intake.ingest([self.record(status='Open'), self.record('Still new')], self.coordinator)
+        opened = Ticket.objects.get(pk=result['created'][0]['id'])
+        push.assert_called_once_with([opened.ticket_number])
+
+    def test_taken_ticket_number_is_retried(self):
+        taken = make_ticket().ticket_number
+        real = ticket_intake.reserve_ticket_numbers
+        calls = []
+
+        def numbers(count):
+            calls.append(count)
+            return [taken] + real(count)[1:] if len(calls) == 1 else real(count)
+
+        with mock.patch.object(ticket_intake, 'reserve_ticket_numbers', side_effect=numbers):
+            result = ticket_intake.ingest([self.record(), self.record('Second')], self.coordinator)
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(len(result['created']), 2)
+        self.assertNotIn(taken, [ticket['ticket_number'] for ticket in result['created']])
+
+    def test_number_that_stays_taken_fails_only_its_record(self):
+        taken = make_ticket().ticket_number
+        real = ticket_intake.reserve_ticket_numbers
+        calls = []
+
+        def numbers(count):
+            # Every batch attempt, then the first record on its own, get the taken number
+            calls.append(count)
+            return [taken] + real(count)[1:] if len(calls) <= ticket_intake.SAVE_ATTEMPTS + 1 else real(count)
+
+        with mock.patch.object(ticket_intake, 'reserve_ticket_numbers', side_effect=numbers):
+            result = ticket_intake.ingest([self.record(), self.record('Second')], self.coordinator)
+        self.assertEqual([ticket['index'] for ticket in result['created']], [1])
+        self.assertEqual([error['index'] for error in result['errors']], [0])
+        self.assertEqual(Ticket.objects.filter(subject='Second').count(), 1)
+
+
+class BatchOperationTests(TestCase):
+    """A batch approve/reject leaves tickets as the single-ticket endpoints do."""
+
+    TICKET_FIELDS = [
+        'status', 'priority', 'department', 'approved_by', 'rejected_by', 'rejection_reason', 'assigned_to_id',
+        'coordinator_id', 'coordinator_cookie_id', 'coordinator_name', 'comment_count',
+    ]
+
+    def setUp(self):
+        self.coordinator = make_employee('coordinator@example.com')
+        self.owner = make_employee('owner@example.com', role='Employee')
+        self.client = APIClient()
+        self.client.force_authenticate(self.coordinator)
+
+    def pair(self):
+        return [make_ticket('Cannot print', employee=self.owner, employee_cookie_id=None) for _ in range(2)]
+
+    def state(self, ticket):
+        ticket = Ticket.objects.get(pk=ticket.pk)
+        return (
+            {field: getattr(ticket, field) for field in self.TICKET_FIELDS},
+            list(ticket.comments.values_list('comment', 'is_internal', 'user_id')),
+            TicketSignature.objects.filter(ticket_id=ticket.pk).exists(),
+            ticket.last_activity_at is not None,
+        )
+
+    def run_both(self, single_url, single, batch, params):
+        with mock.patch('core.tasks.push_ticket_to_workflow') as task, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse(single_url, args=[single.pk]), params, format='json')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post(
+                reverse('batch_ticket_operation'), {'ticket_ids': [batch.pk], **params}, format='json',
+            )
+            self.assertEqual(response.json()['succeeded'], 1)
+        self.assertEqual(self.state(single), self.state(batch))
+        return [call.args[0] for call in task.delay.call_args_list]
+
+    def test_approve(self):
+        single, batch = self.pair()
+        pushed = self.run_both('approve_ticket', single, batch, {
+            'operation': 'approve', 'priority': 'High', 'department': 'IT Department',
+        })
+        single.refresh_from_db()
+        batch.refresh_from_db()
+        self.assertEqual(single.status, 'Open')
+        self.assertEqual(single.coordinator_id, self.coordinator.pk)
+        self.assertEqual(pushed, [{'ticket_number': single.ticket_number}, {'ticket_number': batch.ticket_number}])
+        self.assertTrue(TicketSignature.objects.filter(ticket_id=batch.pk).exists())
+
+    def test_reject(self):
+        single, batch = self.pair()
+        pushed = self.run_both('reject_ticket', single, batch, {
+            'operation': 'reject', 'rejection_reason': 'Duplicate of another ticket',
+        })
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.assigned_to_id), ('Rejected', self.coordinator.pk))
+        self.assertEqual(pushed, [])
+        # Rejected tickets leave the duplicate index
+        self.assertFalse(TicketSignature.objects.filter(ticket_id__in=[single.pk, batch.pk]).exists())
+
+    def test_repeated_and_hidden_ids_get_their_own_results(self):
+        mine = make_ticket('Mine', employee=self.owner, employee_cookie_id=None)
+        theirs = make_ticket('Theirs', employee=self.coordinator, employee_cookie_id=None)
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(reverse('batch_ticket_operation'), {
+            'operation': 'withdraw', 'reason': 'Fixed itself',
+            'ticket_ids': [mine.pk, theirs.pk, mine.pk, 999999],
+        }, format='json')
+        results = response.json()['results']
+        self.assertEqual([result['ticket_id'] for result in results], [mine.pk, theirs.pk, mine.pk, 999999])
+        self.assertEqual(results[0], {'ticket_id': mine.pk, 'success': True, 'status': 'Withdrawn'})
+        # No status: the caller cannot tell the ticket exists
+        self.assertEqual(results[1], {'ticket_id': theirs.pk, 'success': False, 'error': 'Ticket not found'})
+        self.assertEqual(results[2]['error'], 'Duplicate ticket id')
+        self.assertEqual(results[3]['error'], 'Ticket not found')
+        self.assertEqual(response.json()['succeeded'], 1)
+        self.assertEqual(Ticket.objects.get(pk=theirs.pk).status, 'New')
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        media, archive_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.addCleanup(shutil.rmtree, archive_root)
+        settings_override = override_settings(MEDIA_ROOT=media, ARCHIVE_ROOT=archive_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media, self.archive_root = media, archive_root
+
+        self.owner = make_employee('owner@example.com', role='Employee')
+        self.ticket = make_ticket('Old VPN issue', employee=self.owner, employee_cookie_id=None)
+        TicketComment.objects.create(ticket=self.ticket, user=self.owner, comment='Works now, thanks')
+        self.attachment = TicketAttachment.objects.create(
+            ticket=self.ticket, file=SimpleUploadedFile('log.txt', b'vpn log'), file_name='log.txt',
+            file_type='text/plain', file_size=7, uploaded_by=self.owner,
+        )
+        Ticket.objects.filter(pk=self.ticket.pk).update(
+            status='Closed', time_closed=timezone.now() - timedelta(days=400),
+        )
+        self.recent = make_ticket('Recently closed', status='Closed', employee=self.owner, employee_cookie_id=None)
+        Ticket.objects.filter(pk=self.recent.pk).update(time_closed=timezone.now())
+
+    def path(self, root):
+        return os.path.join(root, self.attachment.file.name)
+
+    def test_archive_moves_ticket_children_and_files(self):
+        self.assertEqual(archive.archive_tickets(days=365), 1)
+
+        self.assertFalse(Ticket.objects.filter(pk=self.ticket.pk).exists())
+        self.assertTrue(Ticket.objects.filter(pk=self.recent.pk).exists())
+        archived = ArchivedTicket.objects.get(pk=self.ticket.pk)
+        self.assertEqual((archived.ticket_number, archived.status), (self.ticket.ticket_number, 'Closed'))
+        self.assertEqual(archived.data['subject'], 'Old VPN issue')
+        self.assertEqual(ArchivedTicketComment.objects.get(ticket_id=archived.pk).comment, 'Works now, thanks')
+        self.assertEqual(ArchivedTicketAttachment.objects.get(ticket_id=archived.pk).pk, self.attachment.pk)
+        self.assertTrue(os.path.exists(self.path(self.archive_root)))
+        self.assertFalse(os.path.exists(self.path(self.media)))
+        self.assertTrue(TicketTombstone.objects.get(ticket_id=self.ticket.pk).archived)
+
+    def test_files_move_back_when_the_batch_fails(self):
+        with mock.patch.object(TicketTombstone.objects, 'order_by', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                archive.archive_tickets(days=365)
+        self.assertTrue(os.path.exists(self.path(self.media)))
+        self.assertFalse(os.path.exists(self.path(self.archive_root)))
+        self.assertTrue(Ticket.objects.filter(pk=self.ticket.pk).exists())
+        self.assertFalse(ArchivedTicket.objects.exists())
+
+    def test_lookup_by_number_falls_back_to_the_archive(self):
+        archive.archive_tickets(days=365)
+        token = AccessToken.for_user(self.owner)
+        response = self.client.get(
+            reverse('get_ticket_by_number', args=[self.ticket.ticket_number]), HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body['archived'])
+        self.assertEqual(body['subject'], 'Old VPN issue')
+
+        stranger = AccessToken.for_user(make_employee('stranger@example.com', role='Employee'))
+        response = self.client.get(
+            reverse('get_ticket_by_number', args=[self.ticket.ticket_number]), HTTP_AUTHORIZATION=f'Bearer {stranger}',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_search(self):
+        archive.archive_tickets(days=365)
+        client = APIClient()
+
+        def search(user, **params):
+            client.force_authenticate(user)
+            return client.get(reverse('search_archived_tickets'), params)
+
+        response = search(self.owner, q='vpn')
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.ticket.pk])
+        response = search(self.owner, q=self.ticket.ticket_number.lower())
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertEqual(search(self.owner, q='printer').json()['results'], [])
+        self.assertEqual(search(make_employee('stranger@example.com', role='Employee')).json()['results'], [])
+        self.assertEqual(len(search(make_employee('coordinator@example.com')).json()['results']), 1)
+        self.assertEqual(search(self.owner, since='last week').status_code, 400)
+
+
+class SignedMediaUrlTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        os.makedirs(os.path.join(media, 'employee_images'))
+        for name in ('a.png', 'b.png'):
+            with open(os.path.join(media, 'employee_images', name), 'wb') as f:
+                f.write(b'png')
+        self.path = 'employee_images/a.png'
+        self.employee = make_employee('owner@example.com', role='Employee')
+
+    def get(self, path, **extra):
+        return self.client.get(reverse('serve_protected_media', args=[path]), **extra)
+
+    def test_valid_signature(self):
+        sig = sign_media_path(self.path, self.employee)
+        self.assertGreater(verify_media_signature(self.path, sig), 0)
+
+        response = self.get(self.path, data={SIGNATURE_PARAM: sig})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'png')
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_tampered_signature_or_path_is_rejected(self):
+        sig = sign_media_path(self.path, self.employee)
+        scope, expires, mac = sig.split('.')
+        self.assertIsNone(verify_media_signature('employee_images/b.png', sig))
+        self.assertIsNone(verify_media_signature(self.path, f'{scope}.{int(expires) + 900}.{mac}'))
+        self.assertIsNone(verify_media_signature(self.path, f'e0.{expires}.{mac}'))
+        self.assertIsNone(verify_media_signature(self.path, 'not-a-signature'))
+
+        response = self.get('employee_images/b.png', data={SIGNATURE_PARAM: sig})
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_expired_signature_is_rejected(self):
+        issued = timezone.now().timestamp()
+        sig = sign_media_path(self.path, self.employee, now=issued)
+        self.assertIsNotNone(verify_media_signature(self.path, sig, now=issued + settings.MEDIA_URL_TTL - 1))
+        self.assertIsNone(
+            verify_media_signature(self.path, sig, now=issued + settings.MEDIA_URL_TTL + settings.MEDIA_URL_BUCKET)
+        )
+
+    def test_unsigned_url_falls_back_to_jwt_auth(self):
+        self.assertIn(self.get(self.path).status_code, (401, 403))
+
+        token = AccessToken.for_user(self.employee)
+        response = self.get(self.path, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'png')
+
+
+class TicketSimilarityTests(TestCase):
+    def setUp(self):
+        self.ticket = make_ticket(
+            'Outlook keeps crashing on startup',
+            description='Every time I open Outlook on my laptop it freezes and then closes after a few seconds.',
+        )
+
+    def test_near_duplicate_is_a_candidate(self):
+        duplicate = make_ticket(
+            'Outlook keeps crashing at startup!',
+            description='Each time I open Outlook on my laptop it freezes, then closes after a few seconds.',
+        )
+        unrelated = make_ticket(
+            'Request for a second monitor',
+            description='I would like an additional 24 inch display for the design team desk.',
+        )
+
+        candidates = ticket_similarity.similar_tickets(duplicate)
+        self.assertEqual([ticket.pk for ticket, score in candidates], [self.ticket.pk])
+        self.assertGreaterEqual(candidates[0][1], ticket_similarity.THRESHOLD)
+        self.assertEqual(ticket_similarity.similar_tickets(unrelated), [])
+
+    def test_forget_removes_ticket_from_index(self):
+        duplicate = make_ticket(self.ticket.subject, description=self.ticket.description)
+        self.assertEqual([ticket.pk for ticket, score in ticket_similarity.similar_tickets(duplicate)], [self.ticket.pk])
+
+        ticket_similarity.forget([self.ticket.pk])
+        self.assertFalse(TicketSignature.objects.filter(ticket_id=self.ticket.pk).exists())
+        self.assertFalse(TicketSimilarityBucket.objects.filter(ticket_id=self.ticket.pk).exists())
+        self.assertEqual(ticket_similarity.similar_tickets(duplicate), [])
@@ -0,0 +1,212 @@
+"""
+Ticket detail payload for get_ticket_detail and get_ticket_by_number.
+
+Loaded with the async ORM in a fixed number of queries: the ticket with its
+employee, assignee and coordinator (a summary column kept by
+core.ticket_summary, not worked out from the comments), attachments, and
+comments with their authors. Then the auth service is asked for every
+external user the payload names in one concurrent round (core.auth_profiles),
+rather than one blocking request per comment. Archived tickets
+(core.archive) give the same payload, built from their snapshot.
+"""
+from asgiref.sync import sync_to_async
+
+from .auth_profiles import fetch_profiles
+from .authentication import ExternalUser
+from .models import Employee
+from .serializers import ArchivedTicketAttachmentSerializer, TicketAttachmentSerializer
+
+COORDINATOR_ROLES = ['System Admin', 'Ticket Coordinator']
+STAFF_ROLES = ['System Admin', 'Ticket Coordinator', 'Admin']
+
+# Ticket fields copied into the payload as they are
+DETAIL_FIELDS = [
+    'subject', 'category', 'sub_category', 'description', 'status', 'priority', 'department',
+    'submit_date', 'update_date', 'approved_by', 'rejected_by', 'dynamic_data', 'asset_name',
+    'serial_number', 'location', 'expected_return_date', 'issue_type', 'other_issue',
+    'performance_start_date', 'performance_end_date', 'cost_items', 'requested_budget',
+    'fiscal_year', 'department_input', 'comment_count', 'attachment_count', 'last_activity_at',
+    'coordinator_id', 'coordinator_cookie_id', 'coordinator_name',
+]
+
+
+def can_view(ticket, user):
+    if isinstance(user, ExternalUser):
+        # Coordinators and admins see every ticket; others only their own
+        return user.role in ['Ticket Coordinator', 'Admin'] or str(ticket.employee_cookie_id) == str(user.id)
+    return user.is_staff or getattr(user, 'role', None) in COORDINATOR_ROLES or ticket.employee_id == user.id
+
+
+def _sees_internal(user):
+    return getattr(user, 'role', None) in COORDINATOR_ROLES or getattr(user, 'is_staff', False)
+
+
+def _is_staff(user):
+    return getattr(user, 'is_staff', False) or getattr(user, 'role', None) in STAFF_ROLES
+
+
+def _is_support_comment(ticket, comment):
+    # An external commenter other than the (external) ticket owner is support staff
+    return (
+        comment.user is None
+        and ticket.employee_cookie_id is not None
+        and comment.user_cookie_id != ticket.employee_cookie_id
+    )
+
+
+def _person(employee):
+    return {
+        'id': employee.id,
+        'first_name': getattr(employee, 'first_name', ''),
+        'last_name': getattr(employee, 'last_name', ''),
+        'company_id': getattr(employee, 'company_id', ''),
+        'department': getattr(employee, 'department', ''),
+        'email': getattr(employee, 'email', ''),
+    }
+
+
+def _profile_person(user_id, profile):
+    return {
+        'id': user_id,
+        'first_name': profile.get('first_name') or '',
+        'last_name': profile.get('last_name') or '',
+        'company_id': profile.get('company_id') or '',
+        'department': profile.get('department') or '',
+        'email': profile.get('email') or '',
+    }
+
+
+async def build_ticket_detail(request, ticket, user):
+    """``ticket`` must come with ``employee``, ``assigned_to`` and ``coordinator`` selected."""
+    attachments = [attachment async for attachment in ticket.attachments.all()]
+    fields = {name: getattr(ticket, name) for name in DETAIL_FIELDS}
+    # Serializing may queue missing previews (core.previews), which is sync only
+    serialized = await sync_to_async(lambda: TicketAttachmentSerializer(attachments, many=True, context={'user': user}).data)()
+    return await _build(request, ticket, user, fields, serialized, ticket.coordinator)
+
+
+async def build_archived_detail(request, archived, user):
+    """The same payload for an ArchivedTicket, from its snapshot, flagged ``archived``."""
+    attachments = [attachment async for attachment in archived.attachments.all()]
+    fields = archived.ticket_fields()
+    coordinator = None
+    if fields['coordinator_id']:
+        coordinator = await Employee.objects.filter(pk=fields['coordinator_id']).afirst()
+    payload = await _build(request, archived, user, fields, ArchivedTicketAttachmentSerializer(attachments, many=True, context={'user': user}).data, coordinator)
+    payload.update(archived=True, archived_at=archived.archived_at)
+    return payload
+
+
+async def _build(request, ticket, user, fields, attachments, coordinator_emp):
+    comments = ticket.comments.select_related('user').order_by('-created_at')
+    if not _sees_internal(user):
+        comments = comments.filter(is_internal=False)
+    comments = [comment async for comment in comments]
+
+    # Every external user whose name appears in the payload
+    wanted = []
+    if not ticket.employee and ticket.employee_cookie_id:
+        wanted.append(ticket.employee_cookie_id)
+    wanted.extend(
+        comment.user_cookie_id for comment in comments
+        if comment.user is None and not _is_support_comment(ticket, comment)
+    )
+    if coordinator_emp is None and fields['coordinator_cookie_id'] is not None:
+        wanted.append(fields['coordinator_cookie_id'])
+    profiles = await fetch_profiles(request, wanted)
+
+    if ticket.employee:
+        employee_data = dict(_person(ticket.employee), employee_cookie_id=ticket.employee_cookie_id)
+    elif ticket.employee_cookie_id:
+        profile = profiles.get(ticket.employee_cookie_id, {})
+        employee_data = {
+            'id': ticket.employee_cookie_id,
+            'first_name': profile.get('first_name'),
+            'last_name': profile.get('last_name'),
+            'company_id': profile.get('company_id'),
+            'department': profile.get('department'),
+            'email': profile.get('email'),
+            'employee_cookie_id': ticket.employee_cookie_id,
+        }
+    else:
+        employee_data = dict.fromkeys(
+            ['id', 'first_name', 'last_name', 'company_id', 'department', 'email', 'employee_cookie_id']
+        )
+
+    support_label = 'Coordinator' if _is_staff(user) else 'Support Team'
+    comments_data = []
+    for comment in comments:
+        if comment.user:
+            author = {
+                'id': comment.user.id,
+                'first_name': getattr(comment.user, 'first_name', '') or '',
+                'last_name': getattr(comment.user, 'last_name', '') or '',
+                'role': getattr(comment.user, 'role', 'Employee'),
+            }
+        elif _is_support_comment(ticket, comment):
+            author = {'id': comment.user_cookie_id, 'first_name': support_label, 'last_name': '', 'role': 'Support'}
+        else:
+            profile = profiles.get(comment.user_cookie_id, {})
+            author = {
+                'id': comment.user_cookie_id,
+                'first_name': profile.get('first_name') or '',
+                'last_name': profile.get('last_name') or '',
+                'role': 'Employee',
+            }
+        comments_data.append({
+            'id': comment.id,
+            'comment': comment.comment,
+            'created_at': comment.created_at,
+            'is_internal': comment.is_internal,
+            'user': author,
+        })
+
+    if coordinator_emp is not None:
+        coordinator = _person(coordinator_emp)
+    elif fields['coordinator_cookie_id'] is not None:
+        cookie_id = fields['coordinator_cookie_id']
+        coordinator = _profile_person(cookie_id, profiles.get(cookie_id) or {'first_name': fields['coordinator_name']})
+    else:
+        coordinator = None
+
+    return {
+        'id': ticket.id,
+        'ticket_number': ticket.ticket_number,
+        'subject': fields['subject'],
+        'category': fields['category'],
+        'sub_category': fields['sub_category'],
+        'description': fields['description'],
+        'attachments': attachments,
+        'status': fields['status'],
+        'priority': fields['priority'],
+        'priorityLevel': fields['priority'],  # Frontend expects priorityLevel
+        'department': fields['department'],
+        'submit_date': fields['submit_date'],
+        'update_date': fields['update_date'],
+        'assigned_to': {
+            'id': ticket.assigned_to.id,
+            'first_name': ticket.assigned_to.first_name,
+            'last_name': ticket.assigned_to.last_name,
+        } if ticket.assigned_to else None,
+        'employee': employee_data,
+        'approved_by': fields['approved_by'],
+        'comments': comments_data,
+        'comment_count': fields['comment_count'],
+        'attachment_count': fields['attachment_count'],
+        'last_activity_at': fields['last_activity_at'],
+        'dynamic_data': fields['dynamic_data'],
+        'asset_name': fields['asset_name'],
+        'serial_number': fields['serial_number'],
+        'location': fields['location'],
+        'expected_return_date': fields['expected_return_date'],
+        'issue_type': fields['issue_type'],
+        'other_issue': fields['other_issue'],
+        'performance_start_date': fields['performance_start_date'],
+        'performance_end_date': fields['performance_end_date'],
+        'cost_items': fields['cost_items'],
+        'requested_budget': fields['requested_budget'],
+        'fiscal_year': fields['fiscal_year'],
+        'department_input': fields['department_input'],
+        'coordinator': coordinator,
+        'rejected_by': fields['rejected_by'],
+    }
@@ -0,0 +1,289 @@
+"""
+Ticket change events over server-sent events.
+
+Write paths call ``publish`` (or ``publish_many`` for batches) in the same
+transaction as the change, which appends a ``TicketEvent`` row. The row id
+orders the events, and each SSE frame carries an ``EventCursor`` token as its
+id, so a client that reconnects with ``Last-Event-ID`` resumes where it
+stopped.
+
+Each process runs one ``EventBroker`` poller that reads new rows once per
+``TICKET_EVENTS_POLL_INTERVAL`` and fans them out to every open stream, so
+the database sees one query per process per interval however many clients
+are connected. Streams are async generators: under ASGI an idle connection
+costs a coroutine, not a worker thread.
+
+Ids are assigned at insert, so under concurrent writers an event can commit
+after one with a higher id. Reading strictly past the highest id would skip
+it. Instead, the ids skipped over are remembered as missing and polled again
+for up to GAP_TIMEOUT seconds, long enough for the open transaction to commit
+(ids of rolled-back inserts never turn up and are given up). An event that
+turns up late is sent once; nothing at or below the highest id is resent.
+The cursor token lists the ids still missing ("1234~1230.1231"), so a
+reconnecting client keeps waiting for them too.
+
+Coordinators and staff receive every event, the same users who see every
+ticket and its internal comments in ``core.ticket_detail``. Everyone else
+receives events for tickets they own or are assigned to, minus internal ones.
+
+Events are kept for ``TICKET_EVENTS_RETENTION_DAYS``; ``prune_events`` runs
+daily from Celery beat (``core.tasks.prune_ticket_events``).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .authentication import ExternalUser
+from .models import TicketEvent
+from .ticket_detail import COORDINATOR_ROLES
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.environ.get('TICKET_EVENTS_POLL_INTERVAL', '1.0'))
+KEEPALIVE_SECONDS = 15
+# Events read per poll / catch-up query
+FETCH_LIMIT = 500
+# A stream that falls this far behind is closed; the client resumes from its last id
+SUBSCRIBER_QUEUE_SIZE = 100
+# How long ids skipped over are polled again, waiting for their transaction
+GAP_TIMEOUT = float(os.environ.get('TICKET_EVENTS_GAP_TIMEOUT', '30'))
+# Missing ids remembered per cursor; past this the lowest are given up
+MAX_MISSING = 100
+
+# Streamed events kept for resuming clients; older ones are pruned
+RETENTION_DAYS = int(os.environ.get('TICKET_EVENTS_RETENTION_DAYS', '7'))
+
+EVENT_FIELDS = (
+    'id', 'event_type', 'ticket_id', 'ticket_number', 'status', 'employee_id',
+    'employee_cookie_id', 'assigned_to_id', 'is_internal', 'data', 'created_at',
+)
+
+
+def build_event(event_type, ticket, is_internal=False, **data):
+    return TicketEvent(
+        event_type=event_type,
+        ticket_id=ticket.pk,
+        ticket_number=ticket.ticket_number,
+        status=ticket.status,
+        employee_id=ticket.employee_id,
+        employee_cookie_id=ticket.employee_cookie_id,
+        assigned_to_id=ticket.assigned_to_id,
+        is_internal=is_internal,
+        data=data or None,
+    )
+
+
+def publish(event_type, ticket, is_internal=False, **data):
+    """Record an event for ``ticket``; never lets a logging failure break the write path."""
+    try:
+        event = build_event(event_type, ticket, is_internal, **data)
+        event.save()
+        return event
+    except Exception:
+        logger.exception("Could not record %s event for ticket %s", event_type, ticket.pk)
+
+
+def publish_many(events):
+    if events:
+        TicketEvent.objects.bulk_create(events)
+
+
+def actor_data(user, actor_name):
+    if isinstance(user, ExternalUser):
+        return {'actor': actor_name, 'actor_cookie_id': user.id}
+    return {'actor': actor_name, 'actor_id': getattr(user, 'id', None)}
+
+
+def is_coordinator(user):
+    return bool(getattr(user, 'is_staff', False) or getattr(user, 'role', None) in COORDINATOR_ROLES)
+
+
+def visible_to(event, user):
+    if is_coordinator(user):
+        return True
+    if event['is_internal']:
+        return False
+    if isinstance(user, ExternalUser):
+        return event['employee_cookie_id'] == user.id
+    return user.id in (event['employee_id'], event['assigned_to_id'])
+
+
+def format_event(event, event_id):
+    payload = {key: event[key] for key in EVENT_FIELDS if key not in ('employee_id', 'employee_cookie_id', 'assigned_to_id')}
+    return f"id: {event_id}\nevent: {event['event_type']}\ndata: {json.dumps(payload, cls=DjangoJSONEncoder)}\n\n"
+
+
+class EventCursor:
+    """
+    How far a reader has got: the highest event id read, and the lower ids it
+    has not seen yet (their transactions may still commit), each given up
+    after GAP_TIMEOUT.
+    """
+
+    def __init__(self, last_id, missing=()):
+        self.last_id = last_id
+        deadline = time.monotonic() + GAP_TIMEOUT
+        self.missing = {event_id: deadline for event_id in missing if event_id < last_id}
+
+    @classmethod
+    def parse(cls, token):
+        """The cursor for a ``token`` from ``token()``; raises ValueError if it is malformed."""
+        last_id, _, missing = token.partition('~')
+        return cls(int(last_id), [int(event_id) for event_id in missing.split('.') if event_id])
+
+    def token(self):
+        if not self.missing:
+            return str(self.last_id)
+        return f"{self.last_id}~{'.'.join(str(event_id) for event_id in sorted(self.missing))}"
+
+    def watch(self, missing):
+        """Also wait for ``missing`` (ids another reader has not seen yet)."""
+        deadline = time.monotonic() + GAP_TIMEOUT
+        for event_id in missing:
+            self.missing.setdefault(event_id, deadline)
+
+    def expire(self):
+        now = time.monotonic()
+        self.missing = {event_id: deadline for event_id, deadline in self.missing.items() if deadline > now}
+
+    def advance(self, event_id):
+        """Record ``event_id`` as read; False if it was read before."""
+        if self.missing.pop(event_id, None) is not None:
+            return True
+        if event_id <= self.last_id:
+            return False
+        deadline = time.monotonic() + GAP_TIMEOUT
+        for skipped in range(max(self.last_id + 1, event_id - MAX_MISSING), event_id):
+            self.missing[skipped] = deadline
+        if len(self.missing) > MAX_MISSING:
+            for given_up in sorted(self.missing)[:len(self.missing) - MAX_MISSING]:
+                del self.missing[given_up]
+        self.last_id = event_id
+        return True
+
+
+def _events_after(last_id, missing=(), limit=FETCH_LIMIT):
+    """Events above ``last_id``, and those of the ``missing`` ids that have committed since."""
+    condition = Q(id__gt=last_id)
+    if missing:
+        condition |= Q(id__in=list(missing))
+    return list(TicketEvent.objects.filter(condition).order_by('id').values(*EVENT_FIELDS)[:limit])
+
+
+def _latest_id():
+    return TicketEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _oldest_id():
+    return TicketEvent.objects.order_by('id').values_list('id', flat=True).first()
+
+
+class EventBroker:
+    def __init__(self):
+        self._subscribers = set()
+        self._task = None
+        self._cursor = None
+
+    def subscribe(self, since):
+        """
+        Register a stream positioned at event ``since``. A running poller may
+        already be past it; the stream's own catch-up query covers the difference.
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._cursor = EventCursor(since)
+            self._task = loop.create_task(self._run())
+        return queue
+
+    def watch(self, missing):
+        """Poll for ``missing`` too: ids a resuming stream is still waiting for."""
+        if self._cursor is not None:
+            self._cursor.watch(missing)
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def is_subscribed(self, queue):
+        return queue in self._subscribers
+
+    async def _run(self):
+        cursor = self._cursor
+        while self._subscribers:
+            cursor.expire()
+            try:
+                events = await sync_to_async(_events_after)(cursor.last_id, list(cursor.missing))
+            except Exception:
+                logger.exception("Ticket event poll failed")
+                events = []
+            events = [event for event in events if cursor.advance(event['id'])]
+            if events:
+                for queue in list(self._subscribers):
+                    try:
+                        queue.put_nowait(events)
+                    except asyncio.QueueFull:
+                        # Too slow: drop it; the client reconnects with Last-Event-ID
+                        self._subscribers.discard(queue)
+            if len(events) < FETCH_LIMIT:
+                await asyncio.sleep(POLL_INTERVAL)
+
+
+broker = EventBroker()
+
+
+async def event_stream(user, last_event_id=None):
+    """
+    Async generator of SSE frames for ``user``, resuming after
+    ``last_event_id`` (a cursor token from an earlier frame).
+    """
+    if last_event_id is None:
+        cursor = EventCursor(await sync_to_async(_latest_id)())
+    else:
+        cursor = EventCursor.parse(last_event_id)
+    queue = broker.subscribe(cursor.last_id)
+    try:
+        yield f"retry: {int(POLL_INTERVAL * 3000)}\n\n"
+
+        if last_event_id is not None:
+            oldest = await sync_to_async(_oldest_id)()
+            if oldest is not None and cursor.last_id < oldest - 1:
+                # Events the client missed were pruned; it has to refetch its lists
+                yield "event: reset\ndata: {}\n\n"
+        # Catch up on anything written before the poller picked this stream up
+        while True:
+            missed = await sync_to_async(_events_after)(cursor.last_id, list(cursor.missing))
+            for event in missed:
+                if cursor.advance(event['id']) and visible_to(event, user):
+                    yield format_event(event, cursor.token())
+            if len(missed) < FETCH_LIMIT:
+                break
+        broker.watch(cursor.missing)
+
+        while True:
+            if not broker.is_subscribed(queue) and queue.empty():
+                return
+            try:
+                events = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            cursor.expire()
+            for event in events:
+                # The catch-up query may already have sent these
+                if cursor.advance(event['id']) and visible_to(event, user):
+                    yield format_event(event, cursor.token())
+    finally:
+        broker.unsubscribe(queue)
+
+
+def prune_events(before):
+    """Delete events older than ``before``; returns the number removed."""
+    deleted, _ = TicketEvent.objects.filter(created_at__lt=before).delete()
+    return deleted
@@ -0,0 +1,268 @@
+"""
+Bulk ticket intake.
+
+Integrations and migrations send tickets in bulk: a JSON array or NDJSON body
+to ``bulk_create_tickets``, or a CSV file to the ``import_tickets`` command.
+Each record is checked the way ``TicketViewSet.create`` checks one ticket
+(``normalize_record``, then ``TicketSerializer``), plus the model's own field
+checks so a bad value mapped in from dynamic_data cannot fail a whole insert.
+Records are handled BATCH_SIZE at a time, and each batch costs:
+
+- one query per kind of owner reference (company id, email),
+- one block of ticket numbers from core.id_allocator, instead of a random
+  number checked with a query per ticket,
+- one ``bulk_create`` each for tickets, activity logs and ticket events,
+  plus indexing the tickets for duplicate detection (core.ticket_similarity).
+
+Every batch commits on its own, so tens of thousands of records never sit in
+one transaction; a record that fails validation is reported with its index
+and skipped without failing its batch. A ticket created one at a time can
+take a number from the reserved block between the check and the insert; the
+batch is then retried with fresh numbers, and after SAVE_ATTEMPTS its records
+are saved one by one so only a record that still fails is reported.
+
+``bulk_create`` sends no ``post_save``, so records imported as Open are
+pushed to the workflow here once their batch commits, as
+``core.ticket_operations`` does for batch approvals.
+
+A record names its owner with ``employee_company_id``, ``employee_email`` or
+``employee_cookie_id`` (an auth-service user id). Without one, the ticket
+belongs to whoever submitted the batch.
+"""
+import json
+from datetime import datetime
+
+import orjson
+from django.core.exceptions import ValidationError as ModelValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from . import ticket_events, ticket_similarity
+from .authentication import ExternalUser
+from .id_allocator import reserve_ticket_numbers
+from .models import ActivityLog, Employee, Ticket
+from .serializers import TicketSerializer
+from .ticket_operations import push_to_workflow
+
+BATCH_SIZE = 500
+# Tries at a batch with fresh ticket numbers before saving its records one by one
+SAVE_ATTEMPTS = 3
+
+DATE_FIELDS = ['expected_return_date', 'performance_start_date', 'performance_end_date', 'scheduled_date']
+DYNAMIC_DATE_KEYS = ['expectedReturnDate', 'performanceStartDate', 'performanceEndDate', 'scheduledDate']
+OWNER_FIELDS = ['employee_company_id', 'employee_email', 'employee_cookie_id']
+
+
+class InvalidRecord:
+    """Stands in for a record that could not be parsed at all."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _clean_date(value):
+    # Frontends send ISO datetimes, slashes, empty strings or stray quotes
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    if value == '' or all(c in '“”"\'' for c in value):
+        return None
+    value = value.split('T')[0].replace('/', '-')
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return value
+
+
+def normalize_record(data):
+    """
+    A plain dict of ``data`` (a dict or QueryDict) ready for TicketSerializer:
+    dynamic_data decoded if it came as a JSON string, and unusable dates, top
+    level or inside dynamic_data, turned into None.
+    """
+    record = {key: data.get(key) for key in data.keys()}
+    dynamic = record.get('dynamic_data')
+    if isinstance(dynamic, (str, bytes)) and dynamic:
+        try:
+            dynamic = json.loads(dynamic)
+        except ValueError:
+            dynamic = None
+        if dynamic is not None:
+            record['dynamic_data'] = dynamic
+    if isinstance(dynamic, dict):
+        for key in DYNAMIC_DATE_KEYS:
+            if key in dynamic:
+                dynamic[key] = _clean_date(dynamic[key])
+    for key in DATE_FIELDS:
+        if key in record:
+            record[key] = _clean_date(record[key])
+    return record
+
+
+def read_ndjson(lines):
+    """Records from newline-delimited JSON, one per non-blank line."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield InvalidRecord(f'Invalid JSON: {e}')
+
+
+def _owners(records):
+    # Employees named by the batch, keyed by ('employee_company_id', value) etc.
+    company_ids = {r['employee_company_id'] for r in records if r.get('employee_company_id')}
+    emails = {r['employee_email'] for r in records if r.get('employee_email')}
+    found = {}
+    if company_ids:
+        for employee in Employee.objects.filter(company_id__in=company_ids):
+            found['employee_company_id', employee.company_id] = employee
+    if emails:
+        for employee in Employee.objects.filter(email__in=emails):
+            found['employee_email', employee.email] = employee
+    return found
+
+
+def _owner(record, owners, user):
+    """``(employee, employee_cookie_id)`` owning ``record``; raises ValueError if it names nobody known."""
+    if record.get('employee_company_id'):
+        employee = owners.get(('employee_company_id', record['employee_company_id']))
+        if employee is None:
+            raise ValueError('No employee with this company id')
+        return employee, None
+    if record.get('employee_email'):
+        employee = owners.get(('employee_email', record['employee_email']))
+        if employee is None:
+            raise ValueError('No employee with this email')
+        return employee, None
+    if record.get('employee_cookie_id') not in (None, ''):
+        try:
+            return None, int(record['employee_cookie_id'])
+        except (TypeError, ValueError):
+            raise ValueError('Must be an integer')
+    if user is None:
+        raise ValueError('An owner is required')
+    if isinstance(user, ExternalUser):
+        return None, user.id
+    return user, None
+
+
+def _validate(batch, user, errors):
+    """Unsaved tickets for the valid ``(index, record)`` pairs of ``batch``; errors go to ``errors``."""
+    serializer = TicketSerializer()
+    records = [record for _, record in batch if isinstance(record, dict)]
+    owners = _owners(records)
+    tickets = []
+    for index, record in batch:
+        if isinstance(record, InvalidRecord):
+            errors.append({'index': index, 'errors': {'non_field_errors': [record.error]}})
+            continue
+        if not isinstance(record, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ['Expected an object']}})
+            continue
+        try:
+            employee, cookie_id = _owner(record, owners, user)
+        except ValueError as e:
+            field = next((f for f in OWNER_FIELDS if record.get(f) not in (None, '')), 'employee')
+            errors.append({'index': index, 'errors': {field: [str(e)]}})
+            continue
+        try:
+            validated = serializer.run_validation(normalize_record(record))
+        except serializers.ValidationError as e:
+            errors.append({'index': index, 'errors': e.detail})
+            continue
+        ticket = Ticket(employee=employee, employee_cookie_id=cookie_id, **serializer.ticket_fields(validated))
+        try:
+            ticket.clean_fields(exclude=['employee', 'ticket_number'])
+        except ModelValidationError as e:
+            errors.append({'index': index, 'errors': e.message_dict})
+            continue
+        tickets.append((index, ticket))
+    return tickets
+
+
+def _save(tickets, user, actor):
+    local_actor = None if isinstance(user, ExternalUser) else user
+    with transaction.atomic():
+        for ticket, number in zip(tickets, reserve_ticket_numbers(len(tickets))):
+            ticket.ticket_number = number
+        Ticket.objects.bulk_create(tickets)
+        ticket_similarity.index_tickets(tickets)
+        # Activity logs hang off a local Employee; cookie-only tickets have none
+        ActivityLog.objects.bulk_create([
+            ActivityLog(
+                user=ticket.employee,
+                action_type='ticket_created',
+                message=f'Created new ticket: {ticket.subject}',
+                ticket=ticket,
+                actor=local_actor,
+                metadata={'category': ticket.category, 'bulk_intake': True},
+            )
+            for ticket in tickets if ticket.employee_id
+        ])
+        ticket_events.publish_many([ticket_events.build_event('ticket_created', ticket, **actor) for ticket in tickets])
+        opened = [ticket.ticket_number for ticket in tickets if ticket.status == 'Open']
+        if opened:
+            transaction.on_commit(lambda: push_to_workflow(opened))
+
+
+def _unsave(tickets):
+    # Rolled back: let the next bulk_create insert them again
+    for ticket in tickets:
+        ticket.pk = None
+        ticket._state.adding = True
+
+
+def _save_batch(tickets, user, actor, errors):
+    """Save the ``(index, ticket)`` pairs; returns the ones saved, errors go to ``errors``."""
+    for _attempt in range(SAVE_ATTEMPTS):
+        try:
+            _save([ticket for _, ticket in tickets], user, actor)
+            return tickets
+        except IntegrityError:
+            # Usually a reserved number taken meanwhile; the retry reserves new ones
+            _unsave([ticket for _, ticket in tickets])
+    saved = []
+    for index, ticket in tickets:
+        try:
+            _save([ticket], user, actor)
+        except IntegrityError as e:
+            _unsave([ticket])
+            errors.append({'index': index, 'errors': {'non_field_errors': [str(e)]}})
+        else:
+            saved.append((index, ticket))
+    return saved
+
+
+def ingest(records, user=None, actor_name='', batch_size=BATCH_SIZE):
+    """
+    Create a ticket for every valid record in ``records`` (any iterable of
+    dicts, read lazily). ``user`` submitted them; it owns records that name
+    no owner and is the actor on their logs and events.
+
+    Returns ``{'created': [{'index', 'id', 'ticket_number'}], 'errors':
+    [{'index', 'errors'}]}``, with indexes counted from 0 in input order.
+    """
+    actor = ticket_events.actor_data(user, actor_name) if user is not None else {}
+    created, errors = [], []
+    batch = []
+
+    def flush():
+        tickets = _validate(batch, user, errors)
+        if tickets:
+            tickets = _save_batch(tickets, user, actor, errors)
+            created.extend(
+                {'index': index, 'id': ticket.pk, 'ticket_number': ticket.ticket_number}
+                for index, ticket in tickets
+            )
+        batch.clear()
+
+    for index, record in enumerate(records):
+        batch.append((index, record))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return {'created': created, 'errors': errors}
@@ -0,0 +1,305 @@
+"""
+Batch ticket operations.
+
+Applies one operation (approve, reject, claim, update_status, withdraw) to
+many tickets in a single transaction: the tickets are loaded and locked with
+one query, checked one by one with the same rules as the single-ticket
+endpoints, then written with one ``bulk_update`` plus one ``bulk_create`` each
+for comments, activity logs and ticket events. A ticket that fails its checks
+is reported and left untouched; it does not abort the batch. Every requested
+id gets a result in request order: a repeated id is reported as a duplicate,
+and a failure on a ticket the caller cannot view (core.ticket_detail) reads
+"Ticket not found", as the detail view would answer. The tickets are
+locked, so their summary columns (core.ticket_summary) are updated in memory
+and written by the same ``bulk_update``.
+
+``bulk_update`` skips ``post_save``, so tickets that become Open are pushed
+to the workflow here once the transaction commits (the same minimal payload
+``send_ticket_to_workflow`` sends), and tickets that are no longer open are
+dropped from the duplicate index (core.ticket_similarity) here too.
+"""
+import logging
+import os
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import ticket_events, ticket_similarity, ticket_summary
+from .authentication import ExternalUser
+from .models import ActivityLog, DEPARTMENT_CHOICES, PRIORITY_LEVELS, Ticket, TicketComment
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.environ.get('TICKET_BATCH_MAX_SIZE', '500'))
+
+COORDINATOR_ROLES = ['System Admin', 'Ticket Coordinator']
+VALID_STATUSES = ['Open', 'In Progress', 'Resolved', 'Closed', 'On Hold', 'Rejected']
+
+
+class TicketOperationError(Exception):
+    pass
+
+
+def is_coordinator(user):
+    return bool(getattr(user, 'is_staff', False) or getattr(user, 'role', None) in COORDINATOR_ROLES)
+
+
+def is_ticket_owner(ticket, user):
+    user_id = getattr(user, 'id', None)
+    if user_id is None:
+        return False
+    if ticket.employee_cookie_id == user_id:
+        return True
+    return not isinstance(user, ExternalUser) and ticket.employee_id == user_id
+
+
+def _close(ticket, now):
+    ticket.time_closed = now
+    if ticket.submit_date:
+        ticket.resolution_time = now - ticket.submit_date
+
+
+class BatchOperation:
+    """One ticket operation; subclasses mirror the single-ticket endpoint."""
+    name = None
+    update_fields = ['status']
+    comment_internal = False
+    coordinator_only = True
+
+    def __init__(self, user, actor_name, params):
+        self.user = user
+        self.actor_name = actor_name
+        self.params = params
+        self.clean()
+
+    def clean(self):
+        """Validate ``params`` once for the whole batch."""
+
+    def check_permission(self):
+        if self.coordinator_only and not is_coordinator(self.user):
+            raise TicketOperationError('permission denied')
+
+    def apply(self, ticket, now):
+        """Mutate ``ticket`` in memory and return the comment text (or None)."""
+        raise NotImplementedError
+
+
+class ApproveOperation(BatchOperation):
+    name = 'approve'
+    update_fields = ['status', 'priority', 'department', 'approved_by']
+
+    def clean(self):
+        self.priority = self.params.get('priority', 'Low')
+        self.department = self.params.get('department', 'IT Department')
+        if self.priority not in [choice[0] for choice in PRIORITY_LEVELS]:
+            raise TicketOperationError('Invalid priority level')
+        if self.department not in [choice[0] for choice in DEPARTMENT_CHOICES]:
+            raise TicketOperationError('Invalid department')
+
+    def apply(self, ticket, now):
+        if ticket.status not in ['New', 'Pending']:
+            raise TicketOperationError('Ticket cannot be approved in current state')
+        ticket.status = 'Open'
+        ticket.priority = self.priority
+        ticket.department = self.department
+        ticket.approved_by = self.actor_name
+        ticket_summary.set_coordinator(ticket, self.user, self.actor_name)
+        return f"Status changed to Open (approved by {self.actor_name})"
+
+
+class RejectOperation(BatchOperation):
+    name = 'reject'
+    update_fields = ['status', 'assigned_to', 'rejection_reason', 'rejected_by']
+    comment_internal = True
+
+    def clean(self):
+        self.reason = (self.params.get('rejection_reason') or '').strip()
+        if not self.reason:
+            raise TicketOperationError('Rejection reason is required')
+
+    def apply(self, ticket, now):
+        if ticket.status != 'New':
+            raise TicketOperationError("Only tickets with status 'New' can be rejected.")
+        ticket.status = 'Rejected'
+        # Don't assign ExternalUser to assigned_to field (it expects Employee)
+        if not isinstance(self.user, ExternalUser):
+            ticket.assigned_to = self.user
+        ticket.rejection_reason = self.reason
+        ticket.rejected_by = self.actor_name
+        ticket_summary.set_coordinator(ticket, self.user, self.actor_name)
+        return f"Ticket rejected by {self.actor_name}. Reason: {self.reason}"
+
+
+class ClaimOperation(BatchOperation):
+    name = 'claim'
+    update_fields = ['status', 'assigned_to']
+    coordinator_only = False
+
+    def apply(self, ticket, now):
+        if ticket.status != 'Open':
+            raise TicketOperationError('Ticket is not available for claiming.')
+        ticket.status = 'In Progress'
+        if not isinstance(self.user, ExternalUser):
+            ticket.assigned_to = self.user
+        return None
+
+
+class UpdateStatusOperation(BatchOperation):
+    name = 'update_status'
+    update_fields = ['status', 'time_closed', 'resolution_time']
+    coordinator_only = False
+
+    def clean(self):
+        self.new_status = self.params.get('status')
+        self.comment = (self.params.get('comment') or '').strip()
+        if not self.new_status:
+            raise TicketOperationError('Status is required')
+        if self.new_status not in VALID_STATUSES:
+            raise TicketOperationError('Invalid status')
+
+    def apply(self, ticket, now):
+        # Ticket owners may close their own tickets; everything else needs a coordinator
+        if not is_coordinator(self.user):
+            if not (self.new_status == 'Closed' and is_ticket_owner(ticket, self.user)):
+                raise TicketOperationError('permission denied')
+        old_status = ticket.status
+        ticket.status = self.new_status
+        if self.new_status == 'Closed' and old_status != 'Closed':
+            _close(ticket, now)
+        if self.new_status == 'Rejected':
+            return "Status changed to Rejected"
+        text = f"Status changed from '{old_status}' to '{self.new_status}' by {self.actor_name}"
+        if self.comment:
+            text += f". Comment: {self.comment}"
+        return text
+
+
+class WithdrawOperation(BatchOperation):
+    name = 'withdraw'
+    update_fields = ['status', 'time_closed', 'resolution_time']
+    coordinator_only = False
+
+    def clean(self):
+        self.reason = (self.params.get('reason') or '').strip()
+        if not self.reason:
+            raise TicketOperationError('Withdrawal reason is required')
+
+    def apply(self, ticket, now):
+        if not is_ticket_owner(ticket, self.user):
+            raise TicketOperationError('You can only withdraw your own tickets')
+        if ticket.status in ['Closed', 'Withdrawn', 'Resolved']:
+            raise TicketOperationError(f'Cannot withdraw ticket with status: {ticket.status}')
+        ticket.status = 'Withdrawn'
+        _close(ticket, now)
+        return f"Ticket withdrawn by {self.actor_name}. Reason: {self.reason}"
+
+
+OPERATIONS = {
+    operation.name: operation
+    for operation in (ApproveOperation, RejectOperation, ClaimOperation, UpdateStatusOperation, WithdrawOperation)
+}
+
+
+def push_to_workflow(ticket_numbers):
+    """Enqueue the workflow push of each ticket; a broker outage is logged, not raised."""
+    from .tasks import push_ticket_to_workflow
+
+    for ticket_number in ticket_numbers:
+        try:
+            push_ticket_to_workflow.delay({'ticket_number': ticket_number})
+        except Exception as enqueue_err:
+            logger.exception("Failed to enqueue push_ticket_to_workflow: %s", enqueue_err)
+
+
+def run_batch(operation, ticket_ids, user, actor_name, params):
+    """
+    Apply ``operation`` (an ``OPERATIONS`` key) to ``ticket_ids``.
+
+    Raises ``TicketOperationError`` if the request as a whole is invalid;
+    otherwise returns one result dict per requested ticket id, in order,
+    repeats included.
+    """
+    from .ticket_detail import can_view
+
+    if operation not in OPERATIONS:
+        raise TicketOperationError(f"Unknown operation. Choose one of: {', '.join(OPERATIONS)}")
+    op = OPERATIONS[operation](user, actor_name, params)
+    op.check_permission()
+
+    requested = list(ticket_ids)
+    ticket_ids = list(dict.fromkeys(requested))
+    if not ticket_ids:
+        raise TicketOperationError('ticket_ids is required')
+    if len(ticket_ids) > MAX_BATCH_SIZE:
+        raise TicketOperationError(f'At most {MAX_BATCH_SIZE} tickets can be processed at once')
+
+    external = isinstance(user, ExternalUser)
+    results = {}
+    with transaction.atomic():
+        tickets = Ticket.objects.select_for_update().in_bulk(ticket_ids)
+        now = timezone.now()
+        changed, comments, logs, events = [], [], [], []
+        actor = ticket_events.actor_data(user, actor_name)
+
+        for ticket_id in ticket_ids:
+            ticket = tickets.get(ticket_id)
+            if ticket is None:
+                results[ticket_id] = {'ticket_id': ticket_id, 'success': False, 'error': 'Ticket not found'}
+                continue
+            old_status = ticket.status
+            try:
+                comment_text = op.apply(ticket, now)
+            except TicketOperationError as e:
+                if can_view(ticket, user):
+                    results[ticket_id] = {'ticket_id': ticket_id, 'success': False, 'error': str(e), 'status': old_status}
+                else:
+                    results[ticket_id] = {'ticket_id': ticket_id, 'success': False, 'error': 'Ticket not found'}
+                continue
+
+            ticket.update_date = now
+            changed.append(ticket)
+            results[ticket_id] = {'ticket_id': ticket_id, 'success': True, 'status': ticket.status}
+            if comment_text:
+                comments.append(TicketComment(
+                    ticket=ticket,
+                    user=None if external else user,
+                    user_cookie_id=user.id if external else None,
+                    comment=comment_text,
+                    is_internal=op.comment_internal,
+                ))
+            if old_status != ticket.status:
+                event_type = 'ticket_assigned' if op.name == 'claim' else 'status_changed'
+                events.append(ticket_events.build_event(event_type, ticket, previous_status=old_status, **actor))
+            # Activity logs hang off a local Employee; cookie-only tickets have none
+            if ticket.employee_id and old_status != ticket.status:
+                logs.append(ActivityLog(
+                    user_id=ticket.employee_id,
+                    action_type='status_changed',
+                    message=f'Status changed from {old_status} to {ticket.status}',
+                    ticket=ticket,
+                    actor=None if external else user,
+                    metadata={'previous_status': old_status, 'new_status': ticket.status, 'batch_operation': op.name},
+                ))
+
+        if changed:
+            TicketComment.objects.bulk_create(comments)
+            ticket_summary.apply_comments(comments)
+            fields = dict.fromkeys(op.update_fields + ['update_date'] + ticket_summary.SUMMARY_FIELDS)
+            Ticket.objects.bulk_update(changed, list(fields))
+            ActivityLog.objects.bulk_create(logs)
+            ticket_events.publish_many(events)
+            ticket_similarity.forget([ticket.pk for ticket in changed if ticket.status not in ticket_similarity.OPEN_STATUSES])
+
+            opened = [ticket.ticket_number for ticket in changed if ticket.status == 'Open']
+            if opened:
+                transaction.on_commit(lambda: push_to_workflow(opened))
+
+    seen = set()
+    ordered = []
+    for ticket_id in requested:
+        if ticket_id in seen:
+            ordered.append({'ticket_id': ticket_id, 'success': False, 'error': 'Duplicate ticket id'})
+        else:
+            seen.add(ticket_id)
+            ordered.append(results[ticket_id])
+    return ordered
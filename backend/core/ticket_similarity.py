@@ -0,0 +1,196 @@
+"""
+Near-duplicate detection for open tickets.
+
+A ticket's subject and description are normalized (lowercase, punctuation
+dropped, whitespace collapsed) and cut into overlapping SHINGLE_SIZE-character
+shingles. Character shingles still match when a typo or rewording changes a
+word. The shingle set gets a NUM_PERM-value MinHash signature: the fraction
+of positions where two signatures agree estimates the Jaccard similarity of
+the two sets.
+
+Signatures use one-permutation hashing: every shingle is hashed once into one
+of NUM_PERM bins, and each bin keeps its minimum. That is one hash per
+shingle instead of NUM_PERM, which matters for bulk intake. Short texts leave
+bins empty; those are filled from the next non-empty bin ("densification"),
+so every position is still comparable.
+
+For lookups the signature is split into BANDS bands of ROWS values. Each band
+is hashed to a key and stored as a ``TicketSimilarityBucket`` row. Two tickets
+sharing any key are candidates, which an indexed ``key IN (...)`` finds
+without looking at the other open tickets. Only candidates get their
+signatures compared. With 16 bands of 4, pairs at Jaccard 0.5 share a key
+about 64% of the time and pairs at 0.8 over 99% of the time, while unrelated
+text rarely shares one.
+
+The index only holds open tickets. ``ticket_saved`` (the ``post_save``
+receiver) indexes a ticket when it is created or its text changes, and drops
+it when it leaves OPEN_STATUSES. Bulk intake and batch operations, which skip
+signals, call ``index_tickets`` and ``forget`` themselves. The
+``rebuild_similarity_index`` command re-indexes everything, e.g. for tickets
+from before this index existed.
+"""
+import hashlib
+import os
+import re
+import zlib
+from array import array
+
+from django.db.models import Count
+
+from .models import Ticket, TicketSignature, TicketSimilarityBucket
+
+OPEN_STATUSES = ['New', 'Open', 'In Progress', 'On Hold', 'Pending']
+TEXT_FIELDS = {'subject', 'description', 'status'}
+
+SHINGLE_SIZE = 5
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+# Estimated Jaccard similarity from which a ticket counts as a likely duplicate
+THRESHOLD = float(os.environ.get('TICKET_DUPLICATE_THRESHOLD', '0.5'))
+# Tickets sharing the most bands whose signatures get compared
+MAX_CANDIDATES = 200
+
+# Shingles are hashed with (a * x + b) mod a Mersenne prime. The constants are
+# fixed: stored signatures only compare with ones made by the same function.
+_PRIME = (1 << 61) - 1
+_A, _B = 0x1F0F3C5A7D2B9E1, 0x0B7E151628AED2A
+# Added per bin skipped when densifying, above any value a bin can hold
+_SKIP = 1 << 55
+
+_PUNCTUATION = re.compile(r'[^\w\s]+')
+
+
+def normalize(text):
+    return ' '.join(_PUNCTUATION.sub(' ', text.lower()).split())
+
+
+def ticket_text(ticket):
+    return normalize(f"{ticket.subject or ''} {ticket.description or ''}")
+
+
+def shingles(text):
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """The MinHash signature of normalized ``text``, or None if it is empty."""
+    bins = [None] * NUM_PERM
+    for shingle in shingles(text):
+        index, value = divmod((_A * zlib.crc32(shingle.encode()) + _B) % _PRIME, NUM_PERM)[::-1]
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    filled = [index for index, value in enumerate(bins) if value is not None]
+    if not filled:
+        return None
+    signature = []
+    for index in range(NUM_PERM):
+        # Nearest non-empty bin at or after this one, wrapping around
+        source = next((i for i in filled if i >= index), filled[0])
+        signature.append(bins[source] + ((source - index) % NUM_PERM) * _SKIP)
+    return signature
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return sum(1 for x, y in zip(signature, other) if x == y) / NUM_PERM
+
+
+def band_keys(signature):
+    keys = []
+    for band in range(BANDS):
+        rows = array('Q', signature[band * ROWS:(band + 1) * ROWS])
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8, person=band.to_bytes(2, 'big')).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def _pack(signature):
+    return array('Q', signature).tobytes()
+
+
+def _unpack(data):
+    signature = array('Q')
+    signature.frombytes(bytes(data))
+    return signature.tolist()
+
+
+def _text_hash(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def forget(ticket_ids):
+    """Drop ``ticket_ids`` from the index."""
+    TicketSimilarityBucket.objects.filter(ticket_id__in=ticket_ids).delete()
+    TicketSignature.objects.filter(ticket_id__in=ticket_ids).delete()
+
+
+def index_tickets(tickets):
+    """(Re)index ``tickets``; the ones that are not open, or have no text, are dropped."""
+    texts = {ticket.pk: ticket_text(ticket) for ticket in tickets if ticket.status in OPEN_STATUSES}
+    texts = {ticket_id: text for ticket_id, text in texts.items() if text}
+    current = dict(TicketSignature.objects.filter(ticket_id__in=texts).values_list('ticket_id', 'text_hash'))
+    changed = {ticket_id: text for ticket_id, text in texts.items() if current.get(ticket_id) != _text_hash(text)}
+    stale = [ticket.pk for ticket in tickets if ticket.pk not in texts or ticket.pk in changed]
+    if stale:
+        forget(stale)
+    signatures, buckets = [], []
+    for ticket_id, text in changed.items():
+        signature = minhash(text)
+        signatures.append(TicketSignature(ticket_id=ticket_id, text_hash=_text_hash(text), minhash=_pack(signature)))
+        buckets.extend(TicketSimilarityBucket(ticket_id=ticket_id, key=key) for key in band_keys(signature))
+    TicketSignature.objects.bulk_create(signatures)
+    TicketSimilarityBucket.objects.bulk_create(buckets)
+
+
+def ticket_saved(ticket, created, update_fields):
+    if created or update_fields is None or TEXT_FIELDS & set(update_fields):
+        index_tickets([ticket])
+
+
+def find_similar(signature, exclude=None, limit=10):
+    """
+    Open tickets whose text is likely a near duplicate of ``signature``'s, as
+    ``(ticket, similarity)`` pairs, most similar first.
+    """
+    buckets = TicketSimilarityBucket.objects.filter(key__in=band_keys(signature))
+    if exclude is not None:
+        buckets = buckets.exclude(ticket_id=exclude)
+    candidates = buckets.values('ticket_id').annotate(hits=Count('id')).order_by('-hits')[:MAX_CANDIDATES]
+    scores = {}
+    for ticket_id, data in TicketSignature.objects.filter(
+        ticket_id__in=[row['ticket_id'] for row in candidates]
+    ).values_list('ticket_id', 'minhash'):
+        score = similarity(signature, _unpack(data))
+        if score >= THRESHOLD:
+            scores[ticket_id] = score
+    best = sorted(scores, key=lambda ticket_id: (-scores[ticket_id], ticket_id))[:limit]
+    tickets = Ticket.objects.filter(pk__in=best, status__in=OPEN_STATUSES).in_bulk()
+    return [(tickets[ticket_id], scores[ticket_id]) for ticket_id in best if ticket_id in tickets]
+
+
+def similar_tickets(ticket, limit=10):
+    """Likely duplicates of ``ticket`` among the other open tickets."""
+    data = TicketSignature.objects.filter(ticket_id=ticket.pk).values_list('minhash', flat=True).first()
+    # Tickets outside the index (closed ones) are compared by their text
+    signature = _unpack(data) if data is not None else minhash(ticket_text(ticket))
+    if signature is None:
+        return []
+    return find_similar(signature, exclude=ticket.pk, limit=limit)
+
+
+def rebuild(batch_size=500):
+    """Index every open ticket and drop everything else; returns how many tickets are indexed."""
+    TicketSimilarityBucket.objects.exclude(ticket__status__in=OPEN_STATUSES).delete()
+    TicketSignature.objects.exclude(ticket__status__in=OPEN_STATUSES).delete()
+    last_id = 0
+    while True:
+        batch = list(Ticket.objects.filter(pk__gt=last_id, status__in=OPEN_STATUSES).order_by('pk').only(
+            'id', 'status', 'subject', 'description',
+        )[:batch_size])
+        if not batch:
+            return TicketSignature.objects.count()
+        last_id = batch[-1].pk
+        index_tickets(batch)
@@ -0,0 +1,263 @@
+"""
+Ticket summary columns.
+
+Ticket carries a summary of its child rows so list views, dashboards and the
+detail view read it from the ticket itself:
+
+- ``comment_count``: public (non-internal) comments, i.e. what everyone who
+  can open the ticket sees.
+- ``attachment_count``.
+- ``last_activity_at``: the newest comment or upload, null while there is
+  none (the submission is the last activity then).
+- ``coordinator`` / ``coordinator_cookie_id`` / ``coordinator_name``: the
+  local coordinator who approved or rejected the ticket. Otherwise it is the
+  author of the latest public comment from staff or support (a local staff
+  user, or an auth-service user other than the ticket owner).
+
+The comment and attachment receivers in core.models call ``comment_added``,
+``attachment_added`` and friends. Each is a single UPDATE with F()
+expressions, so concurrent writers cannot lose counts, and ``Ticket.save``
+never writes the counters back. Batch operations, which lock their tickets
+and skip signals with ``bulk_create``, apply the same changes in memory
+(``apply_comments``). Approve/reject set the coordinator in the same save as
+the status. Each change also moves ``update_date``, so conditional GETs and
+delta sync see it.
+
+``reconcile`` recomputes everything from the child tables, and
+``reconcile_archived`` does the same for the snapshots of archived tickets.
+``reconcile`` locks each batch of tickets before counting their children.
+Comments and attachments are saved in one transaction with their receiver's
+UPDATE, so a child is either counted by the reconcile (committed before the
+lock was granted) or incremented after it (its UPDATE waits for the lock),
+never both or neither.
+Together they back the ``reconcile_ticket_summaries`` command.
+"""
+from types import SimpleNamespace
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import (
+    ArchivedTicket,
+    ArchivedTicketAttachment,
+    ArchivedTicketComment,
+    Employee,
+    Ticket,
+    TicketAttachment,
+    TicketComment,
+)
+
+STAFF_ROLES = ['System Admin', 'Ticket Coordinator', 'Admin']
+NO_COORDINATOR = {'coordinator_id': None, 'coordinator_cookie_id': None, 'coordinator_name': ''}
+SUMMARY_FIELDS = [
+    'comment_count', 'attachment_count', 'last_activity_at',
+    'coordinator_id', 'coordinator_cookie_id', 'coordinator_name',
+]
+
+
+def _name(user):
+    return f"{getattr(user, 'first_name', '') or ''} {getattr(user, 'last_name', '') or ''}".strip()
+
+
+def _is_staff(user):
+    return getattr(user, 'is_staff', False) or getattr(user, 'role', None) in STAFF_ROLES
+
+
+def coordinator_values(user, name=''):
+    """Summary values naming ``user`` (an Employee or ExternalUser) as coordinator; ``name`` if it has none."""
+    if isinstance(user, Employee):
+        return {'coordinator_id': user.pk, 'coordinator_cookie_id': None, 'coordinator_name': _name(user) or name}
+    return {'coordinator_id': None, 'coordinator_cookie_id': user.id, 'coordinator_name': _name(user) or name}
+
+
+def set_coordinator(ticket, user, name=''):
+    """Record ``user`` as the coordinator of ``ticket`` in memory, for the approve/reject save."""
+    for field, value in coordinator_values(user, name).items():
+        setattr(ticket, field, value)
+
+
+def _comment_author(ticket, comment):
+    # The coordinator values for a staff/support comment's author, or None
+    if comment.is_internal:
+        return None
+    if comment.user_id is not None:
+        if _is_staff(comment.user):
+            return coordinator_values(comment.user)
+        return None
+    if ticket.employee_cookie_id is not None and comment.user_cookie_id != ticket.employee_cookie_id:
+        # Comments do not carry names of auth-service users; keep the one
+        # recorded at approval if it is the same person
+        same = getattr(ticket, 'coordinator_cookie_id', None) == comment.user_cookie_id
+        return {
+            'coordinator_id': None,
+            'coordinator_cookie_id': comment.user_cookie_id,
+            'coordinator_name': getattr(ticket, 'coordinator_name', '') if same else '',
+        }
+    return None
+
+
+def _touch(ticket_id, when, **values):
+    now = timezone.now()
+    Ticket.objects.filter(pk=ticket_id).update(
+        last_activity_at=Greatest(Coalesce(F('last_activity_at'), Value(when)), Value(when)),
+        update_date=now,
+        **values,
+    )
+
+
+def _pinned():
+    # Approved or rejected by a local coordinator: later comments do not replace them
+    return Q(coordinator__company_id=F('approved_by')) | Q(coordinator__company_id=F('rejected_by'))
+
+
+def comment_added(comment):
+    ticket = comment.ticket
+    _touch(ticket.pk, comment.created_at, **({} if comment.is_internal else {'comment_count': F('comment_count') + 1}))
+    author = _comment_author(ticket, comment)
+    if author is not None:
+        if author['coordinator_cookie_id'] is not None:
+            author['coordinator_name'] = Case(
+                When(coordinator_cookie_id=author['coordinator_cookie_id'], then=F('coordinator_name')),
+                default=Value(''),
+            )
+        Ticket.objects.filter(pk=ticket.pk).exclude(_pinned()).update(**author)
+
+
+def apply_comments(comments):
+    """
+    What ``comment_added`` does, on the in-memory tickets of ``comments``, for
+    callers that hold those tickets locked and save them themselves
+    (core.ticket_operations folds this into its ``bulk_update``).
+    """
+    tickets = {comment.ticket.pk: comment.ticket for comment in comments}
+    company_ids = dict(Employee.objects.filter(
+        pk__in={ticket.coordinator_id for ticket in tickets.values() if ticket.coordinator_id}
+    ).values_list('pk', 'company_id'))
+    for comment in comments:
+        ticket = comment.ticket
+        ticket.last_activity_at = max(filter(None, [ticket.last_activity_at, comment.created_at]))
+        if comment.is_internal:
+            continue
+        ticket.comment_count += 1
+        author = _comment_author(ticket, comment)
+        pinned = company_ids.get(ticket.coordinator_id) in {ticket.approved_by, ticket.rejected_by} - {None}
+        if author is not None and not pinned:
+            for field, value in author.items():
+                setattr(ticket, field, value)
+
+
+def comment_deleted(comment):
+    if not comment.is_internal:
+        Ticket.objects.filter(pk=comment.ticket_id).update(
+            comment_count=Greatest(F('comment_count') - 1, Value(0)), update_date=timezone.now(),
+        )
+
+
+def attachment_added(attachment):
+    _touch(attachment.ticket_id, attachment.upload_date, attachment_count=F('attachment_count') + 1)
+
+
+def attachment_deleted(attachment):
+    Ticket.objects.filter(pk=attachment.ticket_id).update(
+        attachment_count=Greatest(F('attachment_count') - 1, Value(0)), update_date=timezone.now(),
+    )
+
+
+def summarize(tickets, comment_model=TicketComment, attachment_model=TicketAttachment):
+    """
+    Summary values of each ticket in ``tickets`` computed from the child
+    tables, keyed by ticket id. ``tickets`` need ``id``, ``approved_by``,
+    ``rejected_by`` and ``employee_cookie_id``.
+    """
+    tickets = {ticket.id: ticket for ticket in tickets}
+    ids = list(tickets)
+    comment_stats = {
+        row['ticket_id']: row
+        for row in comment_model.objects.filter(ticket_id__in=ids).values('ticket_id').annotate(
+            public=Count('pk', filter=Q(is_internal=False)), latest=Max('created_at'),
+        )
+    }
+    attachment_stats = {
+        row['ticket_id']: row
+        for row in attachment_model.objects.filter(ticket_id__in=ids).values('ticket_id').annotate(
+            count=Count('pk'), latest=Max('upload_date'),
+        )
+    }
+    keys = {key for ticket in tickets.values() for key in (ticket.approved_by, ticket.rejected_by) if key}
+    approvers = {employee.company_id: employee for employee in Employee.objects.filter(company_id__in=keys)}
+    latest_staff = {}
+    public = comment_model.objects.filter(ticket_id__in=ids, is_internal=False).select_related('user')
+    for comment in public.order_by('ticket_id', '-created_at', '-id'):
+        if comment.ticket_id not in latest_staff:
+            author = _comment_author(tickets[comment.ticket_id], comment)
+            if author is not None:
+                latest_staff[comment.ticket_id] = author
+
+    summaries = {}
+    for ticket_id, ticket in tickets.items():
+        comments = comment_stats.get(ticket_id, {})
+        attachments = attachment_stats.get(ticket_id, {})
+        activity = [when for when in (comments.get('latest'), attachments.get('latest')) if when]
+        approver = approvers.get(ticket.approved_by or ticket.rejected_by)
+        coordinator = coordinator_values(approver) if approver else latest_staff.get(ticket_id, NO_COORDINATOR)
+        summaries[ticket_id] = dict(
+            comment_count=comments.get('public', 0),
+            attachment_count=attachments.get('count', 0),
+            last_activity_at=max(activity, default=None),
+            **coordinator,
+        )
+    return summaries
+
+
+def reconcile(batch_size=500):
+    """Recompute every ticket's summary; returns how many tickets were corrected."""
+    fixed = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(Ticket.objects.select_for_update().filter(pk__gt=last_id).order_by('pk').only(
+                'id', 'approved_by', 'rejected_by', 'employee_cookie_id', *SUMMARY_FIELDS,
+            )[:batch_size])
+            if not batch:
+                return fixed
+            last_id = batch[-1].pk
+            summaries = summarize(batch)
+            now = timezone.now()
+            stale = []
+            for ticket in batch:
+                summary = summaries[ticket.pk]
+                if any(getattr(ticket, field) != value for field, value in summary.items()):
+                    for field, value in summary.items():
+                        setattr(ticket, field, value)
+                    ticket.update_date = now
+                    stale.append(ticket)
+            Ticket.objects.bulk_update(stale, SUMMARY_FIELDS + ['update_date'])
+        fixed += len(stale)
+
+
+def reconcile_archived(batch_size=500):
+    """Fill in the summary of archived snapshots that lack or disagree with it; returns how many changed."""
+    fixed = 0
+    last_id = 0
+    while True:
+        batch = list(ArchivedTicket.objects.filter(pk__gt=last_id).order_by('pk')[:batch_size])
+        if not batch:
+            return fixed
+        last_id = batch[-1].pk
+        summaries = summarize(
+            [SimpleNamespace(**archived.ticket_fields()) for archived in batch],
+            ArchivedTicketComment, ArchivedTicketAttachment,
+        )
+        stale = []
+        for archived in batch:
+            summary = summaries[archived.pk]
+            # Stored the way core.archive snapshots fields
+            if summary['last_activity_at'] is not None:
+                summary['last_activity_at'] = summary['last_activity_at'].isoformat()
+            if any(archived.data.get(field) != value for field, value in summary.items()):
+                archived.data.update(summary)
+                stale.append(archived)
+        ArchivedTicket.objects.bulk_update(stale, ['data'])
+        fixed += len(stale)
@@ -0,0 +1,112 @@
+"""
+Delta sync for clients that keep a local ticket list.
+
+The cursor records the last ``(update_date, id)`` pair handed out and the last
+``TicketTombstone`` id. A request returns tickets created or modified after
+that pair, walking the ``(update_date, id)`` index in order. It also returns
+tombstones for tickets that were deleted, or that were withdrawn and should
+leave the list. The cursor is opaque to clients: base64 of a small JSON object.
+
+Rows modified in the last ``SETTLE_SECONDS`` are left for the next poll.
+``update_date`` is set before commit, so a slow transaction can commit a
+timestamp that is older than rows already handed out. Holding the cursor back
+a moment keeps those rows from being skipped.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .authentication import ExternalUser
+from .models import Ticket, TicketTombstone
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+SETTLE_SECONDS = 1
+
+# Statuses that take a ticket off the client's list
+TOMBSTONE_STATUSES = ['Withdrawn']
+
+SCOPE_MINE = 'mine'
+SCOPE_ALL = 'all'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(update_date, ticket_id, tombstone_id):
+    payload = {
+        't': update_date.isoformat() if update_date else None,
+        'i': ticket_id,
+        'd': tombstone_id,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None, 0, 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        update_date = parse_datetime(payload['t']) if payload.get('t') else None
+        return update_date, int(payload.get('i') or 0), int(payload.get('d') or 0)
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def _owner_filter(user):
+    # Cookie ids are auth-service user ids, a separate id space from Employee ids
+    if isinstance(user, ExternalUser):
+        return Q(employee_cookie_id=user.id)
+    return Q(employee_id=user.id)
+
+
+def sync(user, cursor=None, scope=SCOPE_MINE, limit=DEFAULT_LIMIT):
+    """
+    Return ``(tickets, tombstones, next_cursor, has_more)`` for changes after
+    ``cursor``. ``tickets`` are loaded with their employee, assignee and
+    attachments, ready for ``TicketSerializer``.
+    """
+    update_date, last_id, tombstone_id = decode_cursor(cursor)
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+
+    queryset = Ticket.objects.filter(update_date__lte=settled)
+    tombstone_qs = TicketTombstone.objects.filter(id__gt=tombstone_id)
+    if scope != SCOPE_ALL:
+        queryset = queryset.filter(_owner_filter(user))
+        tombstone_qs = tombstone_qs.filter(_owner_filter(user))
+    if update_date is not None:
+        queryset = queryset.filter(Q(update_date__gt=update_date) | Q(update_date=update_date, id__gt=last_id))
+
+    rows = list(
+        queryset.select_related('employee', 'assigned_to')
+        .prefetch_related('attachments')
+        .order_by('update_date', 'id')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    tombstones = [
+        {'id': ticket.id, 'ticket_number': ticket.ticket_number, 'reason': 'withdrawn'}
+        for ticket in rows if ticket.status in TOMBSTONE_STATUSES
+    ]
+    changed = [ticket for ticket in rows if ticket.status not in TOMBSTONE_STATUSES]
+
+    deleted = list(tombstone_qs.order_by('id').values('id', 'ticket_id', 'ticket_number', 'archived')[:MAX_LIMIT])
+    tombstones.extend(
+        {'id': row['ticket_id'], 'ticket_number': row['ticket_number'], 'reason': 'archived' if row['archived'] else 'deleted'}
+        for row in deleted
+    )
+    has_more = has_more or len(deleted) == MAX_LIMIT
+
+    if rows:
+        update_date, last_id = rows[-1].update_date, rows[-1].id
+    if deleted:
+        tombstone_id = deleted[-1]['id']
+    return changed, tombstones, encode_cursor(update_date, last_id, tombstone_id), has_more
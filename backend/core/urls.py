@@ -15,8 +15,21 @@ from .views import (
     get_user_activity_logs,
     get_new_tickets,
     claim_ticket,
+    claim_next_ticket,
     update_ticket_status,
     withdraw_ticket,
+    batch_ticket_operation,
+    bulk_create_tickets,
+    ticket_merge_candidates,
+    ticket_event_stream,
+    sync_tickets,
+    export_tickets,
+    export_activity_logs,
+    report_daily_tickets,
+    report_resolution_time,
+    report_backlog,
+    search_archived_tickets,
+    serve_archived_media,
     get_open_tickets,
     get_my_tickets,
     create_employee_admin_view,
@@ -66,15 +79,28 @@ urlpatterns = [
     path('tickets/<int:ticket_id>/claim/', claim_ticket, name='claim_ticket'),
     path('tickets/<int:ticket_id>/update-status/', update_ticket_status, name='update_ticket_status'),
     path('tickets/<int:ticket_id>/withdraw/', withdraw_ticket, name='withdraw_ticket'),
+    path('tickets/<int:ticket_id>/merge-candidates/', ticket_merge_candidates, name='ticket_merge_candidates'),
+    path('tickets/events/', ticket_event_stream, name='ticket_event_stream'),
+    path('tickets/sync/', sync_tickets, name='sync_tickets'),
+    path('tickets/export/', export_tickets, name='export_tickets'),
+    path('tickets/claim-next/', claim_next_ticket, name='claim_next_ticket'),
+    path('tickets/batch/', batch_ticket_operation, name='batch_ticket_operation'),
+    path('tickets/bulk/', bulk_create_tickets, name='bulk_create_tickets'),
     path('tickets/new/', get_new_tickets, name='get_new_tickets'),
     path('tickets/open/', get_open_tickets, name='get_open_tickets'),
     path('tickets/my-tickets/', get_my_tickets, name='get_my_tickets'),
     path('tickets/<int:ticket_id>/finalize/', finalize_ticket, name='finalize_ticket'),  # <-- add this line
+    path('archive/tickets/', search_archived_tickets, name='search_archived_tickets'),
+    path('reports/daily/', report_daily_tickets, name='report_daily_tickets'),
+    path('reports/resolution-time/', report_resolution_time, name='report_resolution_time'),
+    path('reports/backlog/', report_backlog, name='report_backlog'),
+    path('activity-logs/export/', export_activity_logs, name='export_activity_logs'),
     # Activity logs for user profile
     path('activity-logs/user/<int:user_id>/', get_user_activity_logs, name='get_user_activity_logs'),
 
     # Protected media files - require authentication
     path('media/<path:file_path>', serve_protected_media, name='serve_protected_media'),
+    path('archive/media/<path:file_path>', serve_archived_media, name='serve_archived_media'),
 
     # DRF router (should be last, and at the root for browsable API)
     path('', include(router.urls)),  # keep this LAST
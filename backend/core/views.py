@@ -105,7 +105,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from .models import Employee, Ticket, TicketAttachment, TicketComment, ActivityLog
 from .models import PRIORITY_LEVELS, DEPARTMENT_CHOICES
-from .serializers import EmployeeSerializer, TicketSerializer, TicketAttachmentSerializer, AdminTokenObtainPairSerializer, MyTokenObtainPairSerializer, CustomTokenObtainPairSerializer, ActivityLogSerializer
+from .serializers import EmployeeSerializer, TicketSerializer, AdminTokenObtainPairSerializer, MyTokenObtainPairSerializer, CustomTokenObtainPairSerializer, ActivityLogSerializer
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.utils import timezone
 from django.http import JsonResponse, HttpResponse, Http404
@@ -122,6 +122,11 @@ from django.core.mail import send_mail
 from rest_framework.reverse import reverse
 from .tasks import push_ticket_to_workflow
 from .models import EmployeeLog
+from . import ticket_events, ticket_similarity, ticket_summary
+from .ticket_intake import normalize_record
+from .renderers import NDJSONParser, ORJSONParser
+from .conditional import ConditionalGetMixin, aconditional_response, aqueryset_validators, conditional_get, queryset_validators
+from django.db.models import Count, Max, Q
 
 @csrf_exempt
 def login_view(request):
@@ -216,19 +221,8 @@ class CreateAdminEmployeeView(APIView):
         print("[DEBUG] request.auth:", request.auth)
         data = request.data.copy()
 
-        # Auto-generate Company ID (find lowest available MA number)
-        existing_ids = Employee.objects.filter(company_id__startswith='MA').values_list('company_id', flat=True)
-        used_numbers = set()
-        for cid in existing_ids:
-            try:
-                used_numbers.add(int(cid[2:]))
-            except Exception:
-                pass
-        # Find the lowest unused number
-        new_num = 1
-        while new_num in used_numbers:
-            new_num += 1
-        data['company_id'] = f"MA{new_num:04d}"
+        # Auto-generate Company ID from the atomic counter
+        data['company_id'] = generate_company_id()
 
         # Set default password
         data['password'] = "permission denied4"
@@ -262,7 +256,26 @@ class EmployeeTokenObtainPairView(TokenObtainPairView):
 class AdminTokenObtainPairView(TokenObtainPairView):
     serializer_class = AdminTokenObtainPairSerializer
 
-class TicketViewSet(viewsets.ModelViewSet):
+def _ticket_conditional_extra():
+    """
+    Related rows that show up in ticket payloads, as aggregates for conditional GET.
+    New comments and attachments move the ticket's own update_date (core.ticket_summary).
+    """
+    return {
+        # Previews are rendered after upload; a new one changes the payload
+        'attachments_previews': Count('attachments', filter=Q(attachments__preview_status='ready'), distinct=True),
+        'employee_updated': Max('employee__date_updated'),
+    }
+
+
+def _coordinator_ticket_validators(request, **filters):
+    user = request.user
+    if isinstance(user, ExternalUser) or not (user.is_staff or user.role in ['System Admin', 'Ticket Coordinator']):
+        return None
+    return queryset_validators(request, Ticket.objects.filter(**filters), extra=_ticket_conditional_extra())
+
+
+class TicketViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = TicketSerializer
     authentication_classes = [
         CookieJWTAuthentication, 
@@ -271,6 +284,8 @@ class TicketViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [JSONParser, MultiPartParser, FormParser]  # Accept JSON and form uploads
 
+    def get_conditional_extra(self):
+        return _ticket_conditional_extra()
     
     def get_queryset(self):
         user = self.request.user
@@ -323,73 +338,8 @@ class TicketViewSet(viewsets.ModelViewSet):
                 # As a last resort, use an empty dict to avoid crashing
                 data = {}
 
-            # If frontend sent dynamic_data as a JSON string, parse it
-            dynamic = data.get('dynamic_data')
-            parsed_dynamic = None
-            if dynamic:
-                if isinstance(dynamic, (str, bytes)):
-                    try:
-                        parsed_dynamic = json.loads(dynamic)
-                    except Exception:
-                        parsed_dynamic = None
-                elif isinstance(dynamic, dict):
-                    parsed_dynamic = dynamic
-
-            # Sanitize date-like fields inside parsed_dynamic
-            if isinstance(parsed_dynamic, dict):
-                dd = parsed_dynamic
-                dynamic_date_keys = ['expectedReturnDate', 'performanceStartDate', 'performanceEndDate', 'scheduledDate']
-                from datetime import datetime
-                for dk in dynamic_date_keys:
-                    if dk in dd:
-                        v = dd.get(dk)
-                        if v is None:
-                            continue
-                        if not isinstance(v, str):
-                            continue
-                        s = v.strip()
-                        if s == '' or all(c in '“”\"\'' for c in s):
-                            dd[dk] = None
-                            continue
-                        if 'T' in s:
-                            s = s.split('T')[0]
-                        s = s.replace('/', '-')
-                        try:
-                            datetime.fromisoformat(s)
-                            dd[dk] = s
-                        except Exception:
-                            dd[dk] = None
-
-            # Convert request.data (QueryDict) to a plain dict so serializer sees proper types
-            plain_data = {k: data.get(k) for k in data.keys()}
-            if parsed_dynamic is not None:
-                plain_data['dynamic_data'] = parsed_dynamic
-
-            # Sanitize date fields coming from the frontend
-            date_keys = [
-                'expected_return_date', 'performance_start_date',
-                'performance_end_date', 'scheduled_date'
-            ]
-            from datetime import datetime
-            for dk in date_keys:
-                if dk in plain_data:
-                    val = plain_data.get(dk)
-                    if val is None:
-                        continue
-                    if not isinstance(val, str):
-                        continue
-                    s = val.strip()
-                    if s == '' or all(c in '“”\"\'' for c in s):
-                        plain_data[dk] = None
-                        continue
-                    if 'T' in s:
-                        s = s.split('T')[0]
-                    s = s.replace('/', '-')
-                    try:
-                        datetime.fromisoformat(s)
-                        plain_data[dk] = s
-                    except Exception:
-                        plain_data[dk] = None
+            # Decode dynamic_data if sent as a JSON string and drop unusable dates
+            plain_data = normalize_record(data)
 
             # Handle file uploads separately
             files = request.FILES.getlist('files[]') if hasattr(request, 'FILES') else []
@@ -448,6 +398,13 @@ class TicketViewSet(viewsets.ModelViewSet):
             except Exception:
                 serialized = serializer.data
 
+            # Open tickets that look like the same request, among those the submitter may see
+            from .ticket_detail import can_view
+            serialized['possible_duplicates'] = _duplicate_data(
+                (ticket, score) for ticket, score in ticket_similarity.similar_tickets(instance)
+                if can_view(ticket, request.user)
+            )
+
             # If any attachment save errors occurred, expose them under a debug key
             try:
                 if attachment_errors:
@@ -473,6 +430,7 @@ class TicketViewSet(viewsets.ModelViewSet):
             # No need for complex matching - just save with cookie_id
             # The ticket serialization will use the ExternalUser's profile data directly
             ticket = serializer.save(employee=None, employee_cookie_id=user.id)
+            ticket_events.publish('ticket_created', ticket, **ticket_events.actor_data(user, get_user_display_name(user)))
             # We cannot reliably create ActivityLog for external users (no local Employee record)
             return ticket
         else:
@@ -489,6 +447,7 @@ class TicketViewSet(viewsets.ModelViewSet):
                 )
             except Exception:
                 pass
+            ticket_events.publish('ticket_created', ticket, **ticket_events.actor_data(self.request.user, get_user_display_name(self.request.user)))
             return ticket
         
     def perform_update(self, serializer):
@@ -514,7 +473,10 @@ class TicketViewSet(viewsets.ModelViewSet):
             except Exception:
                 pass
 
-        serializer.save()
+        ticket = serializer.save()
+        if old_status != new_status:
+            ticket_events.publish('status_changed', ticket, previous_status=old_status,
+                                  **ticket_events.actor_data(self.request.user, get_user_display_name(self.request.user)))
 
     def _fetch_external_user_profile(self, request, user_id):
         """
@@ -558,13 +520,8 @@ class TicketViewSet(viewsets.ModelViewSet):
             return {}
 
 def generate_company_id():
-    last_employee = Employee.objects.filter(company_id__startswith='MA').order_by('company_id').last()
-    if last_employee:
-        last_num = int(last_employee.company_id[2:])
-        new_num = last_num + 1
-    else:
-        new_num = 1
-    return f"MA{new_num:04d}"
+    from .id_allocator import next_company_id
+    return next_company_id()
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -587,9 +544,22 @@ def create_employee_admin_view(request):
     else:
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def _employee_validators(request, pk, single=True):
+    extra = {'logs_latest': Max('logs__timestamp'), 'logs_count': Count('logs', distinct=True)}
+    queryset = Employee.objects.all() if pk is None else Employee.objects.filter(pk=pk)
+    return queryset_validators(request, queryset, 'date_updated', extra, single=single)
+
+
+def _profile_validators(request):
+    # External users have no local Employee row; their profile is built from the token
+    if isinstance(request.user, ExternalUser):
+        return None
+    return _employee_validators(request, request.user.pk)
+
 @api_view(['GET', 'PATCH'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser, JSONParser])
+@conditional_get(_profile_validators)
 def employee_profile_view(request):
     """
     GET: return current user's profile
@@ -648,225 +618,73 @@ def employee_profile_view(request):
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-@api_view(['GET'])
-@authentication_classes([CookieJWTAuthentication])
-@permission_classes([IsAuthenticated])
-def get_ticket_detail(request, ticket_id):
-    """
-    Get detailed information about a specific ticket including employee data and comments
-    """
-    try:
-        ticket = get_object_or_404(Ticket, id=ticket_id)
-        user = request.user
-        # ExternalUser: allow all if role is Ticket Coordinator or Admin
-        if isinstance(user, ExternalUser):
-            if user.role in ['Ticket Coordinator', 'Admin']:
-                pass  # allow all
-            elif getattr(ticket, 'employee_cookie_id', None) != user.id:
-                return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        # Internal user: allow if staff, admin, coordinator, or ticket owner
-        elif not (user.is_staff or getattr(user, 'role', None) in ['System Admin', 'Ticket Coordinator'] or user == ticket.employee):
-            return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
+async def _ticket_detail_response(request, authentication_classes, **lookup):
+    from asgiref.sync import sync_to_async
+    from .renderers import ORJSONRenderer
+    from .models import ArchivedTicket
+    from .ticket_detail import build_archived_detail, build_ticket_detail, can_view
 
-        # Get comments based on user role
-        if getattr(user, 'role', None) in ['System Admin', 'Ticket Coordinator'] or getattr(user, 'is_staff', False):
-            comments = ticket.comments.all().order_by('-created_at')
-        else:
-            comments = ticket.comments.filter(is_internal=False).order_by('-created_at')
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    user = await sync_to_async(_authenticate_async_request)(request, authentication_classes)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    request.user = user
 
-        # Serialize ticket data
-        ticket_data = {
-            'id': ticket.id,
-            'ticket_number': ticket.ticket_number,
-            'subject': ticket.subject,
-            'category': ticket.category,
-            'sub_category': ticket.sub_category,
-            'description': ticket.description,
-            'attachments': TicketAttachmentSerializer(ticket.attachments.all(), many=True).data,
-            'status': ticket.status,
-            'priority': ticket.priority,
-            'priorityLevel': ticket.priority,  # Frontend expects priorityLevel
-            'department': ticket.department,
-            'submit_date': ticket.submit_date,
-            'update_date': ticket.update_date,
-            'assigned_to': {
-                'id': ticket.assigned_to.id,
-                'first_name': ticket.assigned_to.first_name,
-                'last_name': ticket.assigned_to.last_name,
-            } if ticket.assigned_to else None,
-        }
-        
-        # Handle employee data - with ExternalUser profile fetching
-        employee_data = None
-        if ticket.employee:
-            employee_data = {
-                'id': ticket.employee.id,
-                'first_name': ticket.employee.first_name,
-                'last_name': ticket.employee.last_name,
-                'company_id': ticket.employee.company_id,
-                'department': ticket.employee.department,
-                'email': ticket.employee.email,
-                'employee_cookie_id': getattr(ticket, 'employee_cookie_id', None)
-            }
-        elif getattr(ticket, 'employee_cookie_id', None):
-            # Try to fetch profile from auth service for external users
-            profile = _fetch_external_user_profile(request, ticket.employee_cookie_id)
-            employee_data = {
-                'id': ticket.employee_cookie_id,
-                'first_name': profile.get('first_name'),
-                'last_name': profile.get('last_name'),
-                'company_id': profile.get('company_id'),
-                'department': profile.get('department'),
-                'email': profile.get('email'),
-                'employee_cookie_id': ticket.employee_cookie_id
-            }
+    try:
+        ticket = await Ticket.objects.select_related('employee', 'assigned_to', 'coordinator').filter(**lookup).afirst()
+        archived = None
+        if ticket is None:
+            # Closed tickets may have moved to the archive (core.archive)
+            archived = await ArchivedTicket.objects.select_related('employee', 'assigned_to').filter(**lookup).afirst()
+            if archived is None:
+                return JsonResponse({'detail': 'No Ticket matches the given query.'}, status=404)
+        if not can_view(ticket or archived, user):
+            return JsonResponse({'error': 'permission denied'}, status=403)
+
+        if archived is not None:
+            # Archived tickets no longer change
+            validators = await aqueryset_validators(
+                request, ArchivedTicket.objects.filter(pk=archived.pk), 'archived_at', single=True
+            )
         else:
-            employee_data = {
-                'id': None,
-                'first_name': None,
-                'last_name': None,
-                'company_id': None,
-                'department': None,
-                'email': None,
-                'employee_cookie_id': None
-            }
-        
-        ticket_data['employee'] = employee_data
-        ticket_data['approved_by'] = ticket.approved_by if hasattr(ticket, 'approved_by') else None
-        ticket_data['comments'] = []
-        for comment in comments:
-            # Default user payload
-            user_payload = {
-                'id': comment.user.id if comment.user else comment.user_cookie_id,
-                'first_name': '',
-                'last_name': '',
-                'role': 'Employee'
-            }
+            validators = await aqueryset_validators(
+                request, Ticket.objects.filter(pk=ticket.pk), extra=_ticket_conditional_extra(), single=True
+            )
 
-            if comment.user:
-                # Local Employee commenter
-                user_payload['first_name'] = getattr(comment.user, 'first_name', '') or ''
-                user_payload['last_name'] = getattr(comment.user, 'last_name', '') or ''
-                user_payload['role'] = getattr(comment.user, 'role', 'Employee')
+        async def render():
+            if archived is not None:
+                ticket_data = await build_archived_detail(request, archived, user)
             else:
-                # External commenter (cookie id)
-                emp_cookie_id = getattr(ticket, 'employee_cookie_id', None)
-                if emp_cookie_id is not None and comment.user_cookie_id != emp_cookie_id:
-                    # Staff/external support — label depends on viewer
-                    is_admin_viewer = getattr(request.user, 'is_staff', False) or (getattr(request.user, 'role', None) in ['System Admin', 'Ticket Coordinator', 'Admin'])
-                    label = 'Coordinator' if is_admin_viewer else 'Support Team'
-                    user_payload['first_name'] = label
-                    user_payload['last_name'] = ''
-                    user_payload['role'] = 'Support'
-                else:
-                    # Ticket owner (external) — resolve profile for proper First/Last
-                    profile = _fetch_external_user_profile(request, comment.user_cookie_id)
-                    user_payload['first_name'] = profile.get('first_name') or ''
-                    user_payload['last_name'] = profile.get('last_name') or ''
-                    user_payload['role'] = 'Employee'
-
-            ticket_data['comments'].append({
-                'id': comment.id,
-                'comment': comment.comment,
-                'created_at': comment.created_at,
-                'is_internal': comment.is_internal,
-                'user': user_payload
-            })
-        
-        # Include dynamic and explicit IT/asset fields so frontend can display IT Support form values
-        try:
-            ticket_data['dynamic_data'] = ticket.dynamic_data
-        except Exception:
-            ticket_data['dynamic_data'] = None
-
-        # explicit fields mapped by serializer/create
-        ticket_data.update({
-            'asset_name': ticket.asset_name,
-            'serial_number': ticket.serial_number,
-            'location': ticket.location,
-            'expected_return_date': ticket.expected_return_date,
-            'issue_type': ticket.issue_type,
-            'other_issue': ticket.other_issue,
-            'performance_start_date': ticket.performance_start_date,
-            'performance_end_date': ticket.performance_end_date,
-            'cost_items': ticket.cost_items,
-            'requested_budget': ticket.requested_budget,
-            # Budget-specific metadata
-            'fiscal_year': ticket.fiscal_year,
-            'department_input': ticket.department_input,
-            # Include coordinator resolution
-            'coordinator': None,
-            'rejected_by': ticket.rejected_by if hasattr(ticket, 'rejected_by') else None,
-        })
-        
-        # Try to resolve coordinator from approved_by or rejected_by
-        try:
-            coord_key = ticket.approved_by if getattr(ticket, 'approved_by', None) else (ticket.rejected_by if getattr(ticket, 'rejected_by', None) else None)
-            if coord_key and not ticket_data.get('coordinator'):
-                # Try to resolve an Employee by company_id matching coord_key
-                coordinator_emp = Employee.objects.filter(company_id=coord_key).first()
-                if coordinator_emp:
-                    ticket_data['coordinator'] = {
-                        'id': coordinator_emp.id,
-                        'first_name': coordinator_emp.first_name,
-                        'last_name': coordinator_emp.last_name,
-                        'company_id': coordinator_emp.company_id,
-                        'department': coordinator_emp.department,
-                        'email': coordinator_emp.email,
-                    }
-        except Exception:
-            # ignore resolution errors
-            pass
+                ticket_data = await build_ticket_detail(request, ticket, user)
+            return HttpResponse(ORJSONRenderer().render(ticket_data), content_type='application/json')
+
+        return await aconditional_response(request, validators, render)
 
-        # Fallback: derive coordinator from latest staff comment (internal or external)
-        try:
-            if not ticket_data.get('coordinator'):
-                # Comments already loaded above; ensure newest-first
-                staff_comment = None
-                for c in comments.order_by('-created_at'):
-                    if c.user is not None:
-                        if getattr(c.user, 'is_staff', False) or getattr(c.user, 'role', None) in ['System Admin', 'Ticket Coordinator', 'Admin']:
-                            staff_comment = c
-        
-                            
-                    else:
-                        # External staff vs ticket owner (cookie id mismatch)
-                        if getattr(ticket, 'employee_cookie_id', None) is not None and c.user_cookie_id != getattr(ticket, 'employee_cookie_id', None):
-                            staff_comment = c
-                            break
-
-                if staff_comment is not None:
-                    if staff_comment.user is not None:
-                        u = staff_comment.user
-                        ticket_data['coordinator'] = {
-                            'id': u.id,
-                            'first_name': getattr(u, 'first_name', ''),
-                            'last_name': getattr(u, 'last_name', ''),
-                            'company_id': getattr(u, 'company_id', ''),
-                            'department': getattr(u, 'department', ''),
-                            'email': getattr(u, 'email', ''),
-                        }
-                    else:
-                        prof = _fetch_external_user_profile(request, staff_comment.user_cookie_id)
-                        ticket_data['coordinator'] = {
-                            'id': staff_comment.user_cookie_id,
-                            'first_name': prof.get('first_name') or '',
-                            'last_name': prof.get('last_name') or '',
-                            'company_id': prof.get('company_id') or '',
-                            'department': prof.get('department') or '',
-                            'email': prof.get('email') or '',
-                        }
-        except Exception:
-            pass
-        
-        return Response(ticket_data, status=status.HTTP_200_OK)
-        
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def get_ticket_detail(request, ticket_id):
+    """
+    Get detailed information about a specific ticket including employee data and comments.
+    Async: profiles of external users on the ticket are fetched from the auth
+    service concurrently, without holding a worker while they load.
+    """
+    return await _ticket_detail_response(request, (CookieJWTAuthentication,), id=ticket_id)
+
+
+def _activity_log_validators(request, user_id):
+    user = request.user
+    if not (getattr(user, 'is_staff', False) or getattr(user, 'role', None) in ['System Admin', 'Ticket Coordinator', 'Admin']
+            or (not isinstance(user, ExternalUser) and user.id == user_id)):
+        return None
+    return queryset_validators(request, ActivityLog.objects.filter(user_id=user_id), 'timestamp')
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_get(_activity_log_validators)
 def get_user_activity_logs(request, user_id):
     """Return ActivityLog entries for a given local Employee id.
     Allowed for System Admins, Ticket Coordinators, staff, or the user themself.
@@ -910,210 +728,12 @@ def get_user_activity_logs(request, user_id):
         return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['GET'])
-@authentication_classes([CookieJWTAuthentication, JWTAuthentication])
-@permission_classes([IsAuthenticated])
-def get_ticket_by_number(request, ticket_number):
+async def get_ticket_by_number(request, ticket_number):
     """
     Lookup ticket by its ticket_number (string) and return the same payload as get_ticket_detail.
+    Archived tickets are found too; their payload has "archived": true.
     """
-    try:
-        ticket = get_object_or_404(Ticket, ticket_number=ticket_number)
-        user = request.user
-        # ExternalUser: allow if employee_cookie_id matches user.id
-        if isinstance(user, ExternalUser):
-            # allow full access for Ticket Coordinator or Admin
-            if getattr(user, 'role', None) not in ['Ticket Coordinator', 'Admin']:
-                # otherwise, only allow if user owns the ticket
-                if str(getattr(ticket, 'employee_cookie_id', '')) != str(user.id):
-                    return Response({'error': 'permission deniedz'}, status=status.HTTP_403_FORBIDDEN)
-        # Internal user: allow if staff, admin, coordinator, or ticket owner
-        elif not (user.is_staff or getattr(user, 'role', None) in ['System Admin', 'Ticket Coordinator'] or user == ticket.employee):
-            return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
-
-        # Get comments based on user role
-        if getattr(user, 'role', None) in ['System Admin', 'Ticket Coordinator'] or getattr(user, 'is_staff', False):
-            comments = ticket.comments.all().order_by('-created_at')
-        else:
-            comments = ticket.comments.filter(is_internal=False).order_by('-created_at')
-
-        ticket_data = {
-            'id': ticket.id,
-            'ticket_number': ticket.ticket_number,
-            'subject': ticket.subject,
-            'category': ticket.category,
-            'sub_category': ticket.sub_category,
-            'description': ticket.description,
-            'attachments': TicketAttachmentSerializer(ticket.attachments.all(), many=True).data,
-            'status': ticket.status,
-            'priority': ticket.priority,
-            'priorityLevel': ticket.priority,  # Frontend expects priorityLevel
-            'department': ticket.department,
-            'submit_date': ticket.submit_date,
-            'update_date': ticket.update_date,
-            'assigned_to': {
-                'id': ticket.assigned_to.id,
-                'first_name': ticket.assigned_to.first_name,
-                'last_name': ticket.assigned_to.last_name,
-            } if ticket.assigned_to else None,
-        }
-        
-        # Handle employee data - if employee is None but employee_cookie_id exists, try to find the employee
-        employee_data = None
-        if ticket.employee:
-            employee_data = {
-                'id': ticket.employee.id,
-                'first_name': ticket.employee.first_name,
-                'last_name': ticket.employee.last_name,
-                'company_id': ticket.employee.company_id,
-                'department': ticket.employee.department,
-                'email': ticket.employee.email,
-                'employee_cookie_id': getattr(ticket, 'employee_cookie_id', None)
-            }
-        elif getattr(ticket, 'employee_cookie_id', None):
-            # Try to fetch profile from auth service for external users
-            profile = _fetch_external_user_profile(request, ticket.employee_cookie_id)
-            employee_data = {
-                'id': ticket.employee_cookie_id,
-                'first_name': profile.get('first_name'),
-                'last_name': profile.get('last_name'),
-                'company_id': profile.get('company_id'),
-                'department': profile.get('department'),
-                'email': profile.get('email'),
-                'employee_cookie_id': ticket.employee_cookie_id
-            }
-        else:
-            employee_data = {
-                'id': None,
-                'first_name': None,
-                'last_name': None,
-                'company_id': None,
-                'department': None,
-                'email': None,
-                'employee_cookie_id': None
-            }
-        
-        ticket_data['employee'] = employee_data
-        ticket_data['comments'] = []
-        for comment in comments:
-            user_payload = {
-                'id': comment.user.id if comment.user else comment.user_cookie_id,
-                'first_name': '',
-                'last_name': '',
-                'role': 'Employee'
-            }
-
-            if comment.user:
-                user_payload['first_name'] = getattr(comment.user, 'first_name', '') or ''
-                user_payload['last_name'] = getattr(comment.user, 'last_name', '') or ''
-                user_payload['role'] = getattr(comment.user, 'role', 'Employee')
-            else:
-                emp_cookie_id = getattr(ticket, 'employee_cookie_id', None)
-                if emp_cookie_id is not None and comment.user_cookie_id != emp_cookie_id:
-                    is_admin_viewer = getattr(request.user, 'is_staff', False) or (getattr(request.user, 'role', None) in ['System Admin', 'Ticket Coordinator', 'Admin'])
-                    label = 'Coordinator' if is_admin_viewer else 'Support Team'
-                    user_payload['first_name'] = label
-                    user_payload['last_name'] = ''
-                    user_payload['role'] = 'Support'
-                else:
-                    profile = _fetch_external_user_profile(request, comment.user_cookie_id)
-                    user_payload['first_name'] = profile.get('first_name') or ''
-                    user_payload['last_name'] = profile.get('last_name') or ''
-                    user_payload['role'] = 'Employee'
-
-            ticket_data['comments'].append({
-                'id': comment.id,
-                'comment': comment.comment,
-                'created_at': comment.created_at,
-                'is_internal': comment.is_internal,
-                'user': user_payload
-            })
-        
-        # Expose dynamic and explicit IT/asset fields for frontend
-        try:
-            ticket_data['dynamic_data'] = ticket.dynamic_data
-        except Exception:
-            ticket_data['dynamic_data'] = None
-
-        ticket_data.update({
-            'asset_name': ticket.asset_name,
-            'serial_number': ticket.serial_number,
-            'location': ticket.location,
-            'expected_return_date': ticket.expected_return_date,
-            'issue_type': ticket.issue_type,
-            'other_issue': ticket.other_issue,
-            'performance_start_date': ticket.performance_start_date,
-            'performance_end_date': ticket.performance_end_date,
-            'cost_items': ticket.cost_items,
-            'requested_budget': ticket.requested_budget,
-            # Include approved_by field
-            'approved_by': ticket.approved_by if hasattr(ticket, 'approved_by') else None,
-            # If approved_by is set, attempt to include coordinator details when possible
-            'coordinator': None,
-            'rejected_by': ticket.rejected_by if hasattr(ticket, 'rejected_by') else None,
-        })
-
-        try:
-            # Prefer approved_by, fall back to rejected_by when resolving coordinator
-            coord_key = ticket.approved_by if getattr(ticket, 'approved_by', None) else (ticket.rejected_by if getattr(ticket, 'rejected_by', None) else None)
-            if coord_key and not ticket_data.get('coordinator'):
-                # Try to resolve an Employee by company_id matching coord_key
-                coordinator_emp = Employee.objects.filter(company_id=coord_key).first()
-                if coordinator_emp:
-                    ticket_data['coordinator'] = {
-                        'id': coordinator_emp.id,
-                        'first_name': coordinator_emp.first_name,
-                        'last_name': coordinator_emp.last_name,
-                        'company_id': coordinator_emp.company_id,
-                        'department': coordinator_emp.department,
-                        'email': coordinator_emp.email,
-                    }
-        except Exception:
-            # ignore resolution errors
-            pass
-
-        # Fallback: derive coordinator from latest staff comment
-        try:
-            if not ticket_data.get('coordinator'):
-                staff_comment = None
-                for c in comments.order_by('-created_at'):
-                    if c.user is not None:
-                        if getattr(c.user, 'is_staff', False) or getattr(c.user, 'role', None) in ['System Admin', 'Ticket Coordinator', 'Admin']:
-                            staff_comment = c
-                            break
-                    else:
-                        if getattr(ticket, 'employee_cookie_id', None) is not None and c.user_cookie_id != getattr(ticket, 'employee_cookie_id', None):
-                            staff_comment = c
-                            break
-
-                if staff_comment is not None:
-                    if staff_comment.user is not None:
-                        u = staff_comment.user
-                        ticket_data['coordinator'] = {
-                            'id': u.id,
-                            'first_name': getattr(u, 'first_name', ''),
-                            'last_name': getattr(u, 'last_name', ''),
-                            'company_id': getattr(u, 'company_id', ''),
-                            'department': getattr(u, 'department', ''),
-                            'email': getattr(u, 'email', ''),
-                        }
-                    else:
-                        prof = _fetch_external_user_profile(request, staff_comment.user_cookie_id)
-                        ticket_data['coordinator'] = {
-                            'id': staff_comment.user_cookie_id,
-                            'first_name': prof.get('first_name') or '',
-                            'last_name': prof.get('last_name') or '',
-                            'company_id': prof.get('company_id') or '',
-                            'department': prof.get('department') or '',
-                            'email': prof.get('email') or '',
-                        }
-        except Exception:
-            pass
-
-        return Response(ticket_data, status=status.HTTP_200_OK)
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
+    return await _ticket_detail_response(request, (CookieJWTAuthentication, JWTAuthentication), ticket_number=ticket_number)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -1191,6 +811,9 @@ def add_ticket_comment(request, ticket_id):
                 'role': getattr(comment.user, 'role', 'User')
             }
 
+        ticket_events.publish('comment_added', ticket, is_internal=is_internal, comment_id=comment.id,
+                              **ticket_events.actor_data(request.user, f"{user_data['first_name']} {user_data['last_name']}".strip()))
+
         # Prepare serialized response similar to get_ticket_detail
         comment_data = {
             'id': comment.id,
@@ -1228,14 +851,18 @@ def approve_ticket(request, ticket_id):
         if department not in valid_departments:
             return Response({'error': 'Invalid department'}, status=status.HTTP_400_BAD_REQUEST)
 
+        old_status = ticket.status
         ticket.status = 'Open'
         ticket.priority = priority
         ticket.department = department
         # Record who approved/opened the ticket (store company_id for easy frontend display)
         user_display_name = _actor_display_name(request)
         ticket.approved_by = user_display_name
+        ticket_summary.set_coordinator(ticket, request.user, user_display_name)
         # Leave ticket unassigned after approval; assignment should be a separate action
         ticket.save()
+        ticket_events.publish('status_changed', ticket, previous_status=old_status,
+                              **ticket_events.actor_data(request.user, user_display_name))
 
         # Create a visible comment with a consistent message for approval/open
         # Handle ExternalUser vs Employee
@@ -1299,7 +926,10 @@ def reject_ticket(request, ticket_id):
         # Record who rejected the ticket (store company_id for easy frontend display)
         user_display_name = _actor_display_name(request)
         ticket.rejected_by = user_display_name
+        ticket_summary.set_coordinator(ticket, request.user, user_display_name)
         ticket.save()
+        ticket_events.publish('status_changed', ticket, previous_status='New',
+                              **ticket_events.actor_data(request.user, user_display_name))
         
         # Create internal comment for rejection - handle ExternalUser
         if isinstance(request.user, ExternalUser):
@@ -1333,33 +963,80 @@ def reject_ticket(request, ticket_id):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def claim_ticket(request, ticket_id):
+    from .work_queue import claim_ticket as claim_open_ticket
+
     try:
         ticket = get_object_or_404(Ticket, id=ticket_id)
 
-        # Only allow claiming if the ticket is Open
+        # Someone else already claimed it; any other status cannot be claimed
+        if ticket.status == 'In Progress':
+            return Response({'error': 'Ticket is already claimed.'}, status=status.HTTP_409_CONFLICT)
         if (ticket.status != 'Open'):
             return Response({'error': 'Ticket is not available for claiming.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Optional: prevent re-claim
-        if ticket.assigned_to and ticket.status != 'Open':
-            return Response({'error': 'Ticket is already claimed.'}, status=status.HTTP_400_BAD_REQUEST)
+        # Conditional update: if someone else claimed it since the read above,
+        # nothing is updated and the caller is told it is taken
+        if not claim_open_ticket(ticket.id, request.user, _actor_display_name(request)):
+            return Response({'error': 'Ticket is already claimed.'}, status=status.HTTP_409_CONFLICT)
+        ticket.refresh_from_db()
 
-        # Mark ticket as in progress and assign to the claimant
-        ticket.status = 'In Progress'
-        ticket.assigned_to = request.user
-        ticket.save()
+        return Response({
+            'message': 'Ticket successfully claimed.',
+            'ticket_id': ticket.id,
+            'status': ticket.status,
+            'assigned_to': request.user.email
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def claim_next_ticket(request):
+    """
+    Atomically assign the next eligible Open ticket to the caller.
+
+    Tickets are handed out by priority (Critical first), then oldest first.
+    Filters (body or query string): department (defaults to the caller's
+    department; pass "any" for all), category, sub_category, priority.
+    Returns 204 when nothing is waiting.
+    """
+    from .work_queue import claim_next_ticket as claim_next
+
+    try:
+        if not (request.user.is_staff or getattr(request.user, 'role', None) in ['System Admin', 'Ticket Coordinator']):
+            return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        def param(name):
+            return request.data.get(name) or request.query_params.get(name)
+
+        department = param('department') or getattr(request.user, 'department', None)
+        if department == 'any':
+            department = None
+        priority = param('priority')
+        if priority and priority not in [choice[0] for choice in PRIORITY_LEVELS]:
+            return Response({'error': 'Invalid priority level'}, status=status.HTTP_400_BAD_REQUEST)
+        if department and department not in [choice[0] for choice in DEPARTMENT_CHOICES]:
+            return Response({'error': 'Invalid department'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Optional log entry
-        # TicketComment.objects.create(
-        #     ticket=ticket,
-        #     user=request.user,
-        #     comment="Ticket claimed and marked as In Progress",
-        #     is_internal=True
-        # )
+        ticket = claim_next(
+            request.user,
+            _actor_display_name(request),
+            department=department,
+            category=param('category'),
+            sub_category=param('sub_category'),
+            priority=priority,
+        )
+        if ticket is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response({
             'message': 'Ticket successfully claimed.',
             'ticket_id': ticket.id,
+            'ticket_number': ticket.ticket_number,
+            'subject': ticket.subject,
+            'priority': ticket.priority,
+            'department': ticket.department,
             'status': ticket.status,
             'assigned_to': request.user.email
         }, status=status.HTTP_200_OK)
@@ -1408,6 +1085,8 @@ def update_ticket_status(request, ticket_id):
                 ticket.resolution_time = timezone.now() - ticket.submit_date
         
         ticket.save()
+        ticket_events.publish('status_changed', ticket, previous_status=old_status,
+                              **ticket_events.actor_data(request.user, _actor_display_name(request)))
         
         # Create comment for status change
         if new_status == 'Rejected':
@@ -1469,6 +1148,8 @@ def withdraw_ticket(request, ticket_id):
         
         # Create comment for withdrawal - handle ExternalUser
         user_display_name = _actor_display_name(request)
+        ticket_events.publish('status_changed', ticket, previous_status=old_status,
+                              **ticket_events.actor_data(request.user, user_display_name))
         withdrawal_comment = f"Ticket withdrawn by {user_display_name}. Reason: {reason}"
         
         if isinstance(request.user, ExternalUser):
@@ -1498,8 +1179,355 @@ def withdraw_ticket(request, ticket_id):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_ticket_operation(request):
+    """
+    Apply one operation to many tickets in a single transaction.
+
+    Body: {"operation": "approve" | "reject" | "claim" | "update_status" | "withdraw",
+           "ticket_ids": [...], plus the fields the single-ticket endpoint takes}.
+    Returns a result per ticket; tickets that fail their checks are left unchanged.
+    """
+    from .ticket_operations import TicketOperationError, run_batch
+
+    try:
+        ticket_ids = request.data.get('ticket_ids') or []
+        if not isinstance(ticket_ids, list):
+            return Response({'error': 'ticket_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ticket_ids = [int(ticket_id) for ticket_id in ticket_ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'ticket_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        operation = request.data.get('operation')
+        try:
+            results = run_batch(operation, ticket_ids, request.user, _actor_display_name(request), request.data)
+        except TicketOperationError as e:
+            code = status.HTTP_403_FORBIDDEN if str(e) == 'permission denied' else status.HTTP_400_BAD_REQUEST
+            return Response({'error': str(e)}, status=code)
+
+        succeeded = sum(1 for result in results if result['success'])
+        return Response({
+            'operation': operation,
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([ORJSONParser, NDJSONParser])
+def bulk_create_tickets(request):
+    """
+    Create many tickets in one request, for integrations and migrations.
+
+    Body: a JSON array of ticket objects (the fields TicketViewSet.create
+    takes, plus an optional employee_company_id, employee_email or
+    employee_cookie_id naming the owner), or the same objects as NDJSON
+    (Content-Type: application/x-ndjson), which is read as it arrives.
+    Returns the created tickets and the errors of the rejected records, both
+    by index. Coordinators only.
+    """
+    from collections.abc import Iterator
+
+    from .ticket_intake import ingest
+    from .ticket_operations import is_coordinator
+
+    try:
+        if not is_coordinator(request.user):
+            return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        records = request.data
+        if not isinstance(records, (list, Iterator)):
+            return Response({'error': 'Expected a list of tickets'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = ingest(records, request.user, _actor_display_name(request))
+        code = status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST
+        return Response({
+            'created': len(result['created']),
+            'failed': len(result['errors']),
+            'tickets': result['created'],
+            'errors': result['errors'],
+        }, status=code)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _duplicate_data(matches):
+    return [{
+        'id': ticket.id,
+        'ticket_number': ticket.ticket_number,
+        'subject': ticket.subject,
+        'status': ticket.status,
+        'submit_date': ticket.submit_date,
+        'similarity': round(score, 2),
+    } for ticket, score in matches]
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ticket_merge_candidates(request, ticket_id):
+    """
+    Open tickets that are likely near duplicates of this one (same issue filed
+    again), most similar first, with their estimated similarity. Optional
+    ?limit= (default 10, at most 50). Coordinators only.
+    """
+    from .ticket_operations import is_coordinator
+
+    try:
+        if not is_coordinator(request.user):
+            return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        ticket = get_object_or_404(Ticket, id=ticket_id)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'ticket_id': ticket.id,
+            'candidates': _duplicate_data(ticket_similarity.similar_tickets(ticket, limit)),
+        }, status=status.HTTP_200_OK)
+
+    except Http404:
+        return Response({'error': 'Ticket not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _authenticate_async_request(request, authentication_classes=(CookieJWTAuthentication,)):
+    """Authenticate a plain Django request for async views, which DRF does not wrap."""
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework.request import Request
+
+    drf_request = Request(request)
+    for authentication_class in authentication_classes:
+        try:
+            result = authentication_class().authenticate(drf_request)
+        except (AuthenticationFailed, Employee.DoesNotExist):
+            return None
+        if result:
+            return result[0]
+    return None
+
+
+async def ticket_event_stream(request):
+    """
+    Server-sent events for ticket changes (ticket_created, status_changed,
+    ticket_assigned, comment_added), filtered to what the caller may see.
+    Reconnecting clients send Last-Event-ID (or ?last_event_id=) to resume.
+    Needs an ASGI server; under WSGI each open stream holds a worker.
+    """
+    from asgiref.sync import sync_to_async
+    from django.http import StreamingHttpResponse
+
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    user = await sync_to_async(_authenticate_async_request)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or None
+    if last_event_id is not None:
+        try:
+            ticket_events.EventCursor.parse(last_event_id)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid Last-Event-ID'}, status=400)
+
+    response = StreamingHttpResponse(
+        ticket_events.event_stream(user, last_event_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_tickets(request):
+    """
+    Tickets changed since ?cursor= (omit it for the first sync).
+
+    Returns {tickets, deleted, cursor, has_more}: changed tickets in update
+    order, ids of tickets withdrawn, archived or deleted since the cursor, and
+    the cursor to send next time. Keep calling while has_more is true.
+    ?scope=mine (the default for employees) or all (coordinators; their default).
+    """
+    from .ticket_operations import is_coordinator
+    from .ticket_sync import DEFAULT_LIMIT, SCOPE_ALL, SCOPE_MINE, InvalidCursor, sync
+
+    try:
+        coordinator = is_coordinator(request.user)
+        scope = request.query_params.get('scope') or (SCOPE_ALL if coordinator else SCOPE_MINE)
+        if scope not in (SCOPE_ALL, SCOPE_MINE):
+            return Response({'error': "scope must be 'mine' or 'all'"}, status=status.HTTP_400_BAD_REQUEST)
+        if scope == SCOPE_ALL and not coordinator:
+            return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            tickets, deleted, cursor, has_more = sync(
+                request.user, request.query_params.get('cursor'), scope=scope, limit=limit
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'tickets': TicketSerializer(tickets, many=True, context={'request': request}).data,
+            'deleted': deleted,
+            'cursor': cursor,
+            'has_more': has_more,
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _export(request, kind):
+    from .exports import ExportError, build_export, export_response
+    from .ticket_operations import is_coordinator
+
+    try:
+        if not is_coordinator(request.user):
+            return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            export = build_export(kind, request.query_params)
+            # ?format= is taken by DRF's format suffixes
+            return export_response(request._request, export, request.query_params.get('file', 'csv'))
+        except ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_tickets(request):
+    """
+    Download tickets as CSV (?file=csv, the default) or XLSX (?file=xlsx).
+    Filters: ?since= and ?until= (dates or ISO datetimes, on submit_date),
+    ?status=, ?department=. Coordinators only.
+    """
+    return _export(request, 'tickets')
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_activity_logs(request):
+    """
+    Download activity logs as CSV or XLSX (?file=). Filters: ?since=, ?until=,
+    ?action_type=, ?user_id=. Coordinators only.
+    """
+    return _export(request, 'activity_logs')
+
+ARCHIVE_SEARCH_LIMIT = 50
+ARCHIVE_SEARCH_MAX_LIMIT = 200
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_archived_tickets(request):
+    """
+    Search archived tickets. ?q= matches the ticket number exactly or the
+    subject; ?category=, ?status=, ?department=, ?employee_id=, and ?since= /
+    ?until= (dates, on time_closed). Employees only see their own tickets.
+    Paged with ?limit= and ?offset=; fetch a ticket's full detail through
+    tickets/number/<ticket_number>/.
+    """
+    from .archive import search
+
+    try:
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', ARCHIVE_SEARCH_LIMIT)), ARCHIVE_SEARCH_MAX_LIMIT))
+            offset = max(0, int(request.query_params.get('offset', 0)))
+            queryset = search(request.user, request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e) or 'invalid filter'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = list(queryset.values(
+            'id', 'ticket_number', 'subject', 'category', 'department', 'status',
+            'employee_id', 'employee_cookie_id', 'submit_date', 'time_closed', 'archived_at',
+        )[offset:offset + limit + 1])
+        return Response({
+            'results': rows[:limit],
+            'has_more': len(rows) > limit,
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _reporting_validators(request):
+    from .conditional import Validators, make_etag
+    from .reporting import last_refreshed
+
+    # Reports only change when the refresh job runs
+    return Validators(make_etag(request, last_refreshed()), None)
+
+def _report(request, build):
+    from .reporting import InvalidReportRange, last_refreshed
+    from .ticket_operations import is_coordinator
+
+    try:
+        if not is_coordinator(request.user):
+            return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            data = build(request.query_params)
+        except InvalidReportRange as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(dict(data, as_of=last_refreshed()), status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_get(_reporting_validators)
+def report_daily_tickets(request):
+    """
+    Tickets opened and closed per day with mean resolution time, from the
+    reporting aggregates. ?since= and ?until= (dates, default the last 30
+    days), ?category=, ?department=. as_of is when the aggregates were last
+    refreshed.
+    """
+    from .reporting import daily_report, report_range
+
+    def build(params):
+        since, until = report_range(params)
+        return {
+            'since': since,
+            'until': until,
+            'days': daily_report(since, until, params.get('category'), params.get('department')),
+        }
+    return _report(request, build)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_get(_reporting_validators)
+def report_resolution_time(request):
+    """Mean resolution time per category for tickets closed between ?since= and ?until= (?department=)."""
+    from .reporting import report_range, resolution_report
+
+    def build(params):
+        since, until = report_range(params)
+        return {
+            'since': since,
+            'until': until,
+            'categories': resolution_report(since, until, params.get('department')),
+        }
+    return _report(request, build)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_get(_reporting_validators)
+def report_backlog(request):
+    """Open tickets per department, with a count per status."""
+    from .reporting import backlog_report
+
+    return _report(request, lambda params: {'departments': backlog_report()})
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_get(lambda request: _coordinator_ticket_validators(request, status='New'))
 def get_new_tickets(request):
     """
     Get all tickets with 'New' status for admin review
@@ -1521,7 +1549,9 @@ def get_new_tickets(request):
                 'submit_date': ticket.submit_date,
                 'employee_name': f"{ticket.employee.first_name} {ticket.employee.last_name}",
                 'employee_department': ticket.employee.department,
-                'has_attachment': bool(ticket.attachments.exists())  # Updated to check TicketAttachment
+                'has_attachment': ticket.attachment_count > 0,
+                'comment_count': ticket.comment_count,
+                'last_activity_at': ticket.last_activity_at,
             })
         
         return Response(tickets_data, status=status.HTTP_200_OK)
@@ -1531,6 +1561,7 @@ def get_new_tickets(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_get(lambda request: _coordinator_ticket_validators(request, status='Open'))
 def get_open_tickets(request):
     try:
         if not request.user.is_staff and request.user.role not in ['System Admin', 'Ticket Coordinator']:
@@ -1545,6 +1576,7 @@ def get_open_tickets(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_get(lambda request: _coordinator_ticket_validators(request, assigned_to=request.user))
 def get_my_tickets(request):
     """
     Get all tickets assigned to the current admin user
@@ -1570,7 +1602,10 @@ def get_my_tickets(request):
                 'update_date': ticket.update_date,
                 'employee_name': f"{ticket.employee.first_name} {ticket.employee.last_name}",
                 'employee_department': ticket.employee.department,
-                'has_attachment': bool(ticket.attachments.exists())
+                'has_attachment': ticket.attachment_count > 0,
+                'comment_count': ticket.comment_count,
+                'last_activity_at': ticket.last_activity_at,
+                'coordinator_name': ticket.coordinator_name,
             })
         
         return Response(tickets_data, status=status.HTTP_200_OK)
@@ -1802,8 +1837,15 @@ def verify_password(request):
         print(f"[verify_password] Error checking password on local user: {e}")
         return Response({'detail': 'Failed to verify password.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _employee_admin_validators(request, pk=None, roles=('System Admin', 'Ticket Coordinator')):
+    if not (request.user.is_staff or request.user.role in roles):
+        return None
+    return _employee_validators(request, pk, single=pk is not None)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_get(lambda request: _employee_admin_validators(request, roles=('System Admin', 'Admin', 'Ticket Coordinator')))
 def list_employees(request):
     # Allow system admins, admins, ticket coordinators, or staff to view all employees
     if not request.user.is_staff and request.user.role not in ['System Admin', 'Admin', 'Ticket Coordinator']:
@@ -1815,6 +1857,7 @@ def list_employees(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_get(_employee_admin_validators)
 def get_employee(request, pk):
     """
     Return a single employee by primary key. Permissions mirror list_employees: only staff, Ticket Coordinator, or System Admin can access arbitrary employees.
@@ -2044,11 +2087,16 @@ from .authentication import ExternalUser
 from .models import KnowledgeArticle
 
 
-class KnowledgeArticleViewSet(viewsets.ModelViewSet):
+class KnowledgeArticleViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = KnowledgeArticleSerializer
+    conditional_field = 'updated_at'
     # default permission for unsafe methods; we'll override for safe methods in get_permissions
     permission_classes = [IsAuthenticated, IsAdminOrSystemAdmin]
 
+    def get_conditional_extra(self):
+        # created_by_name comes from the author's Employee row
+        return {'authors_updated': Max('created_by__date_updated')}
+
     def get_permissions(self):
         """Allow safe (read-only) methods to be accessible without Admin permission.
         Unsafe methods (create/update/delete) still require IsAuthenticated and IsAdminOrSystemAdmin.
@@ -2108,22 +2156,13 @@ from django.conf import settings
 import os
 import mimetypes
 
-@api_view(['GET'])
-@authentication_classes([CookieJWTAuthentication])
-@permission_classes([IsAuthenticated])
-def serve_protected_media(request, file_path):
-    """
-    Serve media files only to authenticated users with valid cookies from auth service.
-    This ensures media files cannot be accessed without proper authentication.
-    Any user authenticated through the external auth service can access files.
-    """
+def _media_file_response(root, file_path, content_type=None):
     # Construct the full file path
-    full_path = os.path.join(settings.MEDIA_ROOT, file_path)
+    full_path = os.path.join(root, file_path)
     
-    # Security check: ensure the path doesn't escape MEDIA_ROOT
+    # Security check: ensure the path doesn't escape the media root
     full_path = os.path.abspath(full_path)
-    media_root = os.path.abspath(settings.MEDIA_ROOT)
-    if not full_path.startswith(media_root):
+    if not full_path.startswith(os.path.abspath(root)):
         raise Http404("Invalid file path")
     
     # Check if file exists
@@ -2131,7 +2170,8 @@ def serve_protected_media(request, file_path):
         raise Http404("File not found")
     
     # Determine content type
-    content_type, _ = mimetypes.guess_type(full_path)
+    if content_type is None:
+        content_type, _ = mimetypes.guess_type(full_path)
     if content_type is None:
         content_type = 'application/octet-stream'
     
@@ -2144,6 +2184,70 @@ def serve_protected_media(request, file_path):
         raise Http404(f"Error serving file: {str(e)}")
 
 
+def _signed_media_response(request, root, file_path):
+    """The file if the request carries a valid signature (core.media_utils), else None."""
+    from django.utils.cache import patch_cache_control
+    from .media_utils import SIGNATURE_PARAM, verify_media_signature
+
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    remaining = verify_media_signature(file_path, request.GET.get(SIGNATURE_PARAM))
+    if remaining is None:
+        return None
+    response = _media_file_response(root, file_path)
+    # The same signed URL is handed out for a while; let the browser keep the file until it expires
+    patch_cache_control(response, private=True, max_age=remaining)
+    return response
+
+
+@api_view(['GET'])
+@authentication_classes([CookieJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def _serve_protected_media_authenticated(request, file_path):
+    return _media_file_response(settings.MEDIA_ROOT, file_path)
+
+
+def serve_protected_media(request, file_path):
+    """
+    Serve media files only to authenticated users with valid cookies from auth service.
+    This ensures media files cannot be accessed without proper authentication.
+    Any user authenticated through the external auth service can access files.
+    Signed URLs (?sig=) are checked first, before any token is decoded.
+    """
+    response = _signed_media_response(request, settings.MEDIA_ROOT, file_path)
+    if response is None:
+        response = _serve_protected_media_authenticated(request, file_path)
+    return response
+
+
+@api_view(['GET'])
+@authentication_classes([CookieJWTAuthentication, JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def _serve_archived_media_authenticated(request, file_path):
+    from .models import ArchivedTicketAttachment
+    from .ticket_detail import can_view
+
+    attachment = ArchivedTicketAttachment.objects.select_related('ticket').filter(Q(file=file_path) | Q(preview=file_path)).first()
+    if attachment is None:
+        raise Http404("File not found")
+    if not can_view(attachment.ticket, request.user):
+        return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    if file_path == attachment.preview.name:
+        return _media_file_response(settings.ARCHIVE_ROOT, attachment.preview.name, 'image/jpeg')
+    return _media_file_response(settings.ARCHIVE_ROOT, attachment.file.name, attachment.file_type or None)
+
+
+def serve_archived_media(request, file_path):
+    """
+    Serve an attachment of an archived ticket from ARCHIVE_ROOT, to holders of
+    a signed URL or to users who may see the ticket.
+    """
+    response = _signed_media_response(request, settings.ARCHIVE_ROOT, file_path)
+    if response is None:
+        response = _serve_archived_media_authenticated(request, file_path)
+    return response
+
+
 def _fetch_external_user_profile(request, user_id):
     """
     Fetch user profile from auth service by user ID.
@@ -0,0 +1,138 @@
+"""
+Work-queue dispatch of Open tickets.
+
+``claim_next_ticket`` hands the caller the most urgent Open ticket (priority,
+then oldest first) and marks it In Progress in one step, so agents no longer
+poll the open list and race each other for the same ticket:
+
+* on databases that support it (PostgreSQL) the candidate row is picked with
+  ``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent agents each lock a
+  different ticket without waiting on one another;
+* elsewhere (SQLite) the candidate is taken with a conditional
+  ``UPDATE ... WHERE status = 'Open'``; if another agent got there first the
+  update matches no row and the next candidate is tried.
+
+``claim_ticket`` uses the same conditional update for a specific ticket.
+"""
+import random
+import time
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+
+from .authentication import ExternalUser
+from .models import ActivityLog, PRIORITY_LEVELS, Ticket, TicketComment
+
+# Critical first; tickets without a priority go last
+PRIORITY_RANK = Case(
+    *[When(priority=name, then=Value(rank)) for rank, (name, _label) in enumerate(PRIORITY_LEVELS)],
+    default=Value(len(PRIORITY_LEVELS)),
+    output_field=IntegerField(),
+)
+
+# Candidates fetched per round on the conditional-UPDATE path
+CANDIDATE_BATCH = 5
+MAX_ROUNDS = 10
+
+# SQLite reports write contention as an error instead of blocking; retried
+# with a short jittered backoff as in core.id_allocator
+SQLITE_LOCK_RETRIES = 50
+
+
+def open_ticket_queue(department=None, category=None, sub_category=None, priority=None):
+    """Open tickets in dispatch order, optionally filtered."""
+    queryset = Ticket.objects.filter(status='Open')
+    if department:
+        queryset = queryset.filter(department=department)
+    if category:
+        queryset = queryset.filter(category=category)
+    if sub_category:
+        queryset = queryset.filter(sub_category=sub_category)
+    if priority:
+        queryset = queryset.filter(priority=priority)
+    return queryset.annotate(priority_rank=PRIORITY_RANK).order_by('priority_rank', 'submit_date', 'id')
+
+
+def _claim_values(user, now):
+    values = {'status': 'In Progress', 'update_date': now}
+    # ExternalUser has no local Employee row to point assigned_to at
+    if not isinstance(user, ExternalUser):
+        values['assigned_to'] = user
+    return values
+
+
+def _record_claim(ticket_id, user, actor_name):
+    """Log the claim the way other ticket actions are logged."""
+    from . import ticket_events
+
+    ticket = Ticket.objects.get(pk=ticket_id)
+    ticket_events.publish('ticket_assigned', ticket, previous_status='Open',
+                          **ticket_events.actor_data(user, actor_name))
+    if isinstance(user, ExternalUser):
+        # Without assigned_to, the comment is the record of who claimed it
+        TicketComment.objects.create(
+            ticket=ticket,
+            user=None,
+            user_cookie_id=user.id,
+            comment=f"Ticket claimed by {actor_name}",
+            is_internal=True,
+        )
+        return
+    if ticket.employee_id:
+        ActivityLog.objects.create(
+            user_id=ticket.employee_id,
+            action_type='ticket_assigned',
+            message=f'Ticket claimed by {actor_name}',
+            ticket=ticket,
+            actor=user,
+            metadata={'previous_status': 'Open', 'new_status': 'In Progress'},
+        )
+
+
+def _retry_if_locked(func, *args):
+    attempt = 0
+    while True:
+        try:
+            return func(*args)
+        except OperationalError as e:
+            attempt += 1
+            if connection.vendor != 'sqlite' or 'locked' not in str(e) or attempt >= SQLITE_LOCK_RETRIES:
+                raise
+            time.sleep(random.uniform(0.001, 0.005) * min(attempt, 10))
+
+
+def _claim(ticket_id, user, actor_name):
+    with transaction.atomic():
+        claimed = Ticket.objects.filter(pk=ticket_id, status='Open').update(**_claim_values(user, timezone.now()))
+        if claimed:
+            _record_claim(ticket_id, user, actor_name)
+    return bool(claimed)
+
+
+def claim_ticket(ticket_id, user, actor_name):
+    """Claim one specific ticket; returns False if it is no longer Open."""
+    return _retry_if_locked(_claim, ticket_id, user, actor_name)
+
+
+def claim_next_ticket(user, actor_name, **filters):
+    """Claim the next eligible Open ticket; returns it, or None if the queue is empty."""
+    queue = open_ticket_queue(**filters)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ticket = queue.select_for_update(skip_locked=True, of=('self',)).first()
+            if ticket is None:
+                return None
+            Ticket.objects.filter(pk=ticket.pk).update(**_claim_values(user, timezone.now()))
+            _record_claim(ticket.pk, user, actor_name)
+        return Ticket.objects.get(pk=ticket.pk)
+
+    for _round in range(MAX_ROUNDS):
+        candidates = _retry_if_locked(lambda: list(queue.values_list('pk', flat=True)[:CANDIDATE_BATCH]))
+        if not candidates:
+            return None
+        for ticket_id in candidates:
+            if claim_ticket(ticket_id, user, actor_name):
+                return _retry_if_locked(lambda: Ticket.objects.get(pk=ticket_id))
+    return None